@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Acad_AI.settings')
+# Each ASGI request runs its ORM work on a fresh thread, so a persistent
+# connection would never be reused: close them per request instead.
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
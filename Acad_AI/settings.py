@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'assessment.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,13 +88,50 @@ WSGI_APPLICATION = 'Acad_AI.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'NAME': os.getenv("DATABASE_PATH", BASE_DIR / 'db.sqlite3'),
+    },
+    # submissions of archived exams (`manage.py archive_exam`);
+    # create it with `python manage.py migrate --database archive`
+    'archive': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv("ARCHIVE_DB_PATH", BASE_DIR / 'archive.sqlite3'),
+    },
 }
 
+DATABASE_ROUTERS = ["assessment.routers.ArchiveRouter", "assessment.routers.ReadRouter"]
+
+# Production SQLite profile (README: "Running on SQLite in production"):
+# WAL, busy_timeout and synchronous=NORMAL on every connection (see
+# assessment/sqlite.py), write transactions that take the write lock up
+# front (BEGIN IMMEDIATE), and a separate query_only connection for the
+# read-only views (assessment/routers.py). Persistent connections
+# (DB_CONN_MAX_AGE) only help WSGI servers, whose worker threads are
+# reused; asgi.py turns them off.
+SQLITE_PRODUCTION = os.getenv("SQLITE_PRODUCTION", "False") == "True"
+SQLITE_PRAGMAS = {}
+READ_DATABASE = None
+
+if SQLITE_PRODUCTION:
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "synchronous": "NORMAL",
+    }
+    for database in DATABASES.values():
+        database["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", "600"))
+        database["CONN_HEALTH_CHECKS"] = True
+        database["OPTIONS"] = {"transaction_mode": "IMMEDIATE"}
+
+    DATABASES["read"] = {
+        **DATABASES["default"],
+        "OPTIONS": {},  # never writes, so plain deferred transactions
+        "TEST": {"MIRROR": "default"},
+    }
+    READ_DATABASE = "read"
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "assessment.authentication.CachedJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
@@ -101,6 +139,71 @@ REST_FRAMEWORK = {
     )
 }
 
+SIMPLE_JWT = {
+    # adds is_staff / is_superuser claims to login tokens
+    "TOKEN_OBTAIN_SERIALIZER": "assessment.serializers.RoleTokenObtainPairSerializer",
+}
+
+# JWT users are cached per (user id, token jti) for this many seconds;
+# saving or deleting a user drops its entries in the same process
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+
+# Largest roster accepted by POST /api/auth/students/bulk/. Every row is
+# a PBKDF2 hash (~0.5s CPU) inside the request, so keep it small; the
+# import_students command has no limit
+ROSTER_BULK_MAX = int(os.getenv("ROSTER_BULK_MAX", "50"))
+
+# Grading
+# In-process cache of precompiled per-exam grading plans (see grading/plans.py).
+# Plans are dropped on question/exam changes in the same process; the TTL
+# (seconds) bounds staleness in other worker processes.
+GRADING_PLAN_CACHE_SIZE = int(os.getenv("GRADING_PLAN_CACHE_SIZE", "256"))
+GRADING_PLAN_TTL = int(os.getenv("GRADING_PLAN_TTL", "300"))
+
+# SIMILARITY theory questions: cosine similarity to the model answer at
+# which an answer earns full marks (scores are linear below it)
+GRADING_SIMILARITY_FULL_CREDIT = float(os.getenv("GRADING_SIMILARITY_FULL_CREDIT", "0.8"))
+
+# Per-process LRU of (score, feedback) for repeated answers to the same
+# question version (see grading/memo.py); 0 turns it off
+GRADING_MEMO_SIZE = int(os.getenv("GRADING_MEMO_SIZE", "20000"))
+
+# Pre-rendered student question payloads (see assessment/question_payload.py)
+QUESTION_PAYLOAD_CACHE_SIZE = int(os.getenv("QUESTION_PAYLOAD_CACHE_SIZE", "256"))
+QUESTION_PAYLOAD_TTL = int(os.getenv("QUESTION_PAYLOAD_TTL", "300"))
+QUESTION_PAYLOAD_GZIP = os.getenv("QUESTION_PAYLOAD_GZIP", "True") == "True"
+
+# Submit responses replayed for retries with the same Idempotency-Key
+# (see assessment/idempotency.py): kept IDEMPOTENCY_TTL seconds (then purged
+# by sweep_expired), and a key whose request never finished is freed after
+# IDEMPOTENCY_LEASE seconds
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_LEASE = int(os.getenv("IDEMPOTENCY_LEASE", "300"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+# Result documents stored on each graded submission (see assessment/results.py)
+RESULT_SNAPSHOT_GZIP = os.getenv("RESULT_SNAPSHOT_GZIP", "True") == "True"
+
+# "packed" keeps each new submission's answers in one compressed blob on
+# the submission instead of one Answer row per question (see
+# assessment/answer_store.py; `manage.py pack_answers` converts old ones)
+ANSWER_STORAGE = os.getenv("ANSWER_STORAGE", "rows")
+
+# Materialized exam stats (see assessment/stats.py)
+EXAM_PASS_PERCENTAGE = int(os.getenv("EXAM_PASS_PERCENTAGE", "50"))
+EXAM_LEADERBOARD_SIZE = int(os.getenv("EXAM_LEADERBOARD_SIZE", "10"))
+
+# When True, submit stores the answers, returns 202 and leaves grading to
+# `python manage.py grade_worker` (DB-backed queue, no broker needed).
+GRADING_ASYNC = os.getenv("GRADING_ASYNC", "False") == "True"
+GRADING_JOB_LEASE = int(os.getenv("GRADING_JOB_LEASE", "300"))  # seconds before a stuck job is re-claimed
+GRADING_JOB_MAX_ATTEMPTS = int(os.getenv("GRADING_JOB_MAX_ATTEMPTS", "3"))
+
+# Requests slower than this (ms) are logged with their SQL to the
+# "assessment.slow_requests" logger; 0 turns the log off
+METRICS_SLOW_REQUEST_MS = int(os.getenv("METRICS_SLOW_REQUEST_MS", "0"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -17,16 +17,18 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from assessment.views import RegisterView
+from assessment.views import MetricsView, RegisterView, StudentBulkCreateView
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     
     path("api/auth/register/", RegisterView.as_view(), name="register"),# Registration endpoint
+    path("api/auth/students/bulk/", StudentBulkCreateView.as_view(), name="students-bulk"),# Staff roster upload
     path('api/auth/login/', TokenObtainPairView.as_view()),# jwt token endpoint for obtaining jwt token
     path('api/auth/refresh/', TokenRefreshView.as_view()),# jwt token refresh endpoint
 
     path('api/exams/', include('assessment.urls')),# Exams endpoint
     path("api-auth/", include("rest_framework.urls")),
+    path("metrics", MetricsView.as_view(), name="metrics"),# Prometheus scrape endpoint (staff)
 ]
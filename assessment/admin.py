@@ -1,8 +1,10 @@
 from django.contrib import admin
-from .models import Exam, Question, Submission, Answer
+from .models import Exam, Question, Submission, Answer, GradingJob, ExamStats
 
 
 admin.site.register(Exam)
 admin.site.register(Question)
 admin.site.register(Submission)
 admin.site.register(Answer)
+admin.site.register(GradingJob)
+admin.site.register(ExamStats)
@@ -0,0 +1,167 @@
+import numpy as np
+from django.db.models import Aggregate, Count, F, IntegerField, TextField
+from django.db.models.functions import Cast, Round
+
+from .answer_store import packed_score_rows
+from .models import Submission
+from grading.plans import get_grading_plan
+
+
+# Scores travel through SQL as integer millionths of a mark: SQLite
+# formats integers several times faster than REALs, and the statistics
+# are reported to 4 decimals.
+SCORE_SCALE = 1000000
+
+
+class _GroupConcat(Aggregate):
+    # SQLite's group_concat; every group_concat of a group sees the
+    # rows in the same order, so ids and scores stay aligned
+    function = "group_concat"
+    output_field = TextField()
+
+
+def _parse(csv_parts):
+    # integers parse several times faster than floats
+    return np.fromstring(",".join(csv_parts), dtype=np.int64, sep=",") if csv_parts else np.zeros(0, dtype=np.int64)
+
+
+def _score_matrix(exam_id, question_ids):
+    """
+    Returns the (students x questions) float matrix of score_awarded of
+    every submitted answer of the exam, columns in `question_ids` order.
+    Unanswered cells are 0.
+
+    Answer rows are aggregated per submission in SQL (one row of
+    comma-separated question ids and scores per student, parsed by
+    NumPy), so Python never builds a row per answer; packed submissions
+    are read from their blobs in chunks.
+    """
+    submitted = Submission.objects.filter(exam_id=exam_id, is_submitted=True)
+    grouped = (
+        submitted.filter(packed_answers__isnull=True, answers__isnull=False)
+        .order_by()
+        .values("id")
+        .annotate(
+            n=Count("answers"),
+            qids=_GroupConcat("answers__question_id"),
+            scores=_GroupConcat(Cast(Round(F("answers__score_awarded") * SCORE_SCALE), IntegerField())),
+        )
+        .values_list("n", "qids", "scores")
+    )
+    counts, qid_parts, score_parts = [], [], []
+    for n, qids, scores in grouped:
+        counts.append(n)
+        qid_parts.append(qids)
+        score_parts.append(scores)
+
+    packed_qids, packed_scores = [], []
+    for qids, scores in packed_score_rows(submitted):
+        if qids:
+            counts.append(len(qids))
+            packed_qids.extend(qids)
+            packed_scores.extend(scores)
+
+    if not counts or not question_ids:
+        return np.zeros((0, len(question_ids)))
+
+    answer_qids = np.concatenate([_parse(qid_parts), np.asarray(packed_qids, dtype=float)])
+    answer_scores = np.concatenate([
+        _parse(score_parts) / SCORE_SCALE,
+        np.asarray(packed_scores, dtype=float),
+    ])
+    rows_idx = np.repeat(np.arange(len(counts)), counts)
+
+    question_ids = np.asarray(question_ids, dtype=float)
+    order = np.argsort(question_ids)
+    cols = np.searchsorted(question_ids, answer_qids, sorter=order)
+    cols = order[np.minimum(cols, len(order) - 1)]
+    known = question_ids[cols] == answer_qids  # drop answers to deleted questions
+
+    matrix = np.zeros((len(counts), len(question_ids)))
+    matrix[rows_idx[known], cols[known]] = answer_scores[known]
+    return matrix
+
+
+def _column_corr(x, y):
+    """
+    Pearson correlation of every column of x with the matching column
+    of y (NaN where either side has no variance).
+    """
+    xc = x - x.mean(axis=0)
+    yc = y - y.mean(axis=0)
+    denom = np.sqrt((xc ** 2).sum(axis=0) * (yc ** 2).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (xc * yc).sum(axis=0) / denom
+
+
+def _clean(value, digits=4):
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else None
+
+
+def item_analysis(exam_id, bins=10):
+    """
+    Classical test theory statistics for an exam, computed on the
+    student x question score matrix:
+
+    • difficulty:      mean score / marks (share of marks earned)
+    • discrimination:  (upper 27% mean - lower 27% mean) / marks
+    • point_biserial:  correlation of the item with the rest-score
+                       (total minus the item itself)
+    • cronbach_alpha:  internal consistency of the whole exam
+    • histogram:       distribution of percentage scores
+    """
+    plan = get_grading_plan(exam_id)
+    question_ids = [q.id for q in plan.questions]
+    marks = np.array([q.marks for q in plan.questions], dtype=float)
+
+    scores = _score_matrix(exam_id, question_ids)
+    n_students, n_items = scores.shape
+    totals = scores.sum(axis=1)
+
+    difficulty = discrimination = point_biserial = np.full(n_items, np.nan)
+    alpha = np.nan
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if n_students:
+            difficulty = scores.mean(axis=0) / marks
+
+        if n_students > 1:
+            # Upper / lower 27% groups by total score
+            group = max(int(round(n_students * 0.27)), 1)
+            ranked = np.argsort(totals)
+            lower, upper = scores[ranked[:group]], scores[ranked[-group:]]
+            discrimination = (upper.mean(axis=0) - lower.mean(axis=0)) / marks
+
+            point_biserial = _column_corr(scores, totals[:, None] - scores)
+
+        if n_items > 1 and n_students > 1:
+            item_var = scores.var(axis=0, ddof=1).sum()
+            total_var = totals.var(ddof=1)
+            alpha = n_items / (n_items - 1) * (1 - item_var / total_var)
+
+    percentages = totals / plan.total_marks * 100 if plan.total_marks else totals
+    counts, edges = np.histogram(percentages, bins=bins, range=(0, 100))
+
+    return {
+        "exam_id": exam_id,
+        "submissions": n_students,
+        "total_marks": plan.total_marks,
+        "mean_score": _clean(totals.mean()) if n_students else None,
+        "std_score": _clean(totals.std(ddof=1)) if n_students > 1 else None,
+        "cronbach_alpha": _clean(alpha),
+        "histogram": {
+            "bin_edges": [round(float(e), 2) for e in edges],
+            "counts": counts.tolist(),
+        },
+        "questions": [
+            {
+                "question": question_ids[j],
+                "marks": int(marks[j]),
+                "difficulty": _clean(difficulty[j]),
+                "discrimination": _clean(discrimination[j]),
+                "point_biserial": _clean(point_biserial[j]),
+            }
+            for j in range(n_items)
+        ],
+    }
@@ -0,0 +1,313 @@
+"""
+Where a submission's answers live.
+
+rows (default):  one Answer row per question.
+packed:          every answer of the submission in Submission.packed_answers,
+                 zlib-compressed JSON of
+                 [question_id, student_answer, score, feedback_code, graded_version]
+                 entries. Feedback strings repeat across a cohort, so they
+                 are interned once in FeedbackText and stored by id.
+
+ANSWER_STORAGE picks the mode of submissions created from now on; each
+submission stays in its own mode (packed_answers null = rows) until
+`manage.py pack_answers` converts it. Grading, results, exports and
+analytics read and write through the functions below, so they work
+with either mode and with a mix of both.
+"""
+import hashlib
+import json
+import zlib
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Answer, FeedbackText, Question, Submission
+
+
+LOOKUP_CHUNK = 500                 # keeps IN (...) under SQLite's parameter limit
+FEEDBACK_CACHE_SIZE = 100000
+
+# committed FeedbackText rows only: an id from a rolled-back insert can be reused
+_codes = {}   # text -> id
+_texts = {}   # id -> text
+
+
+def packed_mode():
+    return getattr(settings, "ANSWER_STORAGE", "rows") == "packed"
+
+
+def new_submission_defaults():
+    """
+    Field values for a submission created now (start exam).
+    """
+    return {"packed_answers": pack([])} if packed_mode() else {}
+
+
+def is_packed(submission):
+    return submission.packed_answers is not None
+
+
+# ---------- feedback interning ----------
+
+def _digest(text):
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def _remember(codes):
+    if len(_codes) + len(codes) > FEEDBACK_CACHE_SIZE:
+        _codes.clear()
+        _texts.clear()
+    for text, code in codes.items():
+        _codes[text] = code
+        _texts[code] = text
+
+
+def feedback_codes(texts):
+    """
+    FeedbackText id for every (non-null) text, creating missing rows.
+    """
+    codes = {text: _codes[text] for text in texts if text in _codes}
+    missing = {_digest(t): t for t in texts if t is not None and t not in codes}
+    if not missing:
+        return codes
+
+    FeedbackText.objects.bulk_create(
+        [FeedbackText(digest=digest, text=text) for digest, text in missing.items()],
+        ignore_conflicts=True,
+        batch_size=LOOKUP_CHUNK,
+    )
+    found = {}
+    digests = list(missing)
+    for start in range(0, len(digests), LOOKUP_CHUNK):
+        for digest, code in FeedbackText.objects.filter(digest__in=digests[start:start + LOOKUP_CHUNK]).values_list("digest", "id"):
+            found[missing[digest]] = code
+
+    transaction.on_commit(lambda: _remember(found))
+    codes.update(found)
+    return codes
+
+
+def feedback_texts(codes):
+    texts = {code: _texts[code] for code in codes if code in _texts}
+    missing = [code for code in codes if code is not None and code not in texts]
+    if not missing:
+        return texts
+
+    found = {}
+    for start in range(0, len(missing), LOOKUP_CHUNK):
+        found.update(FeedbackText.objects.filter(id__in=missing[start:start + LOOKUP_CHUNK]).values_list("id", "text"))
+
+    transaction.on_commit(lambda: _remember({text: code for code, text in found.items()}))
+    texts.update(found)
+    return texts
+
+
+# ---------- packing ----------
+
+def _entries(blob):
+    return json.loads(zlib.decompress(blob)) if blob else []
+
+
+def pack(answers, codes=None):
+    """
+    Blob for a list of Answers (feedback codes looked up unless given).
+    """
+    if codes is None:
+        codes = feedback_codes({a.feedback for a in answers})
+    entries = [
+        [a.question_id, a.student_answer, a.score_awarded, codes.get(a.feedback), a.graded_version]
+        for a in answers
+    ]
+    return zlib.compress(json.dumps(entries, separators=(",", ":")).encode())
+
+
+def _unpack(submission_id, entries, texts):
+    return [
+        Answer(
+            submission_id=submission_id,
+            question_id=question_id,
+            student_answer=student_answer,
+            score_awarded=float(score),  # FloatField, as read from a row
+            feedback=texts.get(code),
+            graded_version=version,
+        )
+        for question_id, student_answer, score, code, version in entries
+    ]
+
+
+def unpack_many(blobs):
+    """
+    {submission_id: blob} -> {submission_id: [Answer]} with one
+    feedback lookup for all of them.
+    """
+    entries = {submission_id: _entries(blob) for submission_id, blob in blobs.items()}
+    texts = feedback_texts({e[3] for rows in entries.values() for e in rows})
+    return {submission_id: _unpack(submission_id, rows, texts) for submission_id, rows in entries.items()}
+
+
+# ---------- reads ----------
+
+def load_answers(submission):
+    """
+    Every stored answer of one submission.
+    """
+    if is_packed(submission):
+        return unpack_many({submission.pk: submission.packed_answers})[submission.pk]
+    return list(Answer.objects.filter(submission_id=submission.pk))
+
+
+def load_answers_many(submissions):
+    """
+    {submission id: [Answer]} for submissions in either mode.
+    """
+    answers = {s.pk: [] for s in submissions}
+    answers.update(unpack_many({s.pk: s.packed_answers for s in submissions if is_packed(s)}))
+
+    row_ids = [s.pk for s in submissions if not is_packed(s)]
+    for start in range(0, len(row_ids), LOOKUP_CHUNK):
+        for answer in Answer.objects.filter(submission_id__in=row_ids[start:start + LOOKUP_CHUNK]):
+            answers[answer.submission_id].append(answer)
+    return answers
+
+
+def packed_answer_rows(submissions, columns=("id",), chunk_size=500):
+    """
+    Yields (*columns, [Answer]) for the packed submissions of a
+    queryset, reading blobs in chunks of submissions.
+    """
+    packed = submissions.filter(packed_answers__isnull=False).order_by("pk")
+    last_id = 0
+    while True:
+        chunk = list(packed.filter(pk__gt=last_id).values_list("pk", *columns, "packed_answers")[:chunk_size])
+        if not chunk:
+            return
+        answers = unpack_many({row[0]: row[-1] for row in chunk})
+        for row in chunk:
+            yield (*row[1:-1], answers[row[0]])
+        last_id = chunk[-1][0]
+
+
+def packed_score_rows(submissions, chunk_size=500):
+    """
+    Yields (question ids, scores) per packed submission of a queryset,
+    skipping the Answer objects and feedback lookup of packed_answer_rows.
+    """
+    packed = submissions.filter(packed_answers__isnull=False).order_by("pk")
+    last_id = 0
+    while True:
+        chunk = list(packed.filter(pk__gt=last_id).values_list("pk", "packed_answers")[:chunk_size])
+        if not chunk:
+            return
+        for _, blob in chunk:
+            entries = _entries(blob)
+            yield [e[0] for e in entries], [e[2] for e in entries]
+        last_id = chunk[-1][0]
+
+
+# ---------- writes ----------
+
+def store_pending(submission, pending):
+    """
+    Upserts student answers (autosave / submit). Call inside the
+    transaction that took the submission's row lock; a packed blob is
+    re-read there and submission.packed_answers refreshed.
+    """
+    if not is_packed(submission):
+        # One INSERT .. ON CONFLICT statement however many answers arrive
+        if pending:
+            Answer.objects.bulk_create(
+                pending,
+                update_conflicts=True,
+                unique_fields=["submission", "question"],
+                update_fields=["student_answer"],
+            )
+        return
+
+    blob = Submission.objects.filter(pk=submission.pk).values_list("packed_answers", flat=True).get()
+    if pending:
+        stored = {a.question_id: a for a in unpack_many({submission.pk: blob})[submission.pk]}
+        for answer in pending:
+            if answer.question_id in stored:
+                stored[answer.question_id].student_answer = answer.student_answer
+            else:
+                stored[answer.question_id] = answer
+        blob = pack(list(stored.values()))
+        Submission.objects.filter(pk=submission.pk).update(packed_answers=blob)
+
+    submission.packed_answers = blob
+
+
+def write_graded(graded_by_submission):
+    """
+    Writes graded answers ({submission: [Answer]}): rows with one
+    bulk_update plus one bulk_create, packed submissions by setting
+    packed_answers on the instance (saved by the caller with the score,
+    see graded_fields()).
+    """
+    rows, packed = [], {}
+    for submission, graded in graded_by_submission.items():
+        if is_packed(submission):
+            packed[submission] = graded
+        else:
+            rows.extend(graded)
+
+    Answer.objects.bulk_update(
+        [a for a in rows if a.pk is not None],
+        ["score_awarded", "feedback", "graded_version"]
+    )
+    Answer.objects.bulk_create([a for a in rows if a.pk is None])
+
+    if packed:
+        codes = feedback_codes({a.feedback for graded in packed.values() for a in graded})
+        for submission, graded in packed.items():
+            submission.packed_answers = pack(graded, codes)
+
+
+def graded_fields(submission, fields):
+    return [*fields, "packed_answers"] if is_packed(submission) else list(fields)
+
+
+# ---------- conversion (manage.py pack_answers) ----------
+
+def _convert(submissions, to_packed, batch_size):
+    source = submissions.filter(is_submitted=True, packed_answers__isnull=to_packed).order_by("pk")
+    converted = 0
+    while True:
+        # converted rows leave `source`, so every batch starts at the front
+        chunk = list(source.only("id", "packed_answers")[:batch_size])
+        if not chunk:
+            return converted
+        stored = load_answers_many(chunk)
+
+        with transaction.atomic():
+            if to_packed:
+                codes = feedback_codes({a.feedback for answers in stored.values() for a in answers})
+                for submission in chunk:
+                    submission.packed_answers = pack(stored[submission.pk], codes)
+                Answer.objects.filter(submission__in=chunk).delete()
+            else:
+                answers = [a for answers in stored.values() for a in answers]
+                # packed entries can outlive a deleted question
+                live = set(Question.objects.filter(id__in={a.question_id for a in answers}).values_list("id", flat=True))
+                Answer.objects.bulk_create([a for a in answers if a.question_id in live], batch_size=LOOKUP_CHUNK)
+                for submission in chunk:
+                    submission.packed_answers = None
+            Submission.objects.bulk_update(chunk, ["packed_answers"])
+
+        converted += len(chunk)
+
+
+def pack_submissions(submissions, batch_size=200):
+    """
+    Moves the Answer rows of submitted submissions into packed blobs,
+    one transaction per batch. Returns how many were converted.
+    Open submissions are left alone: autosave may be writing them.
+    """
+    return _convert(submissions, True, batch_size)
+
+
+def unpack_submissions(submissions, batch_size=200):
+    """
+    Reverse of pack_submissions(): packed blobs back to Answer rows.
+    """
+    return _convert(submissions, False, batch_size)
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class AssessmentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'assessment'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .middleware import install_query_recorder
+        from .sqlite import apply_sqlite_pragmas
+
+        connection_created.connect(install_query_recorder)
+        connection_created.connect(apply_sqlite_pragmas)
@@ -0,0 +1,150 @@
+"""
+Hot/cold split for finished exams (`manage.py archive_exam`).
+
+Graded submissions of an archived exam leave the live tables: each
+becomes one ArchivedSubmission row in the "archive" database (a separate
+SQLite file, see routers.py) carrying the student columns, the score,
+the stored result snapshot and its answers as one zlib JSON blob with
+feedback text inline, so nothing in it points back to live rows.
+
+Staff keep read access through the archive export
+(/api/exams/<exam_id>/archive/<kind>.<fmt>) and students through
+GET /result/, which falls back to the archived snapshot.
+"""
+import json
+import zlib
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .answer_store import load_answers_many
+from .models import ArchivedSubmission, Exam, GradingJob, Submission
+from .results import build_result, render_result
+from grading.plans import get_grading_plan
+
+
+ARCHIVE_DB = "archive"
+
+
+@dataclass
+class ArchiveReport:
+    exam_id: int
+    archived: int = 0
+
+    def as_dict(self):
+        return {"exam_id": self.exam_id, "archived": self.archived}
+
+
+def pack_archived(answers):
+    """
+    Blob for ArchivedSubmission.answers:
+    [question_id, student_answer, score, feedback, graded_version] entries.
+    """
+    entries = [
+        [a.question_id, a.student_answer, a.score_awarded, a.feedback, a.graded_version]
+        for a in answers
+    ]
+    return zlib.compress(json.dumps(entries, separators=(",", ":")).encode())
+
+
+def unpack_archived(blob):
+    return json.loads(zlib.decompress(blob)) if blob else []
+
+
+def archive_blockers(exam):
+    """
+    Reasons the exam cannot be archived yet ([] when it can).
+    """
+    blockers = []
+    submissions = Submission.objects.filter(exam=exam)
+
+    open_count = submissions.filter(is_submitted=False).count()
+    if open_count:
+        blockers.append(
+            f"{open_count} submissions are not submitted yet "
+            "(wait for the exam to end and run sweep_expired)"
+        )
+
+    jobs = GradingJob.objects.filter(submission__exam=exam).exclude(status="DONE").count()
+    if jobs:
+        blockers.append(f"{jobs} grading jobs are not done")
+
+    return blockers
+
+
+def _archived_record(submission, answers, plan):
+    result = submission.result
+    if result is None:
+        result = render_result(build_result(plan, answers, submission.total_score))
+
+    return ArchivedSubmission(
+        submission_id=submission.pk,
+        exam_id=submission.exam_id,
+        student_id=submission.student_id,
+        student_username=submission.student.username,
+        student_email=submission.student.email,
+        started_at=submission.started_at,
+        submitted_at=submission.submitted_at,
+        total_score=submission.total_score,
+        answers=pack_archived(answers),
+        result=bytes(result),
+    )
+
+
+def archive_exam(exam, batch_size=500):
+    """
+    Moves every submission of a finished exam (with its answers) into the
+    archive database, batch_size submissions at a time. Each batch is
+    written to the archive before it is deleted from the live database,
+    so an interrupted run loses nothing and can simply be run again.
+    Raises ValidationError when archive_blockers() finds open work.
+    """
+    # closes the exam to new starts before checking for open submissions
+    Exam.objects.filter(pk=exam.pk).update(archived_at=exam.archived_at or timezone.now())
+
+    blockers = archive_blockers(exam)
+    if blockers:
+        if exam.archived_at is None:
+            Exam.objects.filter(pk=exam.pk).update(archived_at=None)
+        raise ValidationError({"exam": blockers})
+
+    exam.refresh_from_db(fields=["archived_at"])
+    report = ArchiveReport(exam_id=exam.pk)
+    plan = get_grading_plan(exam.pk)
+    source = Submission.objects.filter(exam=exam).select_related("student").order_by("pk")
+
+    while True:
+        # archived rows leave `source`, so every batch starts at the front
+        chunk = list(source[:batch_size])
+        if not chunk:
+            return report
+        answers = load_answers_many(chunk)
+
+        with transaction.atomic(using=ARCHIVE_DB):
+            ArchivedSubmission.objects.bulk_create(
+                [_archived_record(s, answers[s.pk], plan) for s in chunk],
+                ignore_conflicts=True,  # rerun after a crash between the two writes
+            )
+
+        with transaction.atomic():
+            Submission.objects.filter(pk__in=[s.pk for s in chunk]).delete()
+
+        report.archived += len(chunk)
+
+
+def archived_result(exam_id, student_id):
+    """
+    Stored result snapshot of an archived submission, or None.
+    """
+    return (
+        ArchivedSubmission.objects
+        .filter(exam_id=exam_id, student_id=student_id)
+        .values_list("result", flat=True)
+        .first()
+    )
+
+
+def delete_archived(exam_id):
+    ArchivedSubmission.objects.filter(exam_id=exam_id).delete()
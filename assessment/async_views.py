@@ -0,0 +1,197 @@
+"""
+Native async views for the student hot path (questions, start,
+autosave, submit).
+
+Under ASGI these run on the event loop: authentication and lookups use
+the async ORM, cached question payloads and grading plans are served
+without leaving the loop, and grading runs in an executor. Requests
+for the browsable API (and non-JSON posts) are handed to the DRF views
+in views.py, so the browser experience is unchanged.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.renderers import JSONRenderer
+
+from . import views
+from .authentication import CachedJWTAuthentication
+from .idempotency import arun_once
+from .models import Exam
+from .question_payload import aget_question_payload
+from .routers import reads_only
+from .serializers import SubmissionSerializer
+from .services import ahandle_submission, asave_answers, astart_exam
+from grading.plans import aget_grading_plan
+
+
+jwt_auth = CachedJWTAuthentication()
+session_auth = SessionAuthentication()
+
+
+async def authenticate(request):
+    """
+    Async counterpart of DEFAULT_AUTHENTICATION_CLASSES (JWT, then
+    session). Returns the user, or None for anonymous requests.
+    """
+    header = jwt_auth.get_header(request)
+    if header is not None:
+        raw_token = jwt_auth.get_raw_token(header)
+        if raw_token is not None:
+            token = jwt_auth.get_validated_token(raw_token)
+            return await jwt_auth.aget_user(token)
+
+    user = await request.auser()
+    if user.is_authenticated and user.is_active:
+        session_auth.enforce_csrf(request)
+        return user
+    return None
+
+
+def render_json(data, code=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(data), content_type="application/json", status=code)
+
+
+def wants_browsable(request):
+    if "format" in request.GET:
+        return request.GET["format"] == "api"
+    return "text/html" in request.headers.get("Accept", "")
+
+
+async def validated_answers(request, exam):
+    """
+    Parses a JSON {"answers": [...]} body with SubmissionSerializer rules.
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError as exc:
+        raise exceptions.ParseError(f"JSON parse error - {exc}")
+
+    serializer = SubmissionSerializer(
+        data=data,
+        context={"exam": exam, "plan": await aget_grading_plan(exam)}
+    )
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data.get("answers", [])
+
+
+class AsyncStudentView(View):
+    """
+    Authenticated (IsAuthenticated) async view answering in DRF's JSON
+    shape, errors included. `drf_view` serves the browsable API.
+    """
+    drf_view = None
+    drf_handler = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        initkwargs.setdefault("drf_handler", cls.drf_view.as_view())
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def fallback(self, request, *args, **kwargs):
+        return await sync_to_async(self.drf_handler)(request, *args, **kwargs)
+
+    async def dispatch(self, request, *args, **kwargs):
+        if wants_browsable(request):
+            return await self.fallback(request, *args, **kwargs)
+
+        try:
+            self.user = await authenticate(request)
+            if self.user is None:
+                raise exceptions.NotAuthenticated()
+            return await super().dispatch(request, *args, **kwargs)
+
+        except Http404 as exc:
+            return self.error(request, exceptions.NotFound(*exc.args))
+        except exceptions.APIException as exc:
+            return self.error(request, exc)
+
+    def error(self, request, exc):
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        response = render_json(detail, exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response["WWW-Authenticate"] = jwt_auth.authenticate_header(request)
+        return response
+
+
+class ExamQuestionsView(AsyncStudentView):
+    """
+    Students view questions in an exam (cached bytes + ETag)
+    """
+    drf_view = views.ExamQuestionsView
+
+    @reads_only
+    async def get(self, request, exam_id):
+        payload = await aget_question_payload(exam_id)
+        if payload is None:
+            raise Http404
+
+        return views.payload_response(request, payload)
+
+
+class StartExamView(AsyncStudentView):
+    drf_view = views.StartExamView
+
+    async def post(self, request, exam_id):
+        exam = await aget_object_or_404(Exam, id=exam_id)
+
+        result, code = await astart_exam(self.user, exam)
+
+        return render_json(result, code)
+
+
+class SubmitExamView(AsyncStudentView):
+    """
+    Students submit exam + get graded feedback
+    """
+    drf_view = views.SubmitExamView
+
+    async def get(self, request, exam_id):
+        return await self.fallback(request, exam_id=exam_id)
+
+    async def post(self, request, exam_id):
+        # Form / multipart posts keep going through DRF's parsers
+        if request.content_type != "application/json":
+            return await self.fallback(request, exam_id=exam_id)
+
+        return await arun_once(request, self.user.id, lambda: self.submit(request, exam_id), render_json)
+
+    async def submit(self, request, exam_id):
+        exam = await aget_object_or_404(Exam, id=exam_id)
+
+        result, http_status = await ahandle_submission(
+            self.user,
+            exam,
+            await validated_answers(request, exam)
+        )
+
+        if result["status"] == "queued":
+            return views.queued_result(request, exam), http_status
+
+        if result["status"] != "success":
+            return result, http_status
+
+        return {"message": "Submission successful", **result["result"]}, status.HTTP_201_CREATED
+
+
+class SaveAnswersView(AsyncStudentView):
+    """
+    Students autosave answers while the exam is running
+    """
+    drf_view = views.SaveAnswersView
+
+    async def patch(self, request, exam_id):
+        if request.content_type != "application/json":
+            return await self.fallback(request, exam_id=exam_id)
+
+        exam = await aget_object_or_404(Exam, id=exam_id)
+
+        result, code = await asave_answers(self.user, exam, await validated_answers(request, exam))
+
+        return render_json(result, code)
@@ -0,0 +1,78 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .caching import UserCache
+
+
+ROLE_CLAIMS = ("is_staff", "is_superuser")
+
+
+def add_role_claims(token, user):
+    """
+    Copies the user's staff / superuser flags into a (refresh) token;
+    access tokens minted from it inherit them.
+    """
+    for claim in ROLE_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+user_cache = UserCache(
+    maxsize=getattr(settings, "AUTH_USER_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "AUTH_USER_CACHE_TTL", 60),
+)
+
+
+def invalidate_cached_user(user_id):
+    user_cache.invalidate(user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves users through an in-process TTL
+    cache keyed by (user id, token jti), so polling during an exam does
+    not query auth_user on every request.
+
+    Entries are dropped when the user is saved or deleted (see
+    signals.py); other worker processes catch up within
+    AUTH_USER_CACHE_TTL. A token whose role claims no longer match the
+    user (e.g. staff access revoked) is rejected.
+    """
+
+    def _key(self, validated_token):
+        # a token without a user id misses and the parent raises InvalidToken
+        return validated_token.get(api_settings.USER_ID_CLAIM), validated_token.get(api_settings.JTI_CLAIM)
+
+    def get_user(self, validated_token):
+        user_id, jti = self._key(validated_token)
+        user = user_cache.get(user_id, jti)
+
+        if user is None:
+            version = user_cache.version(user_id)
+            user = super().get_user(validated_token)
+            self.check_role_claims(validated_token, user)
+            user_cache.set(user_id, jti, user, version)
+
+        return user
+
+    async def aget_user(self, validated_token):
+        """
+        get_user() for async views; a cache hit stays on the event loop.
+        """
+        user_id, jti = self._key(validated_token)
+        user = user_cache.get(user_id, jti)
+        if user is not None:
+            return user
+        return await sync_to_async(self.get_user)(validated_token)
+
+    def check_role_claims(self, validated_token, user):
+        for claim in ROLE_CLAIMS:
+            # tokens issued before role claims existed carry none
+            if claim in validated_token and validated_token[claim] != getattr(user, claim):
+                raise AuthenticationFailed(
+                    "Token roles are out of date, please log in again",
+                    code="roles_changed",
+                )
@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+
+
+class ExamCache:
+    """
+    Thread-safe, in-process LRU of values derived from an exam, keyed
+    by exam id and built on demand by `build(exam_id)`.
+
+    • Concurrent misses for the same exam wait for a single build
+      (no thundering herd when an exam opens).
+    • invalidate() drops the entry and bumps the exam's version, and a
+      build that raced with an invalidation is not stored.
+    • Entries also expire after `ttl` seconds, which bounds how long
+      another worker process can serve a value after staff edit the exam.
+    • build() may return None (e.g. unknown exam); None is not cached.
+
+    Versions come from one counter shared by all exams and are only
+    kept while an exam is cached or being built, so memory stays
+    bounded by maxsize however many exams are ever invalidated.
+    """
+
+    def __init__(self, build, maxsize=256, ttl=300):
+        self.build = build
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._versions = {}     # exam_id -> version, cached or building exams only
+        self._counter = 0
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, exam_id, now):
+        entry = self._entries.get(exam_id)
+        if entry and now - entry[1] < self.ttl:
+            self._entries.move_to_end(exam_id)
+            return entry[0]
+        return None
+
+    def _forget(self, exam_id):
+        if exam_id not in self._entries and exam_id not in self._building:
+            self._versions.pop(exam_id, None)
+
+    def get(self, exam_id):
+        with self._lock:
+            value = self._lookup(exam_id, time.monotonic())
+            if value is not None:
+                return value
+            build_lock = self._building.setdefault(exam_id, threading.Lock())
+
+        with build_lock:
+            try:
+                # Someone else may have built it while we waited
+                with self._lock:
+                    value = self._lookup(exam_id, time.monotonic())
+                    if value is not None:
+                        return value
+                    version = self._versions.setdefault(exam_id, self._counter)
+
+                value = self.build(exam_id)
+
+                with self._lock:
+                    if value is not None and self._versions.get(exam_id) == version:
+                        self._entries[exam_id] = (value, time.monotonic())
+                        self._entries.move_to_end(exam_id)
+                        while len(self._entries) > self.maxsize:
+                            evicted, _ = self._entries.popitem(last=False)
+                            self._forget(evicted)
+            finally:
+                with self._lock:
+                    self._building.pop(exam_id, None)
+                    self._forget(exam_id)
+
+        return value
+
+    async def aget(self, exam_id):
+        """
+        get() for async views: hits are served on the event loop, only
+        a build is handed to Django's sync thread.
+        """
+        with self._lock:
+            value = self._lookup(exam_id, time.monotonic())
+        if value is not None:
+            return value
+        return await sync_to_async(self.get)(exam_id)
+
+    def version(self, exam_id):
+        with self._lock:
+            return self._versions.get(exam_id, self._counter)
+
+    def invalidate(self, exam_id):
+        with self._lock:
+            self._entries.pop(exam_id, None)
+            self._counter += 1
+            if exam_id in self._building:
+                self._versions[exam_id] = self._counter
+            else:
+                self._versions.pop(exam_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counter += 1
+            # builds still running must not store what they read before
+            self._versions = {exam_id: self._counter for exam_id in self._building}
+
+
+class UserCache:
+    """
+    Thread-safe LRU of authenticated users keyed by (user id, token jti),
+    with a TTL, so repeat requests with the same token skip the user query.
+
+    invalidate(user_id) drops the entries of every token of that user and,
+    like ExamCache, stops a lookup that raced with it from being stored.
+    Cached users are shared between requests: treat them as read-only.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # (user_id, jti) -> (user, stored_at)
+        self._keys = {}                 # user_id -> {(user_id, jti), ...}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, jti):
+        key = (user_id, jti)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[0]
+            return None
+
+    def version(self, user_id):
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def set(self, user_id, jti, user, version):
+        key = (user_id, jti)
+        with self._lock:
+            if self._versions.get(user_id, 0) != version:
+                return
+            self._entries[key] = (user, time.monotonic())
+            self._entries.move_to_end(key)
+            self._keys.setdefault(user_id, set()).add(key)
+
+            while len(self._entries) > self.maxsize:
+                (old_user_id, old_jti), _ = self._entries.popitem(last=False)
+                keys = self._keys.get(old_user_id)
+                if keys is not None:
+                    keys.discard((old_user_id, old_jti))
+                    if not keys:
+                        del self._keys[old_user_id]
+
+    def invalidate(self, user_id):
+        with self._lock:
+            for key in self._keys.pop(user_id, ()):
+                self._entries.pop(key, None)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+            self._versions.clear()
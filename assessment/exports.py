@@ -0,0 +1,175 @@
+import csv
+import json
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+
+from .answer_store import packed_answer_rows
+from .archive import unpack_archived
+from .models import Answer, ArchivedSubmission, Question, Submission
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+SUMMARY_FIELDS = (
+    ("submission", "id"),
+    ("student_id", "student_id"),
+    ("student", "student__username"),
+    ("email", "student__email"),
+    ("score", "total_score"),
+    ("is_submitted", "is_submitted"),
+    ("started_at", "started_at"),
+    ("submitted_at", "submitted_at"),
+)
+
+ANSWER_FIELDS = (
+    ("submission", "submission_id"),
+    ("student", "submission__student__username"),
+    ("question", "question_id"),
+    ("question_type", "question__question_type"),
+    ("student_answer", "student_answer"),
+    ("score", "score_awarded"),
+    ("feedback", "feedback"),
+)
+
+EXPORT_KINDS = {
+    "submissions": SUMMARY_FIELDS,
+    "answers": ANSWER_FIELDS,
+}
+
+
+def export_rows(exam_id, kind, archived=False):
+    """
+    Yields (header, *rows) for an exam export. Student and question
+    columns come from joins, and rows are streamed from the database
+    in chunks, so memory stays flat however large the cohort is.
+    Answers of packed submissions follow the Answer rows.
+    archived=True exports the exam's archived submissions instead,
+    with the same columns.
+    """
+    fields = EXPORT_KINDS[kind]
+    header = tuple(name for name, _ in fields)
+    columns = [column for _, column in fields]
+
+    if archived:
+        yield header
+        yield from _archived_rows(exam_id, kind)
+        return
+
+    if kind == "submissions":
+        queryset = Submission.objects.filter(exam_id=exam_id)
+    else:
+        queryset = Answer.objects.filter(submission__exam_id=exam_id)
+
+    rows = queryset.order_by("pk").values_list(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    yield header
+    yield from rows
+
+    if kind == "answers":
+        yield from _packed_answer_rows(exam_id)
+
+
+def _packed_answer_rows(exam_id):
+    question_types = None
+    submissions = Submission.objects.filter(exam_id=exam_id)
+
+    for submission_id, username, answers in packed_answer_rows(submissions, ("id", "student__username")):
+        if question_types is None:
+            question_types = dict(Question.objects.filter(exam_id=exam_id).values_list("id", "question_type"))
+        for a in answers:
+            # same columns as ANSWER_FIELDS
+            yield (
+                submission_id, username, a.question_id, question_types.get(a.question_id),
+                a.student_answer, a.score_awarded, a.feedback,
+            )
+
+
+def _archived_rows(exam_id, kind):
+    archived = ArchivedSubmission.objects.filter(exam_id=exam_id).order_by("pk")
+
+    if kind == "submissions":
+        rows = archived.values_list(
+            "submission_id", "student_id", "student_username", "student_email",
+            "total_score", "started_at", "submitted_at",
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for submission_id, student_id, username, email, score, started_at, submitted_at in rows:
+            # same columns as SUMMARY_FIELDS; only submitted exams are archived
+            yield (submission_id, student_id, username, email, score, True, started_at, submitted_at)
+        return
+
+    question_types = dict(Question.objects.filter(exam_id=exam_id).values_list("id", "question_type"))
+    rows = archived.values_list("submission_id", "student_username", "answers").iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for submission_id, username, blob in rows:
+        for question_id, student_answer, score, feedback, _ in unpack_archived(blob):
+            # same columns as ANSWER_FIELDS
+            yield (
+                submission_id, username, question_id, question_types.get(question_id),
+                student_answer, score, feedback,
+            )
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class _Echo:
+    """
+    File-like object whose write() just hands the line back,
+    so csv.writer can feed a generator.
+    """
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow([_plain(v) for v in row])
+
+
+def stream_ndjson(rows):
+    rows = iter(rows)
+    header = next(rows)
+    for row in rows:
+        yield json.dumps(dict(zip(header, map(_plain, row)))) + "\n"
+
+
+def buffered(chunks, size=64 * 1024):
+    """
+    Joins small row strings into ~64KB pieces so the server does not
+    flush once per row.
+    """
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+_END = object()
+
+
+async def async_chunks(chunks):
+    """
+    Async iterator over a sync chunk iterator, one chunk per
+    sync_to_async call. Under ASGI, Django drains a sync streaming
+    iterator into a list before sending anything; this keeps exports
+    streaming with constant memory there too.
+    """
+    iterator = iter(chunks)
+    while True:
+        chunk = await sync_to_async(next)(iterator, _END)
+        if chunk is _END:
+            return
+        yield chunk
+
+
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv"),
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+}
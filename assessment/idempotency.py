@@ -0,0 +1,270 @@
+"""
+Idempotency-Key support for submit.
+
+A client that retries a submit (timeout on a slow network, double tap)
+sends the same Idempotency-Key header each time. The first request
+takes the key by inserting an IdempotentResponse row, runs, and stores
+its JSON response there; a retry gets that response back unchanged
+(with an Idempotent-Replayed header) instead of a second grading pass.
+Only processed requests (2xx) are stored; a refusal or failure frees
+the key.
+
+Finished responses are also kept in an in-process LRU, so a retry storm
+against one worker is answered without a query. A retry that arrives
+while the first request is still running gets 409; the same key with a
+different request body gets 422. A key left unfinished by a crashed
+worker is taken over after IDEMPOTENCY_LEASE seconds; stored responses
+are replayed for IDEMPOTENCY_TTL seconds and then deleted by
+purge_expired() (run by `manage.py sweep_expired`).
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from .models import IdempotentResponse
+
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    status_code: int
+    body: bytes
+    fingerprint: str = ""
+    replayed: bool = True
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU of finished responses by (user id, key), with a TTL.
+    """
+
+    def __init__(self, maxsize=10000, ttl=86400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, key):
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end((user_id, key))
+                return entry[0]
+            return None
+
+    def set(self, user_id, key, stored):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._entries[(user_id, key)] = (stored, time.monotonic())
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache(
+    maxsize=getattr(settings, "IDEMPOTENCY_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "IDEMPOTENCY_TTL", 86400),
+)
+
+
+def idempotency_key(request):
+    """
+    The request's Idempotency-Key, or None when it has none.
+    """
+    key = request.headers.get(HEADER, "").strip()
+    if not key:
+        return None
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValidationError({HEADER: [f"At most {MAX_KEY_LENGTH} characters"]})
+    return key
+
+
+def request_fingerprint(request):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (request.method.encode(), request.path.encode(), request.body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _conflict(detail, code):
+    body = JSONRenderer().render({"status": "idempotency_conflict", "message": detail})
+    return StoredResponse(code, body, replayed=False)
+
+
+def _reused_key():
+    return _conflict(
+        "This Idempotency-Key was already used for a different request",
+        status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+
+
+def begin(user_id, key, fingerprint):
+    """
+    Takes the key for a new request and returns None, or returns the
+    StoredResponse to send instead (a replay, or a 409 / 422 conflict).
+    """
+    stored = response_cache.get(user_id, key)
+    if stored is not None:
+        return stored if stored.fingerprint == fingerprint else _reused_key()
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            IdempotentResponse.objects.create(user_id=user_id, key=key, fingerprint=fingerprint)
+        return None
+    except IntegrityError:
+        pass
+
+    record = IdempotentResponse.objects.filter(user_id=user_id, key=key).first()
+    if record is None:
+        # released by a failed request in between: run as a new request
+        return begin(user_id, key, fingerprint)
+
+    ttl = timedelta(seconds=getattr(settings, "IDEMPOTENCY_TTL", 86400))
+    lease = timedelta(seconds=getattr(settings, "IDEMPOTENCY_LEASE", 300))
+    expired = record.created_at < now - (lease if record.status_code is None else ttl)
+
+    if expired:
+        # unfinished by a crashed worker, or too old to replay: start over
+        taken = IdempotentResponse.objects.filter(
+            pk=record.pk, created_at=record.created_at
+        ).update(fingerprint=fingerprint, status_code=None, body=None, created_at=now)
+        if taken:
+            return None
+        return begin(user_id, key, fingerprint)
+
+    if record.fingerprint != fingerprint:
+        return _reused_key()
+
+    if record.status_code is None:
+        return _conflict(
+            "A request with this Idempotency-Key is still being processed; retry shortly",
+            status.HTTP_409_CONFLICT,
+        )
+
+    stored = StoredResponse(record.status_code, bytes(record.body), record.fingerprint)
+    response_cache.set(user_id, key, stored)
+    return stored
+
+
+def finish(user_id, key, fingerprint, status_code, data):
+    """
+    Stores the response of the request that took the key, if the
+    request was processed (2xx). Refusals (not started, time expired,
+    ...) and server errors are not stored: the key is released so a
+    retry runs again.
+    """
+    if not status.is_success(status_code):
+        release(user_id, key)
+        return
+
+    body = JSONRenderer().render(data)
+    IdempotentResponse.objects.filter(user_id=user_id, key=key, status_code__isnull=True).update(
+        status_code=status_code, body=body
+    )
+    response_cache.set(user_id, key, StoredResponse(status_code, body, fingerprint))
+
+
+def release(user_id, key):
+    """
+    Forgets a key whose request failed before it produced a response.
+    """
+    IdempotentResponse.objects.filter(user_id=user_id, key=key, status_code__isnull=True).delete()
+
+
+def purge_expired(now=None):
+    """
+    Deletes keys older than IDEMPOTENCY_TTL (they are no longer
+    replayed). Returns how many were deleted.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, "IDEMPOTENCY_TTL", 86400))
+    deleted, _ = IdempotentResponse.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def replay_response(stored):
+    response = HttpResponse(stored.body, content_type="application/json", status=stored.status_code)
+    if stored.replayed:
+        response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def run_once(request, user_id, handler, respond):
+    """
+    Runs handler() -> (data, status_code) and returns respond(data, status_code),
+    at most once per Idempotency-Key when the request has one.
+    """
+    key = idempotency_key(request)
+    if key is None:
+        return respond(*handler())
+
+    fingerprint = request_fingerprint(request)
+    stored = begin(user_id, key, fingerprint)
+    if stored is not None:
+        return replay_response(stored)
+
+    try:
+        data, code = handler()
+    except Exception:
+        release(user_id, key)
+        raise
+
+    finish(user_id, key, fingerprint, code, data)
+    return respond(data, code)
+
+
+async def arun_once(request, user_id, handler, respond):
+    """
+    run_once() for async views (async handler); cached replays are
+    served without leaving the event loop.
+
+    The handler and finish() are shielded together: a client that
+    disconnects mid-submit does not stop the grading, so its response
+    is still stored for the retry. The key is released only when the
+    handler itself fails.
+    """
+    key = idempotency_key(request)
+    if key is None:
+        return respond(*await handler())
+
+    fingerprint = request_fingerprint(request)
+    stored = response_cache.get(user_id, key)
+    if stored is None or stored.fingerprint != fingerprint:
+        stored = await sync_to_async(begin)(user_id, key, fingerprint)
+    if stored is not None:
+        return replay_response(stored)
+
+    async def run():
+        try:
+            data, code = await handler()
+        except Exception:
+            await sync_to_async(release)(user_id, key)
+            raise
+        await sync_to_async(finish)(user_id, key, fingerprint, code, data)
+        return data, code
+
+    data, code = await asyncio.shield(run())
+    return respond(data, code)
@@ -0,0 +1,114 @@
+"""
+Bulk question import (nested exam endpoint and `manage.py import_exam`).
+
+Rows are streamed in chunks: each chunk is validated with
+QuestionCreateSerializer (many=True) and inserted with one bulk_create,
+all inside one transaction, so a bad row anywhere rolls back the whole
+import and a large question bank is never held in memory at once.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Question
+from .question_payload import invalidate_question_payload
+from .results import invalidate_results
+from .serializers import QuestionCreateSerializer
+from grading.plans import invalidate_grading_plan
+
+
+MAX_REPORTED_ERRORS = 50
+LIST_COLUMNS = ("options", "expected_keywords")
+
+
+def read_jsonl(handle):
+    """
+    One question object per line; blank lines are skipped.
+    """
+    for number, line in enumerate(handle, start=1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                raise ValidationError({"line": number, "error": f"Invalid JSON: {exc}"})
+
+
+def read_csv(handle):
+    """
+    Header row with question fields. `options` / `expected_keywords`
+    hold a JSON list or "|"-separated values; empty cells are omitted.
+    """
+    reader = csv.DictReader(handle)
+    for row in reader:
+        question = {}
+        for column, value in row.items():
+            # None: cells beyond the header
+            if column is None or not (value or "").strip():
+                continue
+            column, value = column.strip(), value.strip()
+            if column in LIST_COLUMNS:
+                value = _parse_list(value, reader.line_num)
+            question[column] = value
+        yield question
+
+
+def _parse_list(value, line):
+    if not value.startswith("["):
+        return [v.strip() for v in value.split("|")]
+    try:
+        return json.loads(value)
+    except ValueError as exc:
+        raise ValidationError({"line": line, "error": f"Invalid JSON list: {exc}"})
+
+
+READERS = {"jsonl": read_jsonl, "csv": read_csv}
+
+
+def import_questions(exam, rows, chunk_size=500):
+    """
+    Validates and inserts question rows into `exam`; returns how many
+    were created. Raises ValidationError ({"questions": {row number:
+    errors}}) and inserts nothing if any row is invalid.
+    """
+    rows = iter(rows)
+    created = 0
+    errors = {}
+    row_number = 0
+
+    with transaction.atomic():
+        while len(errors) < MAX_REPORTED_ERRORS:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            serializer = QuestionCreateSerializer(data=chunk, many=True)
+            if not serializer.is_valid():
+                for offset, row_errors in enumerate(serializer.errors):
+                    if row_errors:
+                        errors[row_number + offset + 1] = row_errors
+
+            # after the first error keep validating, but stop writing
+            elif not errors:
+                Question.objects.bulk_create(
+                    [Question(exam=exam, **data) for data in serializer.validated_data]
+                )
+                created += len(chunk)
+
+            row_number += len(chunk)
+
+        if errors:
+            raise ValidationError({"questions": errors})
+
+        # bulk_create sends no post_save, so drop the caches here
+        transaction.on_commit(lambda: _invalidate(exam.id))
+
+    return created
+
+
+def _invalidate(exam_id):
+    invalidate_grading_plan(exam_id)
+    invalidate_question_payload(exam_id)
+    invalidate_results(exam_id)
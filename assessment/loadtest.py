@@ -0,0 +1,296 @@
+"""
+Load generator for the student exam flow.
+
+Virtual students run register -> login -> start -> questions -> submit
+against a live server, with every submit aimed at a shared deadline.
+Requests are dispatched from a time-ordered schedule onto a bounded
+thread pool, so thousands of students need only `concurrency` threads.
+
+Traffic can be recorded to JSONL and replayed later with the same
+per-student timing, and results are summarised per endpoint
+(throughput, p50/p95/p99 latency, error rate).
+"""
+import heapq
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+STEPS = ("register", "login", "start", "questions", "submit")
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+class Results:
+    """
+    Thread-safe per-endpoint latency / status collector.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {step: [] for step in STEPS}
+        self._errors = {step: {} for step in STEPS}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def add(self, step, seconds, status):
+        with self._lock:
+            self._samples[step].append(seconds)
+            if status is None or status >= 400:
+                key = str(status or "connection")
+                self._errors[step][key] = self._errors[step].get(key, 0) + 1
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        total = 0
+
+        for step in STEPS:
+            samples = sorted(self._samples[step])
+            if not samples:
+                continue
+            total += len(samples)
+            errors = sum(self._errors[step].values())
+            endpoints[step] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+                "error_rate": round(errors / len(samples), 4),
+                "errors": self._errors[step],
+            }
+
+        return {
+            "duration_s": round(elapsed, 3),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+            "endpoints": endpoints,
+        }
+
+
+class Scheduler:
+    """
+    Runs callables at (or after) their scheduled time on a thread pool.
+    """
+
+    def __init__(self, concurrency):
+        self._pool = ThreadPoolExecutor(max_workers=concurrency)
+        self._heap = []
+        self._seq = 0
+        self._pending = 0
+        self._cond = threading.Condition()
+
+    def at(self, when, fn):
+        with self._cond:
+            heapq.heappush(self._heap, (when, self._seq, fn))
+            self._seq += 1
+            self._pending += 1
+            self._cond.notify()
+
+    def _run(self, fn):
+        try:
+            fn()
+        finally:
+            with self._cond:
+                self._pending -= 1
+                self._cond.notify()
+
+    def run(self):
+        with self._cond:
+            while self._pending:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                when, _, fn = self._heap[0]
+                delay = when - time.perf_counter()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                self._pool.submit(self._run, fn)
+        self._pool.shutdown()
+
+
+class VirtualStudent:
+    def __init__(self, label, run_id):
+        self.label = label
+        self.username = f"lt-{run_id}-{label}"
+        self.password = f"pw-{uuid.uuid4().hex[:12]}"
+        self.token = None
+        self.questions = []
+
+
+class LoadTest:
+    """
+    Drives virtual students against base_url and records what it sent.
+
+    plan: {student label: [step, ...]}, each step a dict with
+    "step", "at" (seconds from start) and optional "body".
+    """
+
+    def __init__(self, base_url, exam_id, concurrency=50, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.exam_id = exam_id
+        self.timeout = timeout
+        self.scheduler = Scheduler(concurrency)
+        self.results = Results()
+        self.run_id = uuid.uuid4().hex[:8]
+        self.recorded = []
+        self._record_lock = threading.Lock()
+
+    # ---------- HTTP ----------
+
+    def _request(self, method, path, body=None, token=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        if token:
+            request.add_header("Authorization", f"Bearer {token}")
+
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            status, payload = exc.code, exc.read()
+        except (urllib.error.URLError, OSError):
+            status, payload = None, b""
+        elapsed = time.perf_counter() - started
+
+        try:
+            parsed = json.loads(payload) if payload else None
+        except ValueError:
+            parsed = None
+        return status, parsed, elapsed
+
+    # ---------- steps ----------
+
+    def _endpoint(self, step, student, body):
+        exam = f"/api/exams/{self.exam_id}"
+        if step == "register":
+            return "POST", "/api/auth/register/", {"username": student.username, "password": student.password}
+        if step == "login":
+            return "POST", "/api/auth/login/", {"username": student.username, "password": student.password}
+        if step == "start":
+            return "POST", f"{exam}/start/", None
+        if step == "questions":
+            return "GET", f"{exam}/questions/", None
+        return "POST", f"{exam}/submit/", body if body is not None else self._answers(student)
+
+    def _answers(self, student):
+        return {
+            "answers": [
+                {
+                    "question": q["id"],
+                    "answer": (q.get("options") or ["x"])[0]
+                    if q.get("question_type") == "MCQ"
+                    else "A cell is the basic unit of life",
+                }
+                for q in student.questions
+            ]
+        }
+
+    def _do(self, student, step, body):
+        sent_at = time.perf_counter() - self.results.started
+        method, path, body = self._endpoint(step, student, body)
+        status, parsed, elapsed = self._request(method, path, body, student.token)
+        self.results.add(step, elapsed, status)
+
+        if step == "login" and isinstance(parsed, dict):
+            student.token = parsed.get("access")
+        elif step == "questions" and isinstance(parsed, list):
+            student.questions = parsed
+
+        with self._record_lock:
+            self.recorded.append({
+                "student": student.label,
+                "step": step,
+                "at": round(sent_at, 4),
+                "body": body if step == "submit" else None,
+            })
+
+    def _step(self, student, steps, origin):
+        head, rest = steps[0], steps[1:]
+        self._do(student, head["step"], head.get("body"))
+        if rest:
+            # never earlier than planned, never before this step finished
+            self.scheduler.at(
+                max(origin + rest[0]["at"], time.perf_counter()),
+                lambda: self._step(student, rest, origin),
+            )
+
+    def run(self, plan):
+        origin = time.perf_counter()
+        self.results.started = origin
+
+        for label, steps in plan.items():
+            if steps:
+                student = VirtualStudent(label, self.run_id)
+                self.scheduler.at(
+                    origin + steps[0]["at"],
+                    lambda student=student, steps=steps: self._step(student, steps, origin),
+                )
+
+        self.scheduler.run()
+        self.results.finished = time.perf_counter()
+        return self.results.summary()
+
+
+def synthetic_plan(students, ramp, deadline, jitter, seed=0):
+    """
+    Students arrive spread over `ramp` seconds, then all aim their
+    submit at `deadline` seconds, +- `jitter`.
+    """
+    rng = random.Random(seed)
+    plan = {}
+
+    for i in range(students):
+        arrive = rng.uniform(0, ramp)
+        plan[f"vs{i:05d}"] = [
+            {"step": "register", "at": arrive},
+            {"step": "login", "at": arrive},
+            {"step": "start", "at": arrive},
+            {"step": "questions", "at": arrive},
+            {"step": "submit", "at": max(deadline + rng.uniform(-jitter, jitter), arrive)},
+        ]
+    return plan
+
+
+def load_plan(path):
+    """
+    Rebuilds per-student step lists from a recorded JSONL file.
+    """
+    plan = {}
+    with open(path) as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get("step") not in STEPS:
+                continue
+            plan.setdefault(entry["student"], []).append(entry)
+
+    for steps in plan.values():
+        steps.sort(key=lambda e: e["at"])
+    return plan
+
+
+def save_recording(recorded, path):
+    with open(path, "w") as handle:
+        for entry in sorted(recorded, key=lambda e: e["at"]):
+            handle.write(json.dumps(entry) + "\n")
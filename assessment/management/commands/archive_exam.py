@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from assessment.archive import archive_exam
+from assessment.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Move the graded submissions of a finished exam into the archive database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("exam_id", type=int)
+        parser.add_argument("--batch", type=int, default=500, help="Submissions moved per transaction")
+
+    def handle(self, *args, **options):
+        exam = Exam.objects.filter(id=options["exam_id"]).first()
+        if exam is None:
+            raise CommandError(f"Exam {options['exam_id']} does not exist")
+
+        try:
+            report = archive_exam(exam, batch_size=options["batch"])
+        except ValidationError as exc:
+            raise CommandError("Exam cannot be archived yet:\n" + json.dumps(exc.detail, indent=2))
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {report.archived} submissions of exam {exam.id}"))
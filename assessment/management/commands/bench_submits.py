@@ -0,0 +1,135 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.utils import timezone
+
+from assessment.exports import export_rows
+from assessment.loadtest import percentile
+from assessment.models import Exam, Question, Submission
+from assessment.routers import read_database
+from assessment.services import handle_submission
+
+
+def _submit(student, exam, answers):
+    """
+    One submit in a worker process. Returns (milliseconds, outcome).
+    """
+    started = time.perf_counter()
+    try:
+        result, _ = handle_submission(student, exam, answers)
+        outcome = result["status"]
+    except OperationalError as exc:
+        outcome = str(exc)
+    return (time.perf_counter() - started) * 1000, outcome
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent-write benchmark: every student of a throwaway exam submits at "
+        "once from a pool of worker processes (like a multi-worker server), while "
+        "reader threads export the exam. Run it against a scratch copy of the "
+        "database, once per profile (SQLITE_PRODUCTION=False / True)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=400)
+        parser.add_argument("--workers", type=int, default=16, help="Concurrent submitting processes")
+        parser.add_argument("--readers", type=int, default=2, help="Threads exporting the exam meanwhile")
+        parser.add_argument("--questions", type=int, default=20)
+
+    def handle(self, *args, **options):
+        # workers reuse the configured Django process, as in regrade_exam
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise CommandError("bench_submits needs fork support")
+
+        exam, students = self.create_exam(options["students"], options["questions"])
+        answers = [
+            {"question": q.id, "answer": "a" if q.question_type == "MCQ" else "a cell is the unit of life"}
+            for q in exam.questions.all()
+        ]
+        done = threading.Event()
+        reads, read_errors = [], []
+
+        def read():
+            try:
+                while not done.is_set():
+                    started = time.perf_counter()
+                    with read_database():
+                        for _ in export_rows(exam.id, "submissions"):
+                            pass
+                    reads.append((time.perf_counter() - started) * 1000)
+            except OperationalError as exc:
+                read_errors.append(str(exc))
+            finally:
+                connections.close_all()
+
+        # forked workers must not inherit open SQLite handles
+        connections.close_all()
+        readers = [threading.Thread(target=read) for _ in range(options["readers"])]
+
+        with ProcessPoolExecutor(options["workers"], mp_context=multiprocessing.get_context("fork")) as pool:
+            for thread in readers:
+                thread.start()
+            started = time.perf_counter()
+            outcomes = list(pool.map(_submit, students, [exam] * len(students), [answers] * len(students)))
+            seconds = time.perf_counter() - started
+
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        latencies = sorted(ms for ms, outcome in outcomes if outcome == "success")
+        errors = {}
+        for outcome in [o for _, o in outcomes if o != "success"] + [f"read: {e}" for e in read_errors]:
+            errors[outcome] = errors.get(outcome, 0) + 1
+
+        profile = "production" if getattr(settings, "SQLITE_PRODUCTION", False) else "default"
+        if latencies:
+            self.stdout.write(
+                f"profile={profile} submits={len(latencies)}/{len(students)} in {seconds:.2f}s "
+                f"({len(latencies) / seconds:.1f}/s) p50={percentile(latencies, 50):.0f}ms "
+                f"p95={percentile(latencies, 95):.0f}ms p99={percentile(latencies, 99):.0f}ms"
+            )
+        else:
+            self.stdout.write(f"profile={profile} no submit succeeded")
+        reads.sort()
+        if reads:
+            self.stdout.write(
+                f"exports={len(reads)} p50={percentile(reads, 50):.0f}ms p95={percentile(reads, 95):.0f}ms"
+            )
+        for error, count in sorted(errors.items()):
+            self.stdout.write(self.style.ERROR(f"{count} x {error}"))
+
+        exam.delete()
+        User.objects.filter(pk__in=[s.pk for s in students]).delete()
+
+    def create_exam(self, students, size):
+        staff, _ = User.objects.get_or_create(username="loadtest-staff", defaults={"is_staff": True})
+        exam = Exam.objects.create(title="Write benchmark", course="Load test", duration=60, created_by=staff)
+        Question.objects.bulk_create([
+            Question(exam=exam, text=f"Q{i}", question_type="MCQ", marks=2, options=["a", "b"], correct_answer="a")
+            if i % 2 == 0 else
+            Question(exam=exam, text=f"Q{i}", question_type="THEORY", marks=5, expected_keywords=["cell", "unit of life"])
+            for i in range(size)
+        ])
+
+        # one hash for every account: the benchmark is about writes, not PBKDF2
+        password = make_password(None)
+        prefix = f"bench-{exam.id}-"
+        User.objects.bulk_create(
+            [User(username=f"{prefix}{i}", password=password) for i in range(students)],
+            batch_size=90,
+        )
+        accounts = list(User.objects.filter(username__startswith=prefix))
+        Submission.objects.bulk_create(
+            [Submission(student=user, exam=exam, started_at=timezone.now()) for user in accounts],
+            batch_size=90,
+        )
+        return exam, accounts
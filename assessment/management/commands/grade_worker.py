@@ -0,0 +1,51 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from grading.queue import claim_jobs, run_job
+
+
+def _run_in_thread(job):
+    # Each pool thread has its own DB connection; release it when done.
+    try:
+        return run_job(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Drain the grading job queue (used when GRADING_ASYNC=True)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Grading threads")
+        parser.add_argument("--batch", type=int, default=50, help="Jobs claimed per poll")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when idle")
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        worker_id = uuid.uuid4().hex
+        self.stdout.write(f"grade_worker {worker_id[:8]} started with {options['workers']} threads")
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            while True:
+                close_old_connections()
+                jobs = claim_jobs(options["batch"], worker_id)
+
+                if not jobs:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                results = list(pool.map(_run_in_thread, jobs))
+                failed = results.count(False)
+
+                self.stdout.write(
+                    f"graded {len(results) - failed} submissions"
+                    + (f", {failed} failed" if failed else "")
+                )
+
+        self.stdout.write(self.style.SUCCESS("Queue drained"))
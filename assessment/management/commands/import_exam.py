@@ -0,0 +1,62 @@
+import json
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from assessment.imports import READERS, import_questions
+from assessment.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Import questions from a .jsonl or .csv file into a new or existing exam."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Question file (.jsonl or .csv)")
+        parser.add_argument("--format", choices=sorted(READERS), help="Default: from the file extension")
+        parser.add_argument("--exam", type=int, help="Append to this exam instead of creating one")
+        parser.add_argument("--title", help="New exam title")
+        parser.add_argument("--course", help="New exam course")
+        parser.add_argument("--duration", type=int, help="New exam duration (minutes)")
+        parser.add_argument("--owner", help="Username of the staff member who owns the new exam")
+        parser.add_argument("--chunk-size", type=int, default=500, help="Rows validated and inserted per batch")
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or os.path.splitext(options["path"])[1].lstrip(".").lower()
+        if fmt not in READERS:
+            raise CommandError(f"Unknown format {fmt!r}; use --format {'|'.join(sorted(READERS))}")
+
+        try:
+            with open(options["path"], newline="", encoding="utf-8") as handle, transaction.atomic():
+                exam = self.get_exam(options)
+                created = import_questions(exam, READERS[fmt](handle), options["chunk_size"])
+
+        except ValidationError as exc:
+            raise CommandError("Import failed, nothing was saved:\n" + json.dumps(exc.detail, indent=2))
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} questions into exam {exam.id} ({exam.title})"))
+
+    def get_exam(self, options):
+        if options["exam"]:
+            try:
+                return Exam.objects.get(id=options["exam"])
+            except Exam.DoesNotExist:
+                raise CommandError(f"Exam {options['exam']} does not exist")
+
+        missing = [f"--{name}" for name in ("title", "course", "duration", "owner") if not options[name]]
+        if missing:
+            raise CommandError(f"Pass --exam, or {', '.join(missing)} to create one")
+
+        try:
+            owner = User.objects.get(username=options["owner"], is_staff=True)
+        except User.DoesNotExist:
+            raise CommandError(f"No staff user {options['owner']!r}")
+
+        return Exam.objects.create(
+            title=options["title"],
+            course=options["course"],
+            duration=options["duration"],
+            created_by=owner,
+        )
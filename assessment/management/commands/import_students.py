@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from assessment.roster import provision_students, read_roster, write_credentials
+
+
+class Command(BaseCommand):
+    help = "Create student accounts from a roster CSV (username, email, password, first_name, last_name)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Roster CSV with a header row")
+        parser.add_argument("--output", help="Write generated passwords / tokens to this CSV")
+        parser.add_argument("--tokens", action="store_true", help="Issue a JWT pair for every new student")
+        parser.add_argument("--workers", type=int, help="Password hashing threads (default: CPU count)")
+        parser.add_argument("--skip-existing", action="store_true", help="Skip usernames that already exist")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], newline="", encoding="utf-8") as handle:
+                report = provision_students(
+                    read_roster(handle),
+                    workers=options["workers"],
+                    issue_tokens=options["tokens"],
+                    skip_existing=options["skip_existing"],
+                )
+
+        except ValidationError as exc:
+            raise CommandError("Import failed, nothing was saved:\n" + json.dumps(exc.detail, indent=2))
+
+        if report.credentials:
+            # generated passwords exist nowhere else, so never drop them
+            if options["output"]:
+                with open(options["output"], "w", newline="", encoding="utf-8") as handle:
+                    write_credentials(report.credentials, handle)
+                self.stdout.write(f"Credentials written to {options['output']}")
+            else:
+                write_credentials(report.credentials, self.stdout)
+
+        message = f"Created {report.created} students"
+        if report.skipped:
+            message += f", skipped {len(report.skipped)} existing"
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,90 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from assessment.loadtest import LoadTest, load_plan, save_recording, synthetic_plan
+from assessment.models import Exam, Question
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay or synthesize student traffic (register, login, start, questions, submit) "
+        "against a running server and report per-endpoint latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000")
+        parser.add_argument("--exam", type=int, help="Exam id to take")
+        parser.add_argument(
+            "--create-exam", type=int, metavar="N",
+            help="Create a throwaway exam with N questions in this project's database and use it",
+        )
+        parser.add_argument("--students", type=int, default=100, help="Virtual students (synthetic mode)")
+        parser.add_argument("--concurrency", type=int, default=50, help="Max requests in flight")
+        parser.add_argument("--ramp", type=float, default=10.0, help="Seconds over which students arrive")
+        parser.add_argument("--deadline", type=float, default=30.0, help="Seconds until the shared submit deadline")
+        parser.add_argument("--jitter", type=float, default=2.0, help="+- seconds around the deadline")
+        parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout")
+        parser.add_argument("--replay", help="Replay a recorded JSONL traffic file instead of synthesizing")
+        parser.add_argument("--record", help="Write the traffic that was sent to this JSONL file")
+        parser.add_argument("--output", help="Write the JSON results summary to this file")
+
+    def handle(self, *args, **options):
+        exam_id = options["exam"]
+        if options["create_exam"]:
+            exam_id = self.create_exam(options["create_exam"], options["deadline"])
+        if not exam_id:
+            raise CommandError("Pass --exam <id> or --create-exam <N>")
+
+        if options["replay"]:
+            plan = load_plan(options["replay"])
+        else:
+            plan = synthetic_plan(options["students"], options["ramp"], options["deadline"], options["jitter"])
+
+        self.stdout.write(
+            f"Running {len(plan)} virtual students against {options['base_url']} (exam {exam_id})"
+        )
+        test = LoadTest(options["base_url"], exam_id, options["concurrency"], options["timeout"])
+        summary = test.run(plan)
+        summary["config"] = {
+            key: options[key]
+            for key in ("base_url", "students", "concurrency", "ramp", "deadline", "jitter", "replay")
+        }
+        summary["config"]["exam"] = exam_id
+
+        for step, stats in summary["endpoints"].items():
+            self.stdout.write(
+                f"{step:<10} n={stats['requests']:<6} {stats['throughput_rps']:>8} req/s  "
+                f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms  "
+                f"errors={stats['error_rate']:.2%}"
+            )
+        self.stdout.write(f"total {summary['requests']} requests in {summary['duration_s']}s")
+
+        if options["record"]:
+            save_recording(test.recorded, options["record"])
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump(summary, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def create_exam(self, size, deadline):
+        staff, _ = User.objects.get_or_create(username="loadtest-staff", defaults={"is_staff": True})
+        exam = Exam.objects.create(
+            title="Load test",
+            course="Load test",
+            duration=int(deadline // 60) + 10,
+            created_by=staff,
+        )
+        Question.objects.bulk_create([
+            Question(
+                exam=exam, text=f"Q{i}", question_type="MCQ", marks=1,
+                options=["a", "b", "c", "d"], correct_answer="a",
+            ) if i % 2 == 0 else Question(
+                exam=exam, text=f"Q{i}", question_type="THEORY", marks=5,
+                expected_keywords=["cell", "basic unit", "life"],
+            )
+            for i in range(size)
+        ])
+        self.stdout.write(f"Created exam {exam.id} with {size} questions")
+        return exam.id
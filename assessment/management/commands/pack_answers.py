@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from assessment.answer_store import pack_submissions, unpack_submissions
+from assessment.models import Exam, Submission
+
+
+class Command(BaseCommand):
+    help = "Convert submitted submissions between Answer rows and packed answer storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--exam", type=int, help="Only this exam (default: every exam)")
+        parser.add_argument("--unpack", action="store_true", help="Packed blobs back to Answer rows")
+        parser.add_argument("--batch", type=int, default=200, help="Submissions converted per transaction")
+
+    def handle(self, *args, **options):
+        submissions = Submission.objects.all()
+        if options["exam"]:
+            if not Exam.objects.filter(id=options["exam"]).exists():
+                raise CommandError(f"Exam {options['exam']} does not exist")
+            submissions = submissions.filter(exam_id=options["exam"])
+
+        if options["unpack"]:
+            converted = unpack_submissions(submissions, options["batch"])
+            self.stdout.write(self.style.SUCCESS(f"Unpacked {converted} submissions into Answer rows"))
+        else:
+            converted = pack_submissions(submissions, options["batch"])
+            self.stdout.write(self.style.SUCCESS(f"Packed {converted} submissions"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from assessment.models import Exam
+from assessment.stats import rebuild_exam_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute materialized ExamStats (and leaderboards) from submissions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("exam_ids", nargs="*", type=int, help="Exams to rebuild (default: all not archived)")
+
+    def handle(self, *args, **options):
+        exam_ids = options["exam_ids"]
+        if exam_ids:
+            archived = list(Exam.objects.filter(id__in=exam_ids, archived_at__isnull=False).values_list("id", flat=True))
+            if archived:
+                raise CommandError(f"Exam {archived[0]} is archived")
+        else:
+            # archived exams keep the stats they had when archived
+            exam_ids = Exam.objects.filter(archived_at__isnull=True).values_list("id", flat=True)
+
+        for exam_id in exam_ids:
+            rebuild_exam_stats(exam_id)
+            self.stdout.write(f"Rebuilt stats for exam {exam_id}")
+
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,46 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessment.models import Exam
+from grading.regrade import regrade_exam
+
+
+class Command(BaseCommand):
+    help = "Re-grade every submission of an exam after its questions were corrected."
+
+    def add_arguments(self, parser):
+        parser.add_argument("exam_id", type=int)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Grading processes")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Answers per chunk")
+        parser.add_argument(
+            "--only-changed-questions",
+            action="store_true",
+            help="Only recompute answers graded against an older version of their question",
+        )
+
+    def handle(self, *args, **options):
+        exam_id = options["exam_id"]
+        exam = Exam.objects.filter(id=exam_id).first()
+        if exam is None:
+            raise CommandError(f"Exam {exam_id} does not exist")
+        if exam.archived_at:
+            raise CommandError(f"Exam {exam_id} is archived")
+
+        def progress(done, total):
+            self.stdout.write(f"  {done}/{total} answers")
+
+        report = regrade_exam(
+            exam_id,
+            chunk_size=options["chunk_size"],
+            workers=options["workers"],
+            only_changed_questions=options["only_changed_questions"],
+            progress=progress,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Regraded exam {exam_id}: {report.submissions} submissions, "
+            f"{report.answers_checked} answers checked, {report.answers_changed} changed, "
+            f"{report.answers_added} added in {report.seconds:.2f}s "
+            f"({report.throughput:.0f} answers/s)"
+        ))
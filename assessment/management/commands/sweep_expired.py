@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from assessment.idempotency import purge_expired
+from grading.expiry import sweep_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Auto-submit and grade exams whose time ran out without a submit, "
+        "and delete Idempotency-Keys past IDEMPOTENCY_TTL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=200, help="Submissions finalized per transaction")
+        parser.add_argument("--grace", type=int, default=30, help="Seconds past the deadline before sweeping")
+        parser.add_argument("--interval", type=float, default=60.0, help="Seconds between sweeps")
+        parser.add_argument("--once", action="store_true", help="Run a single sweep and exit")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            try:
+                finalized = sweep_expired(batch_size=options["batch"], grace=options["grace"])
+                purged = purge_expired()
+            except DatabaseError as exc:
+                # e.g. database is locked: keep the sweeper alive for the next pass
+                self.stderr.write(self.style.ERROR(f"sweep failed: {exc}"))
+                finalized = purged = 0
+
+            if finalized or options["once"]:
+                self.stdout.write(f"auto-submitted {finalized} expired submissions")
+            if purged:
+                self.stdout.write(f"purged {purged} expired idempotency keys")
+
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("Sweep done"))
@@ -0,0 +1,125 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    In-process metrics store rendered in Prometheus text format.
+
+    Each worker process keeps its own numbers; scrape every worker (or
+    run a single one) to get the full picture.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> float
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._help = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=(), buckets=LATENCY_BUCKETS):
+        with self._lock:
+            key = (name, labels)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+            for name in sorted({n for (n, _), _ in counters} | {n for (n, _), _ in histograms}):
+                kind, text = self._help.get(name, ("untyped", name))
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+                for (metric, labels), value in counters:
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+                for (metric, labels), histogram in histograms:
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        le = bound if bound == "+Inf" else _number(bound)
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+registry.describe("acad_http_requests_total", "counter", "HTTP requests by view, method and status")
+registry.describe("acad_http_request_duration_seconds", "histogram", "Request latency by view")
+registry.describe("acad_db_queries_per_request", "histogram", "SQL statements issued per request by view")
+registry.describe("acad_db_time_seconds_total", "counter", "Time spent in SQL by view")
+registry.describe("acad_grading_phase_seconds", "histogram", "Time spent in each grading phase")
+registry.describe("acad_slow_requests_total", "counter", "Requests slower than METRICS_SLOW_REQUEST_MS")
+registry.describe("acad_grading_memo_total", "counter", "Answers graded from the grade memo (hit) or computed (miss)")
+
+
+@contextmanager
+def grading_phase(phase):
+    """
+    Times a block of the grading pipeline:
+
+        with grading_phase("grade"):
+            ...
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe("acad_grading_phase_seconds", time.perf_counter() - started, (("phase", phase),))
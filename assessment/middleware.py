@@ -0,0 +1,135 @@
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import registry, QUERY_BUCKETS
+
+
+slow_logger = logging.getLogger("assessment.slow_requests")
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper hook: counts statements and SQL time,
+    and keeps the SQL text when the slow-request log is enabled.
+    """
+
+    def __init__(self, keep_sql, max_sql=50):
+        self.count = 0
+        self.seconds = 0.0
+        self.keep_sql = keep_sql
+        self.max_sql = max_sql
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if self.keep_sql and len(self.statements) < self.max_sql:
+                self.statements.append((round(elapsed * 1000, 2), sql))
+
+
+# The recorder for the request being served. A ContextVar (not a
+# per-connection wrapper) because async views run their queries on
+# Django's sync thread, which asgiref runs in a copy of this context.
+current_recorder = ContextVar("current_recorder", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    connection_created handler: route every connection's SQL through
+    record_query.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsMiddleware:
+    """
+    Records per-view latency, SQL statement count and SQL time for
+    /metrics. Views are labelled by their URL route so label
+    cardinality stays bounded. Requests slower than
+    METRICS_SLOW_REQUEST_MS are logged with their SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "METRICS_SLOW_REQUEST_MS", None)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        recorder = QueryRecorder(keep_sql=bool(self.slow_ms))
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+
+        self.record(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder(keep_sql=bool(self.slow_ms))
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+
+        self.record(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, recorder, elapsed):
+        view = _view_label(request)
+        labels = (("view", view),)
+
+        registry.inc(
+            "acad_http_requests_total",
+            labels + (("method", request.method), ("status", response.status_code)),
+        )
+        registry.observe("acad_http_request_duration_seconds", elapsed, labels)
+        registry.observe("acad_db_queries_per_request", recorder.count, labels, buckets=QUERY_BUCKETS)
+        registry.inc("acad_db_time_seconds_total", labels, recorder.seconds)
+
+        if self.slow_ms and elapsed * 1000 >= self.slow_ms:
+            registry.inc("acad_slow_requests_total", labels)
+            slow_logger.warning(
+                "Slow request %s %s (%s) %.1fms, %d queries, %.1fms SQL\n%s",
+                request.method,
+                request.path,
+                view,
+                elapsed * 1000,
+                recorder.count,
+                recorder.seconds * 1000,
+                "\n".join(f"  [{ms}ms] {sql}" for ms, sql in recorder.statements),
+            )
+
+
+def _view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.route or match.view_name
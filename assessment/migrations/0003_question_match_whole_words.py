@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0002_submission_is_submitted_submission_started_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='match_whole_words',
+            field=models.BooleanField(default=False),
+        ),
+    ]
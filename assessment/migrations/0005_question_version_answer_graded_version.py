@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0004_gradingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='graded_version',
+            # existing answers were graded against the current questions (version 1)
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='answer',
+            name='graded_version',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='version',
+            field=models.IntegerField(default=1),
+        ),
+    ]
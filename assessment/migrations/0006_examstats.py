@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0005_question_version_answer_graded_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamStats',
+            fields=[
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='assessment.exam')),
+                ('submission_count', models.IntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_sq_sum', models.FloatField(default=0)),
+                ('max_score', models.FloatField(blank=True, null=True)),
+                ('min_score', models.FloatField(blank=True, null=True)),
+                ('pass_count', models.IntegerField(default=0)),
+                ('leaderboard', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:34
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def drop_duplicate_answers(apps, schema_editor):
+    """
+    Older submits could store a question twice; keep the latest row.
+    """
+    Answer = apps.get_model('assessment', 'Answer')
+    duplicates = (
+        Answer.objects.values('submission_id', 'question_id')
+        .annotate(keep=Max('id'), rows=models.Count('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates.iterator():
+        Answer.objects.filter(
+            submission_id=row['submission_id'],
+            question_id=row['question_id'],
+        ).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0006_examstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='last_saved_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(drop_duplicate_answers, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='answer',
+            unique_together={('submission', 'question')},
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0007_answer_unique_submission_last_saved_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(condition=models.Q(('is_submitted', False)), fields=['exam', 'started_at'], name='submission_open_by_start'),
+        ),
+    ]
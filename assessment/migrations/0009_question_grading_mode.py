@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0008_submission_open_by_start'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='grading_mode',
+            field=models.CharField(choices=[('KEYWORDS', 'Keyword match'), ('SIMILARITY', 'TF-IDF similarity to the model answer')], default='KEYWORDS', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='model_answer',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0009_question_grading_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='result',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0010_submission_result'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=32, unique=True)),
+                ('text', models.TextField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='packed_answers',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0011_packed_answers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ArchivedSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submission_id', models.IntegerField(unique=True)),
+                ('exam_id', models.IntegerField(db_index=True)),
+                ('student_id', models.IntegerField()),
+                ('student_username', models.CharField(max_length=150)),
+                ('student_email', models.CharField(blank=True, max_length=254)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('total_score', models.FloatField(default=0)),
+                ('answers', models.BinaryField()),
+                ('result', models.BinaryField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['exam_id', 'student_id'], name='archived_by_exam_student')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0013_idempotent_responses'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['exam', 'is_submitted'], name='submission_by_exam_state'),
+        ),
+    ]
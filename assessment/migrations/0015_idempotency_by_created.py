@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessment', '0014_submission_by_exam_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='idempotentresponse',
+            index=models.Index(fields=['created_at'], name='idempotency_by_created'),
+        ),
+    ]
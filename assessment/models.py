@@ -6,6 +6,11 @@ QUESTION_TYPES = (
     ("THEORY", "Theory"),
 )
 
+THEORY_GRADING_MODES = (
+    ("KEYWORDS", "Keyword match"),
+    ("SIMILARITY", "TF-IDF similarity to the model answer"),
+)
+
 class Exam(models.Model):
     title = models.CharField(max_length=255)
     course = models.CharField(max_length=255)
@@ -14,6 +19,9 @@ class Exam(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # set by `manage.py archive_exam`: submissions now live in the archive database
+    archived_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     def __str__(self):
         return self.title
 
@@ -30,6 +38,24 @@ class Question(models.Model):
 
     # THEORY
     expected_keywords = models.JSONField(null=True, blank=True)
+    match_whole_words = models.BooleanField(default=False)  # "cell" won't match "cells"
+    grading_mode = models.CharField(max_length=10, choices=THEORY_GRADING_MODES, default="KEYWORDS")
+    model_answer = models.TextField(null=True, blank=True)  # reference text for SIMILARITY
+
+    # Bumped on every edit so regrades can find answers graded
+    # against an older version of the question.
+    version = models.IntegerField(default=1)
+
+    def save(self, *args, **kwargs):
+        if not self.pk or kwargs.get("force_insert"):
+            return super().save(*args, **kwargs)
+
+        # bumped in the UPDATE itself, so concurrent edits never share a version
+        self.version = models.F("version") + 1
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=["version"])
 
     def __str__(self):
         return self.text
@@ -40,12 +66,31 @@ class Submission(models.Model):
     
     started_at = models.DateTimeField(null=True, blank=True)
     submitted_at = models.DateTimeField(null=True, blank=True)
+    last_saved_at = models.DateTimeField(null=True, blank=True)  # latest autosave
     
     total_score = models.FloatField(default=0)
     is_submitted = models.BooleanField(default=False)
 
+    # result document rendered at grading time (JSON, maybe gzipped; see results.py)
+    result = models.BinaryField(null=True, blank=True, editable=False)
+
+    # packed answer storage: every answer of the submission in one blob
+    # instead of Answer rows (null = rows; see answer_store.py)
+    packed_answers = models.BinaryField(null=True, blank=True, editable=False)
+
     class Meta:
         unique_together = ('student', 'exam')# Prevent multiple submission
+        indexes = [
+            # submissions of an exam by state (stats, regrade, archive checks)
+            models.Index(fields=["exam", "is_submitted"], name="submission_by_exam_state"),
+            # open submissions of an exam by start time (expiry sweeper);
+            # partial, so it only holds exams in progress
+            models.Index(
+                fields=["exam", "started_at"],
+                condition=models.Q(is_submitted=False),
+                name="submission_open_by_start",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.student} - {self.exam}"
@@ -58,3 +103,117 @@ class Answer(models.Model):
     student_answer = models.TextField()
     score_awarded = models.FloatField(default=0)
     feedback = models.TextField(null=True, blank=True)
+    graded_version = models.IntegerField(default=0)  # Question.version used for the score
+
+    class Meta:
+        unique_together = ('submission', 'question')# One answer per question (autosave upserts)
+
+
+class FeedbackText(models.Model):
+    """
+    Interned feedback string; packed answers refer to feedback by id.
+    Rows are never changed or deleted.
+    """
+    digest = models.CharField(max_length=32, unique=True)  # blake2b of text
+    text = models.TextField()
+
+
+class IdempotentResponse(models.Model):
+    """
+    Response of a request sent with an Idempotency-Key header, replayed
+    when the client retries with the same key (see idempotency.py).
+    status_code is null while the first request is still running.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=32)  # blake2b of method, path and body
+    status_code = models.IntegerField(null=True, blank=True)
+    body = models.BinaryField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="idempotency_key_per_user"),
+        ]
+        indexes = [
+            # rows past IDEMPOTENCY_TTL (purge)
+            models.Index(fields=["created_at"], name="idempotency_by_created"),
+        ]
+
+
+class ArchivedSubmission(models.Model):
+    """
+    A graded submission of an archived exam, stored in the "archive"
+    database (see routers.py / archive.py). No foreign keys: exams and
+    users live in the default database.
+    """
+    submission_id = models.IntegerField(unique=True)  # id it had while live
+    exam_id = models.IntegerField(db_index=True)
+    student_id = models.IntegerField()
+    student_username = models.CharField(max_length=150)
+    student_email = models.CharField(max_length=254, blank=True)
+
+    started_at = models.DateTimeField(null=True, blank=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    total_score = models.FloatField(default=0)
+
+    answers = models.BinaryField()                  # self-contained, see archive.pack_answers
+    result = models.BinaryField(null=True, blank=True)  # result snapshot, as served live
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["exam_id", "student_id"], name="archived_by_exam_student"),
+        ]
+
+
+JOB_STATUSES = (
+    ("PENDING", "Pending"),
+    ("RUNNING", "Running"),
+    ("DONE", "Done"),
+    ("FAILED", "Failed"),
+)
+
+class GradingJob(models.Model):
+    """
+    Queued grading work for a submission (GRADING_ASYNC mode).
+    Drained by `manage.py grade_worker`.
+    """
+    submission = models.OneToOneField(Submission, related_name="grading_job", on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=JOB_STATUSES, default="PENDING")
+    attempts = models.IntegerField(default=0)
+    claimed_by = models.CharField(max_length=64, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"{self.submission} [{self.status}]"
+
+
+class ExamStats(models.Model):
+    """
+    Running aggregates for an exam, updated in the same transaction
+    that finalizes each submission (see assessment/stats.py).
+    Repair with `manage.py rebuild_exam_stats`.
+    """
+    exam = models.OneToOneField(Exam, primary_key=True, related_name="stats", on_delete=models.CASCADE)
+    submission_count = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_sq_sum = models.FloatField(default=0)  # for the standard deviation
+    max_score = models.FloatField(null=True, blank=True)
+    min_score = models.FloatField(null=True, blank=True)
+    pass_count = models.IntegerField(default=0)
+
+    # Top-N [{"submission", "student", "score"}], best first
+    leaderboard = models.JSONField(default=list, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.exam}"
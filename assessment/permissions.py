@@ -11,9 +11,10 @@ class IsExamOwner(BasePermission):
         if request.user and request.user.is_superuser:
             return True
 
-        return obj.created_by == request.user
+        # compare ids so the exam's creator is never loaded
+        return obj.created_by_id == request.user.id
 
 # A student can ONLY view their own submission
 class IsSubmissionOwner(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.student == request.user
+        return obj.student_id == request.user.id
@@ -0,0 +1,68 @@
+import gzip
+import hashlib
+from dataclasses import dataclass
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from .caching import ExamCache
+from .models import Exam, Question
+from .serializers import QuestionSerializer
+
+
+@dataclass(frozen=True)
+class QuestionPayload:
+    """
+    Pre-rendered student question list for one exam.
+    """
+    version: int        # bumped in-process on every question/exam change
+    etag: str           # strong, content-based (same in every worker)
+    data: tuple         # serializer output, for the browsable API
+    body: bytes         # JSON as DRF would render it
+    gzip_body: bytes    # gzip of body, or None when disabled / too small
+
+
+def build_payload(exam_id):
+    questions = Question.objects.filter(exam_id=exam_id).order_by("id")
+    data = QuestionSerializer(questions, many=True).data
+
+    # An exam with no questions still needs to exist
+    if not data and not Exam.objects.filter(id=exam_id).exists():
+        return None
+
+    body = JSONRenderer().render(data)
+
+    gzip_body = None
+    if getattr(settings, "QUESTION_PAYLOAD_GZIP", True) and len(body) >= 512:
+        gzip_body = gzip.compress(body, mtime=0)
+
+    return QuestionPayload(
+        version=payload_cache.version(exam_id),
+        etag='"%s"' % hashlib.sha256(body).hexdigest()[:32],
+        data=tuple(data),
+        body=body,
+        gzip_body=gzip_body,
+    )
+
+
+payload_cache = ExamCache(
+    build_payload,
+    maxsize=getattr(settings, "QUESTION_PAYLOAD_CACHE_SIZE", 256),
+    ttl=getattr(settings, "QUESTION_PAYLOAD_TTL", 300),
+)
+
+
+def get_question_payload(exam_id):
+    """
+    Returns the cached QuestionPayload for an exam, or None if the exam
+    does not exist.
+    """
+    return payload_cache.get(exam_id)
+
+
+async def aget_question_payload(exam_id):
+    return await payload_cache.aget(exam_id)
+
+
+def invalidate_question_payload(exam_id):
+    payload_cache.invalidate(exam_id)
@@ -0,0 +1,103 @@
+"""
+Student result documents (submit response and GET /result/).
+
+The document is rendered when a submission is graded and stored on
+Submission.result as JSON bytes, gzipped with RESULT_SNAPSHOT_GZIP, so
+repeat views are a single-row read sent back as-is. Regrades and
+question edits clear the stored snapshots of the exam; the next view
+rebuilds and stores it again.
+"""
+import gzip
+import json
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from .answer_store import load_answers
+from .models import Submission
+from grading.plans import get_grading_plan
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def exam_feedback_for(percentage):
+    if percentage >= 85:
+        return "Excellent performance! You demonstrated strong understanding."
+    elif percentage >= 70:
+        return "Good job! You have a solid grasp but there is room for improvement."
+    elif percentage >= 50:
+        return "Fair attempt. Revise the weak areas and try again."
+    return "Poor performance. You need to study more and retry."
+
+
+def build_result(plan, answers, score):
+    """
+    Graded result document shown to the student, answers in question
+    order. Question texts come from the plan, so no queries are made.
+    """
+    total_marks = plan.total_marks
+    percentage = round((score / total_marks) * 100, 2) if total_marks else 0
+    by_question = {a.question_id: a for a in answers}
+
+    return {
+        "total_score": score,
+        "total_marks": total_marks,
+        "percentage": percentage,
+        "exam_feedback": exam_feedback_for(percentage),
+        "answers": [
+            {
+                "question": question.text,
+                "student_answer": a.student_answer,
+                "score": a.score_awarded,
+                "feedback": a.feedback,
+            }
+            for question in plan.questions
+            if (a := by_question.get(question.id)) is not None
+        ],
+    }
+
+
+def render_result(document):
+    """
+    Bytes stored in Submission.result.
+    """
+    body = JSONRenderer().render(document)
+    if getattr(settings, "RESULT_SNAPSHOT_GZIP", True):
+        return gzip.compress(body, mtime=0)
+    return body
+
+
+def is_gzipped(blob):
+    return blob[:2] == GZIP_MAGIC
+
+
+def result_json(blob):
+    return gzip.decompress(blob) if is_gzipped(blob) else blob
+
+
+def load_result(submission):
+    """
+    Stored snapshot of a graded submission, rebuilt (and stored) when
+    it was cleared or predates snapshots.
+    """
+    if submission.result is not None:
+        return bytes(submission.result)
+
+    plan = get_grading_plan(submission.exam_id)
+    answers = load_answers(submission)
+    blob = render_result(build_result(plan, answers, submission.total_score))
+
+    # a regrade that finished meanwhile changed the score; keep its null
+    Submission.objects.filter(
+        pk=submission.pk, result__isnull=True, total_score=submission.total_score
+    ).update(result=blob)
+    return blob
+
+
+def invalidate_results(exam_id):
+    Submission.objects.filter(exam_id=exam_id, result__isnull=False).update(result=None)
+
+
+def result_data(blob):
+    return json.loads(result_json(blob))
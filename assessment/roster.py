@@ -0,0 +1,197 @@
+"""
+Bulk student provisioning (`manage.py import_students` and the staff
+bulk endpoint).
+
+• Uniqueness is checked with a few set-based queries, not two per user.
+• Passwords are hashed on a thread pool: PBKDF2 runs inside hashlib
+  with the GIL released, so threads use every core, and unlike a
+  process pool this is also safe inside a threaded web worker.
+• Users are inserted with bulk_create in one transaction; any invalid
+  row rejects the whole roster (existing usernames can be skipped).
+"""
+import csv
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import add_role_claims
+
+
+ROSTER_FIELDS = ("username", "email", "password", "first_name", "last_name")
+MIN_PASSWORD_LENGTH = 6  # same as RegisterSerializer
+LOOKUP_CHUNK = 500       # keeps IN (...) under SQLite's parameter limit
+
+username_validator = UnicodeUsernameValidator()
+
+
+@dataclass
+class RosterReport:
+    created: int = 0
+    skipped: list = field(default_factory=list)      # existing usernames
+    credentials: list = field(default_factory=list)  # generated passwords / tokens
+
+    def as_dict(self):
+        return {"created": self.created, "skipped": self.skipped, "credentials": self.credentials}
+
+
+def read_roster(handle):
+    """
+    CSV with a header row naming ROSTER_FIELDS; only `username` is required.
+    """
+    return csv.DictReader(handle)
+
+
+def _row_errors(row):
+    errors = []
+    if not row["username"]:
+        errors.append("Username is required")
+    elif len(row["username"]) > User._meta.get_field("username").max_length:
+        errors.append("Username is too long")
+    else:
+        try:
+            username_validator(row["username"])
+        except DjangoValidationError as exc:
+            errors.extend(exc.messages)
+
+    if row["email"]:
+        try:
+            validate_email(row["email"])
+        except DjangoValidationError as exc:
+            errors.extend(exc.messages)
+
+    if row["password"] and len(row["password"]) < MIN_PASSWORD_LENGTH:
+        errors.append(f"Password must have at least {MIN_PASSWORD_LENGTH} characters")
+    return errors
+
+
+def _existing(field_name, values):
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        found.update(
+            User.objects.filter(**{f"{field_name}__in": values[start:start + LOOKUP_CHUNK]})
+            .values_list(field_name, flat=True)
+        )
+    return found
+
+
+def validate_roster(rows, skip_existing=False):
+    """
+    Normalizes and checks every row. Returns (new rows, skipped usernames)
+    or raises ValidationError({"rows": {row number: [errors]}}).
+    """
+    rows = [{key: str(row.get(key) or "").strip() for key in ROSTER_FIELDS} for row in rows]
+    errors = {}
+
+    for number, row in enumerate(rows, start=1):
+        row_errors = _row_errors(row)
+        if row_errors:
+            errors[number] = row_errors
+
+    taken_usernames = _existing("username", {r["username"] for r in rows})
+    taken_emails = _existing("email", {r["email"] for r in rows if r["email"]})
+
+    seen_usernames, seen_emails = set(), set()
+    fresh, skipped = [], []
+
+    for number, row in enumerate(rows, start=1):
+        username, email = row["username"], row["email"]
+
+        if username in taken_usernames:
+            if skip_existing:
+                skipped.append(username)
+                continue
+            errors.setdefault(number, []).append("Username already taken")
+        if username in seen_usernames:
+            errors.setdefault(number, []).append("Duplicate username in roster")
+        if email and (email in taken_emails or email in seen_emails):
+            errors.setdefault(number, []).append("Email already in use")
+
+        seen_usernames.add(username)
+        if email:
+            seen_emails.add(email)
+        fresh.append(row)
+
+    if errors:
+        raise ValidationError({"rows": errors})
+
+    return fresh, skipped
+
+
+def provision_students(rows, workers=None, issue_tokens=False, skip_existing=False, batch_size=1000):
+    """
+    Creates student accounts for every roster row. Rows without a
+    password get a generated one, returned in report.credentials along
+    with JWT pairs when issue_tokens is set.
+    """
+    fresh, skipped = validate_roster(rows, skip_existing)
+    report = RosterReport(skipped=skipped)
+
+    generated = set()
+    for row in fresh:
+        if not row["password"]:
+            row["password"] = secrets.token_urlsafe(9)
+            generated.add(row["username"])
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        hashes = list(pool.map(make_password, (row["password"] for row in fresh)))
+
+    users = [
+        User(
+            username=row["username"],
+            email=row["email"],
+            first_name=row["first_name"],
+            last_name=row["last_name"],
+            password=hashed,
+            is_staff=False,
+            is_superuser=False,
+            is_active=True,
+        )
+        for row, hashed in zip(fresh, hashes)
+    ]
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batch_size)
+
+    report.created = len(users)
+
+    if issue_tokens or generated:
+        if users and users[0].pk is None:
+            # backends that cannot return ids from a bulk insert
+            ids = {}
+            for start in range(0, len(users), LOOKUP_CHUNK):
+                ids.update(
+                    User.objects.filter(username__in=[u.username for u in users[start:start + LOOKUP_CHUNK]])
+                    .values_list("username", "id")
+                )
+            for user in users:
+                user.id = ids[user.username]
+
+        for row, user in zip(fresh, users):
+            entry = {"username": user.username}
+            if user.username in generated:
+                entry["password"] = row["password"]
+            if issue_tokens:
+                refresh = add_role_claims(RefreshToken.for_user(user), user)
+                entry["refresh"] = str(refresh)
+                entry["access"] = str(refresh.access_token)
+            if len(entry) > 1:
+                report.credentials.append(entry)
+
+    return report
+
+
+def write_credentials(credentials, handle):
+    writer = csv.DictWriter(handle, fieldnames=["username", "password", "refresh", "access"])
+    writer.writeheader()
+    writer.writerows(credentials)
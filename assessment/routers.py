@@ -0,0 +1,124 @@
+from contextvars import ContextVar
+from contextlib import contextmanager
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+ARCHIVE_DB = "archive"
+ARCHIVE_MODELS = {"assessment.archivedsubmission"}
+
+
+class ArchiveRouter:
+    """
+    Keeps archived exams out of the live database: archive models are
+    read, written and migrated only on the "archive" database, and
+    nothing else is migrated there.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in ARCHIVE_MODELS:
+            return ARCHIVE_DB
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        is_archive_model = f"{app_label}.{model_name}" in ARCHIVE_MODELS
+        if db == ARCHIVE_DB:
+            return is_archive_model
+        if is_archive_model:
+            return False
+        return None
+
+
+# =========================
+# READ CONNECTION
+# =========================
+
+# True while a read-only view runs. Async views keep it across their
+# awaits (and asgiref's sync threads copy it), like metrics' recorder.
+reading = ContextVar("reading", default=False)
+
+
+def read_database_alias():
+    return getattr(settings, "READ_DATABASE", None)
+
+
+@contextmanager
+def read_database():
+    """
+    Reads inside the block go to READ_DATABASE (when configured).
+    """
+    token = reading.set(True)
+    try:
+        yield
+    finally:
+        reading.reset(token)
+
+
+def reads_only(handler):
+    """
+    Decorator for read-only view handlers, sync or async.
+    """
+    if iscoroutinefunction(handler):
+        @wraps(handler)
+        async def wrapper(*args, **kwargs):
+            with read_database():
+                return await handler(*args, **kwargs)
+    else:
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            with read_database():
+                return handler(*args, **kwargs)
+    return wrapper
+
+
+def read_iter(iterable):
+    """
+    Streams an iterable whose queries run lazily (streaming responses
+    are consumed after the view returned) from READ_DATABASE.
+    """
+    iterator = iter(iterable)
+    while True:
+        with read_database():
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class ReadRouter:
+    """
+    Sends the reads of reads_only() views to a second connection to the
+    same SQLite file (READ_DATABASE, made query_only), so they are not
+    queued behind the write transactions of the default connection.
+    Writes always go to the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = read_database_alias()
+        if alias and reading.get():
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db == read_database_alias():
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        live = {DEFAULT_DB_ALIAS, read_database_alias()}
+        if obj1._state.db in live and obj2._state.db in live:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # same file as the default database
+        if db == read_database_alias():
+            return False
+        return None
@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from .models import Exam, Question, Submission, Answer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
+from grading.plans import get_grading_plan
+from .authentication import add_role_claims
 
 class QuestionSerializer(serializers.ModelSerializer):
     """
@@ -48,6 +51,8 @@ class SubmissionSerializer(serializers.Serializer):
     • Prevents tampering or answering unrelated questions
     • Enforces MCQ option validation
       (students can only submit predefined options)
+    • answers may be omitted on submit: answers already autosaved
+      on the submission are graded
     • Supports DRF browsable API behavior:
         - MCQ -> dropdown selection
         - THEORY -> free text input
@@ -55,14 +60,14 @@ class SubmissionSerializer(serializers.Serializer):
     This guarantees only valid and secure data reaches
     the grading engine and business logic layer.
     """
-    answers = AnswerInputSerializer(many=True)
+    answers = AnswerInputSerializer(many=True, required=False)
 
     def validate(self, data):
         exam = self.context["exam"]
-        questions = exam.questions.all()
-        question_map = {q.id: q for q in questions}
+        plan = self.context.get("plan") or get_grading_plan(exam)
+        question_map = plan.question_map
 
-        for ans in data["answers"]:
+        for ans in data.get("answers", []):
             q = question_map.get(ans["question"])
 
             if not q:
@@ -70,9 +75,9 @@ class SubmissionSerializer(serializers.Serializer):
 
             # Prevent invalid MCQ answers
             if q.question_type == "MCQ":
-                if ans["answer"] not in q.options:
+                if ans["answer"] not in q.option_set:
                     raise serializers.ValidationError(
-                        f"Answer must be one of {q.options}"
+                        f"Answer must be one of {list(q.options)}"
                     )
         return data
 
@@ -101,14 +106,25 @@ class QuestionCreateSerializer(serializers.ModelSerializer):
             "options",
             "correct_answer",
             "expected_keywords",
+            "match_whole_words",
+            "grading_mode",
+            "model_answer",
         ]
         read_only_fields = ["id"]
     def validate(self, data):
-        if data["question_type"] == "MCQ":
-            if not data.get("options"):
+        # a PATCH checks the question as it will be saved
+        merged = dict(data)
+        if self.instance is not None:
+            for field in self.Meta.fields:
+                merged.setdefault(field, getattr(self.instance, field))
+        if merged["question_type"] == "MCQ":
+            if not merged.get("options"):
                 raise serializers.ValidationError("MCQ questions must include options")
-            if not data.get("correct_answer"):
+            if not merged.get("correct_answer"):
                 raise serializers.ValidationError("MCQ must have a correct answer")
+        elif merged.get("grading_mode") == "SIMILARITY":
+            if not (merged.get("model_answer") or "").strip() and not merged.get("expected_keywords"):
+                raise serializers.ValidationError("Similarity grading needs a model answer or expected keywords")
         return data
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -142,19 +158,28 @@ class RegisterSerializer(serializers.ModelSerializer):
             email=validated_data.get("email", ""),
             password=validated_data["password"],
             first_name=validated_data.get("first_name", ""),
-            last_name=validated_data.get("last_name", "")
+            last_name=validated_data.get("last_name", ""),
+            # only students can create account
+            is_staff=False,
+            is_superuser=False,
+            is_active=True,
         )
 
-        user.is_staff = False #only students can create account
-        user.is_superuser = False
-        user.is_active = True
-        user.save()
-
         return user
 
     def get_tokens_for_user(self, user):
-        refresh = RefreshToken.for_user(user)
+        refresh = add_role_claims(RefreshToken.for_user(user), user)
         return {
             "refresh": str(refresh),
             "access": str(refresh.access_token)
-        }# users get token on signup
\ No newline at end of file
+        }# users get token on signup
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Login tokens carry is_staff / is_superuser claims
+    (checked by CachedJWTAuthentication)
+    """
+    @classmethod
+    def get_token(cls, user):
+        return add_role_claims(super().get_token(user), user)
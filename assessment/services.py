@@ -1,17 +1,26 @@
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework.exceptions import ValidationError
+from .answer_store import graded_fields, load_answers, new_submission_defaults, store_pending, write_graded
+from .metrics import grading_phase
 from .models import Submission, Answer
-from grading.services import grade_submission
+from .results import build_result, render_result
+from .stats import record_submission
+from grading.plans import aget_grading_plan, get_grading_plan
+from grading.queue import enqueue_grading
+from grading.services import grade_answers
 from rest_framework import status
 
 
-def start_exam(user, exam):
-    submission, created = Submission.objects.get_or_create(
-        student=user,
-        exam=exam
-    )
-
+def _refuse_start(submission):
+    """
+    Response for a student who cannot (re)start, or None if the
+    exam should be started now.
+    """
     if submission.is_submitted:
         return {
             "status": "already_submitted",
@@ -24,9 +33,17 @@ def start_exam(user, exam):
             "message": "Exam already started"
         }, status.HTTP_200_OK
 
-    submission.started_at = timezone.now()
-    submission.save()
+    return None
+
 
+def _archived():
+    return {
+        "status": "archived",
+        "message": "This exam is closed"
+    }, status.HTTP_400_BAD_REQUEST
+
+
+def _started(submission):
     return {
         "status": "started",
         "message": "Exam started successfully",
@@ -34,18 +51,71 @@ def start_exam(user, exam):
     }, status.HTTP_200_OK
 
 
-def handle_submission(user, exam, answers):
+def start_exam(user, exam):
+    if exam.archived_at:
+        return _archived()
+
+    submission, created = Submission.objects.get_or_create(
+        student=user,
+        exam=exam,
+        defaults=new_submission_defaults()
+    )
+
+    refused = _refuse_start(submission)
+    if refused:
+        return refused
+
+    # conditional, so concurrent starts cannot move the start time
+    started_at = timezone.now()
+    if not Submission.objects.filter(
+        pk=submission.pk, started_at__isnull=True, is_submitted=False
+    ).update(started_at=started_at):
+        submission.refresh_from_db(fields=["started_at", "is_submitted"])
+        return _refuse_start(submission)
+
+    submission.started_at = started_at
+    return _started(submission)
+
+
+async def astart_exam(user, exam):
     """
-    Handles student exam submission:
-    - ensures exam started
-    - prevents multiple submissions
-    - enforces student-specific time limit
-    - saves answers
-    - triggers grading
-    - returns clean response structure (no crashes)
+    Async start_exam for the ASGI student views.
     """
+    if exam.archived_at:
+        return _archived()
+
+    submission, created = await Submission.objects.aget_or_create(
+        student=user,
+        exam=exam,
+        defaults=new_submission_defaults()
+    )
+
+    refused = _refuse_start(submission)
+    if refused:
+        return refused
+
+    started_at = timezone.now()
+    if not await Submission.objects.filter(
+        pk=submission.pk, started_at__isnull=True, is_submitted=False
+    ).aupdate(started_at=started_at):
+        await submission.arefresh_from_db(fields=["started_at", "is_submitted"])
+        return _refuse_start(submission)
+
+    submission.started_at = started_at
+    return _started(submission)
 
-    submission = Submission.objects.filter(student=user, exam=exam).first()
+
+def _already_submitted():
+    return {
+        "status": "already_submitted",
+        "message": "You already submitted this exam"
+    }, status.HTTP_400_BAD_REQUEST
+
+
+def _refuse_submission(submission, exam):
+    """
+    Response for a submission (or autosave) that cannot be accepted, or None.
+    """
 
     # ==============================
     # Exam Not Started
@@ -60,10 +130,7 @@ def handle_submission(user, exam, answers):
     # Already Submitted
     # ==============================
     if submission.is_submitted:
-        return {
-            "status": "already_submitted",
-            "message": "You already submitted this exam"
-        }, status.HTTP_400_BAD_REQUEST
+        return _already_submitted()
 
     # ==============================
     # Time Expired
@@ -76,29 +143,242 @@ def handle_submission(user, exam, answers):
             "message": "Time is up! You cannot submit anymore"
         }, status.HTTP_400_BAD_REQUEST
 
-    # ==============================
-    # Save Answers
-    # ==============================
-    for ans in answers:
-        Answer.objects.create(
+    return None
+
+
+def _pending_answers(submission, answers):
+    return list({
+        ans["question"]: Answer(
             submission=submission,
             question_id=ans["question"],
             student_answer=ans["answer"]
         )
+        for ans in answers
+    }.values())  # last answer per question wins
 
-    # ==============================
-    # Grade Submission
-    # ==============================
-    score, total_marks = grade_submission(submission)
 
-    submission.total_score = score
-    submission.submitted_at = timezone.now()
+# ==============================
+# Autosave
+# ==============================
+
+def _store_answers(submission, pending):
+    """
+    Upserts in-progress answers. Stamping last_saved_at only while the
+    submission is still open takes its row (write) lock first, so an
+    autosave can never land after the final submit has claimed it.
+    Returns the save time, or None if the submission is already final.
+    """
+    saved_at = timezone.now()
+
+    with transaction.atomic():
+        still_open = Submission.objects.filter(
+            pk=submission.pk, is_submitted=False
+        ).update(last_saved_at=saved_at)
+
+        if not still_open:
+            return None
+
+        store_pending(submission, pending)
+
+    return saved_at
+
+
+def _saved(pending, saved_at):
+    return {
+        "status": "saved",
+        "saved": len(pending),
+        "saved_at": saved_at
+    }, status.HTTP_200_OK
+
+
+def save_answers(user, exam, answers):
+    """
+    Autosave: stores (or replaces) answers on the running submission
+    without grading. Repeats of a question in one request collapse to
+    the last one, and the batch is written with one statement.
+    """
+    submission = Submission.objects.filter(student=user, exam=exam).first()
+
+    refused = _refuse_submission(submission, exam)
+    if refused:
+        return refused
+
+    pending = _pending_answers(submission, answers)
+    saved_at = _store_answers(submission, pending)
+    if saved_at is None:
+        return _already_submitted()
+
+    return _saved(pending, saved_at)
+
+
+async def asave_answers(user, exam, answers):
+    """
+    Async save_answers for the ASGI student views.
+    """
+    submission = await Submission.objects.filter(student=user, exam=exam).afirst()
+
+    refused = _refuse_submission(submission, exam)
+    if refused:
+        return refused
+
+    pending = _pending_answers(submission, answers)
+    saved_at = await sync_to_async(_store_answers)(submission, pending)
+    if saved_at is None:
+        return _already_submitted()
+
+    return _saved(pending, saved_at)
+
+
+# ==============================
+# Final submit
+# ==============================
+
+def _claim_submission(submission, pending):
+    """
+    Marks the submission submitted (only if it still is not), stores
+    any answers sent with the submit, and returns every stored answer
+    for grading, or None if another request claimed it first.
+    """
+    submitted_at = timezone.now()
+
+    with transaction.atomic():
+        claimed = Submission.objects.filter(
+            pk=submission.pk, is_submitted=False
+        ).update(is_submitted=True, submitted_at=submitted_at)
+
+        if not claimed:
+            return None
+
+        store_pending(submission, pending)
+
+        with grading_phase("load_answers"):
+            stored = load_answers(submission)
+
     submission.is_submitted = True
-    submission.save()
+    submission.submitted_at = submitted_at
+    return stored
+
+
+def _queue_submission(submission, pending):
+    """
+    Claims the submission and queues a grading job (GRADING_ASYNC).
+    """
+    with transaction.atomic():
+        if _claim_submission(submission, pending) is None:
+            return _already_submitted()
+
+        job = enqueue_grading(submission)
+
+    return {
+        "status": "queued",
+        "submission": submission,
+        "job": job
+    }, status.HTTP_202_ACCEPTED
+
+
+def _save_graded(submission, plan, graded, score):
+    """
+    Writes graded answers, the score and the result snapshot in one
+    transaction. The result document is built from the graded answers
+    in memory.
+    """
+    result = build_result(plan, graded, score)
+
+    with grading_phase("write"):
+        with transaction.atomic():
+            write_graded({submission: graded})
+
+            submission.total_score = score
+            submission.result = render_result(result)
+            submission.save(update_fields=graded_fields(submission, ["total_score", "result"]))
+
+            record_submission(submission, plan.total_marks)
 
     return {
         "status": "success",
         "submission": submission,
         "score": score,
-        "total_marks": total_marks
-    }, status.HTTP_201_CREATED
\ No newline at end of file
+        "total_marks": plan.total_marks,
+        "result": result,
+    }, status.HTTP_201_CREATED
+
+
+def handle_submission(user, exam, answers):
+    """
+    Handles student exam submission:
+    - ensures exam started
+    - prevents multiple submissions (the submission row is claimed
+      with a conditional update, so concurrent submits grade once)
+    - enforces student-specific time limit
+    - stores any answers sent with the submit, then grades every stored
+      answer (autosaved ones included) in one transaction
+      (or, with GRADING_ASYNC, queues a grading job)
+    - returns clean response structure (no crashes)
+    """
+
+    submission = Submission.objects.filter(student=user, exam=exam).first()
+
+    refused = _refuse_submission(submission, exam)
+    if refused:
+        return refused
+
+    pending = _pending_answers(submission, answers)
+
+    # ==============================
+    # Claim + Queue (async mode)
+    # ==============================
+    if getattr(settings, "GRADING_ASYNC", False):
+        return _queue_submission(submission, pending)
+
+    # ==============================
+    # Claim + Grade Answers
+    # ==============================
+    # Answers are graded in memory and written with bulk statements,
+    # so the statement count does not grow with the exam size.
+    with grading_phase("load_plan"):
+        plan = get_grading_plan(exam)
+
+    return _claim_and_grade(submission, plan, pending)
+
+
+def _claim_and_grade(submission, plan, pending):
+    """
+    Claims, grades and saves in one transaction: if anything fails the
+    claim rolls back with it and the student can submit again.
+    """
+    with transaction.atomic():
+        stored = _claim_submission(submission, pending)
+        if stored is None:
+            return _already_submitted()
+
+        with grading_phase("grade"):
+            graded, score, _ = grade_answers(submission, plan, stored)
+
+        return _save_graded(submission, plan, graded, score)
+
+
+async def ahandle_submission(user, exam, answers):
+    """
+    Async handle_submission for the ASGI student views.
+
+    Lookups use the async ORM; the claim, grading and the graded write
+    run as one sync_to_async call in the same transaction as the sync
+    path, so a crash never leaves a claimed submission without a result.
+    The call runs on the request's own sync thread, which finishes (and
+    commits or rolls back) even if the client disconnects.
+    """
+    submission = await Submission.objects.filter(student=user, exam=exam).afirst()
+
+    refused = _refuse_submission(submission, exam)
+    if refused:
+        return refused
+
+    pending = _pending_answers(submission, answers)
+
+    if getattr(settings, "GRADING_ASYNC", False):
+        return await sync_to_async(_queue_submission)(submission, pending)
+
+    with grading_phase("load_plan"):
+        plan = await aget_grading_plan(exam.id)
+
+    return await sync_to_async(_claim_and_grade)(submission, plan, pending)
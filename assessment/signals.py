@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .archive import delete_archived
+from .authentication import invalidate_cached_user
+from .models import Exam, Question
+from .question_payload import invalidate_question_payload
+from .results import invalidate_results
+from grading.plans import invalidate_grading_plan
+
+
+# Drop cached grading plans and question payloads (and stored result
+# snapshots, which show question texts) whenever exam structure changes.
+# Note: queryset.update() and bulk_create() do not send these signals.
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    invalidate_grading_plan(instance.exam_id)
+    invalidate_question_payload(instance.exam_id)
+    invalidate_results(instance.exam_id)
+
+
+@receiver([post_save, post_delete], sender=Exam)
+def exam_changed(sender, instance, **kwargs):
+    invalidate_grading_plan(instance.pk)
+    invalidate_question_payload(instance.pk)
+
+
+# The archive database has no foreign keys to cascade through.
+
+@receiver(post_delete, sender=Exam)
+def exam_deleted(sender, instance, **kwargs):
+    if instance.archived_at:
+        delete_archived(instance.pk)
+
+
+# Drop cached JWT users on any change (role, deactivation, password).
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
@@ -0,0 +1,28 @@
+"""
+Production SQLite profile (SQLITE_PRODUCTION, see settings.py).
+
+Every new connection gets SQLITE_PRAGMAS: WAL lets readers run while a
+submit is writing, busy_timeout makes a writer wait for the lock instead
+of failing with "database is locked", and synchronous=NORMAL only syncs
+at WAL checkpoints. The READ_DATABASE connection is also made
+query_only, so a view routed there can never write.
+"""
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    connection_created handler.
+    """
+    if connection.vendor != "sqlite":
+        return
+
+    pragmas = dict(getattr(settings, "SQLITE_PRAGMAS", None) or {})
+    if connection.alias == getattr(settings, "READ_DATABASE", None):
+        pragmas["query_only"] = "ON"
+    if not pragmas:
+        return
+
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,145 @@
+import math
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from rest_framework.exceptions import ValidationError
+
+from .models import Exam, ExamStats, Submission
+from grading.plans import get_grading_plan
+
+
+def _pass_mark(total_marks):
+    return total_marks * getattr(settings, "EXAM_PASS_PERCENTAGE", 50) / 100
+
+
+def _leaderboard_size():
+    return getattr(settings, "EXAM_LEADERBOARD_SIZE", 10)
+
+
+def _rank(entries):
+    # Highest score first, earlier submission wins ties
+    entries.sort(key=lambda e: (-e["score"], e["submission"]))
+    return entries[:_leaderboard_size()]
+
+
+def record_submission(submission, total_marks):
+    """
+    Folds one newly graded submission into its exam's stats.
+
+    Must run inside the transaction that finalizes the submission; the
+    stats row is locked (select_for_update, and on SQLite the write lock
+    the caller already holds) so concurrent submits cannot lose updates.
+    """
+    record_submissions(submission.exam_id, [submission], total_marks)
+
+
+def record_submissions(exam_id, submissions, total_marks):
+    """
+    record_submission for a batch of one exam's submissions, with a
+    single stats row update.
+    """
+    if not submissions:
+        return
+
+    stats, _ = ExamStats.objects.select_for_update().get_or_create(exam_id=exam_id)
+    board = stats.leaderboard
+
+    for submission in submissions:
+        score = submission.total_score
+
+        stats.submission_count += 1
+        stats.score_sum += score
+        stats.score_sq_sum += score * score
+        stats.max_score = score if stats.max_score is None else max(stats.max_score, score)
+        stats.min_score = score if stats.min_score is None else min(stats.min_score, score)
+        if total_marks and score >= _pass_mark(total_marks):
+            stats.pass_count += 1
+
+        if len(board) < _leaderboard_size() or score > board[-1]["score"]:
+            board.append({"submission": submission.id, "student": submission.student_id, "score": score})
+            board = _rank(board)
+
+    stats.leaderboard = board
+    stats.save()
+
+
+def rebuild_exam_stats(exam_id):
+    """
+    Recomputes an exam's stats from scratch (after regrades, or to repair).
+    Submissions still waiting in the grading queue are left out.
+
+    The stats row is locked before the submissions are read, so a submit
+    graded meanwhile is either in the recount or folded in after it.
+    Archived exams are refused: their submissions left the live tables,
+    and the stats kept at archive time are final.
+    """
+    if Exam.objects.filter(pk=exam_id, archived_at__isnull=False).exists():
+        raise ValidationError({"exam": [f"Exam {exam_id} is archived; its stats are final"]})
+
+    total_marks = get_grading_plan(exam_id).total_marks
+    graded = Submission.objects.filter(
+        Q(grading_job__isnull=True) | Q(grading_job__status="DONE"),
+        exam_id=exam_id,
+        is_submitted=True,
+    )
+
+    with transaction.atomic():
+        stats, _ = ExamStats.objects.select_for_update().get_or_create(exam_id=exam_id)
+
+        totals = graded.aggregate(
+            count=Count("id"),
+            score_sum=Sum("total_score"),
+            score_sq_sum=Sum(F("total_score") * F("total_score")),
+            max_score=Max("total_score"),
+            min_score=Min("total_score"),
+        )
+        passed = graded.filter(total_score__gte=_pass_mark(total_marks)).count() if total_marks else 0
+        top = graded.order_by("-total_score", "id").values_list("id", "student_id", "total_score")[:_leaderboard_size()]
+
+        stats.submission_count = totals["count"]
+        stats.score_sum = totals["score_sum"] or 0
+        stats.score_sq_sum = totals["score_sq_sum"] or 0
+        stats.max_score = totals["max_score"]
+        stats.min_score = totals["min_score"]
+        stats.pass_count = passed
+        stats.leaderboard = [
+            {"submission": sid, "student": student_id, "score": score}
+            for sid, student_id, score in top
+        ]
+        stats.save()
+
+
+def exam_stats_summary(exam_id):
+    """
+    O(1) read of an exam's dashboard numbers plus the named leaderboard.
+    """
+    stats = ExamStats.objects.filter(exam_id=exam_id).first() or ExamStats(exam_id=exam_id)
+    count = stats.submission_count
+
+    mean = stats.score_sum / count if count else None
+    std = None
+    if count > 1:
+        variance = (stats.score_sq_sum - count * mean * mean) / (count - 1)
+        std = round(math.sqrt(max(variance, 0)), 4)
+
+    names = dict(
+        User.objects.filter(id__in=[e["student"] for e in stats.leaderboard])
+        .values_list("id", "username")
+    ) if stats.leaderboard else {}
+
+    return {
+        "exam_id": exam_id,
+        "submissions": count,
+        "mean_score": round(mean, 4) if mean is not None else None,
+        "std_score": std,
+        "max_score": stats.max_score,
+        "min_score": stats.min_score,
+        "pass_rate": round(stats.pass_count / count, 4) if count else None,
+        "leaderboard": [
+            {"rank": i + 1, "student": names.get(e["student"]), "score": e["score"]}
+            for i, e in enumerate(stats.leaderboard)
+        ],
+        "updated_at": stats.updated_at,
+    }
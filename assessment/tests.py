@@ -1,3 +1,1875 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, router
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .analytics import _score_matrix, item_analysis
+from .authentication import user_cache
+from .caching import ExamCache
+from .exports import export_rows
+from .loadtest import load_plan, percentile, save_recording, synthetic_plan
+from .idempotency import arun_once, begin, request_fingerprint, response_cache
+from .metrics import registry
+from .archive import archive_exam
+from .answer_store import load_answers, load_answers_many, pack_submissions
+from .models import (
+    Answer, ArchivedSubmission, Exam, ExamStats, FeedbackText, GradingJob, IdempotentResponse, Question,
+    Submission,
+)
+from .permissions import IsExamOwner
+from .question_payload import get_question_payload, payload_cache
+from .roster import provision_students
+from .routers import ReadRouter, read_database, reading
+from .serializers import SubmissionSerializer
+from .services import _claim_submission, ahandle_submission, handle_submission, save_answers
+from .stats import exam_stats_summary, rebuild_exam_stats
+from grading.expiry import expired_submissions, finalize_batch, sweep_expired
+from grading.keyword_grader import grade_theory
+from grading.memo import grade_memo
+from grading.keyword_matcher import get_matcher
+from grading.plans import get_grading_plan, plan_cache
+from grading.queue import claim_jobs, run_job
+from grading.regrade import regrade_exam
+from grading.services import grade_answer, grade_batch, grade_submission
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+def make_exam(owner, size):
+    """
+    Builds an exam with `size` questions, alternating MCQ and THEORY.
+    """
+    exam = Exam.objects.create(title="Exam", course="Course", duration=60, created_by=owner)
+    Question.objects.bulk_create([
+        Question(
+            exam=exam,
+            text=f"Q{i}",
+            question_type="MCQ",
+            marks=2,
+            options=["a", "b", "c"],
+            correct_answer="a",
+        ) if i % 2 == 0 else Question(
+            exam=exam,
+            text=f"Q{i}",
+            question_type="THEORY",
+            marks=5,
+            expected_keywords=["cell", "unit of life"],
+        )
+        for i in range(size)
+    ])
+    return exam
+
+
+class SubmissionWritePathTests(TestCase):
+    """
+    The submit path must cost the same number of statements
+    whatever the exam size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def submit(self, size, answered):
+        student = User.objects.create_user(f"student{size}", password="pass1234")
+        exam = make_exam(self.staff, size)
+        Submission.objects.create(student=student, exam=exam, started_at=timezone.now())
+
+        questions = list(exam.questions.all())[:answered]
+        answers = [
+            {"question": q.id, "answer": "a" if q.question_type == "MCQ" else "a cell"}
+            for q in questions
+        ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            result, _ = handle_submission(student, exam, answers)
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(Answer.objects.filter(submission=result["submission"]).count(), size)
+        return len(ctx.captured_queries), result
+
+    def test_query_count_independent_of_exam_size(self):
+        small, _ = self.submit(10, answered=6)
+        large, _ = self.submit(100, answered=60)
+        self.assertEqual(small, large)
+
+    def test_unanswered_questions_get_zero_score(self):
+        _, result = self.submit(4, answered=2)
+        blanks = result["submission"].answers.filter(student_answer="")
+        self.assertEqual(blanks.count(), 2)
+        self.assertFalse(blanks.exclude(score_awarded=0).exists())
+        # 2 MCQ marks + half of 5 THEORY marks
+        self.assertEqual(result["score"], 4.5)
+        self.assertEqual(result["total_marks"], 14)
+
+    def test_regrade_query_count_independent_of_exam_size(self):
+        counts = []
+        for size in (10, 100):
+            _, result = self.submit(size, answered=size // 2)
+            submission = result["submission"]
+            with CaptureQueriesContext(connection) as ctx:
+                score, _ = grade_submission(submission)
+            self.assertEqual(score, result["score"])
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class ResultSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def submit(self, size, username="student"):
+        student = User.objects.create_user(username, password="pass1234")
+        exam = make_exam(self.staff, size)
+        Submission.objects.create(student=student, exam=exam, started_at=timezone.now())
+        self.client.force_login(student)
+        answers = [{"question": q.id, "answer": "b"} for q in exam.questions.filter(question_type="MCQ")]
+        response = self.client.post(f"/api/exams/{exam.id}/submit/", {"answers": answers}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        return exam, response.json()
+
+    def get_result(self, exam, **headers):
+        return self.client.get(f"/api/exams/{exam.id}/result/", headers=headers)
+
+    def test_result_is_the_stored_submit_document(self):
+        exam, submitted = self.submit(4)
+        submitted.pop("message")
+
+        plain = self.get_result(exam)
+        self.assertEqual(plain.json(), submitted)
+        self.assertEqual([a["question"] for a in submitted["answers"]], ["Q0", "Q1", "Q2", "Q3"])
+
+        compressed = self.get_result(exam, accept_encoding="gzip")
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(compressed.content)), submitted)
+
+    def test_query_count_independent_of_exam_size(self):
+        counts = []
+        for size in (10, 100):
+            exam, _ = self.submit(size, f"student{size}")
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.get_result(exam).status_code, 200)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_regrade_clears_and_view_rebuilds(self):
+        exam, _ = self.submit(2)
+        question = exam.questions.get(question_type="MCQ")
+        question.correct_answer = "b"
+        question.save()
+        self.assertFalse(Submission.objects.filter(result__isnull=False).exists())
+
+        regrade_exam(exam.id)
+        result = self.get_result(exam).json()
+
+        self.assertEqual(result["total_score"], 2)
+        self.assertEqual(result["answers"][0]["feedback"], "Correct answer")
+        self.assertTrue(Submission.objects.filter(result__isnull=False).exists())
+
+
+@override_settings(ANSWER_STORAGE="packed")
+class PackedAnswerStorageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def setUp(self):
+        self.exam = make_exam(self.staff, 4)
+        self.mcq = list(self.exam.questions.filter(question_type="MCQ").order_by("id"))
+        self.theory = list(self.exam.questions.filter(question_type="THEORY").order_by("id"))
+
+    def start(self, username):
+        student = User.objects.create_user(username, password="pass1234")
+        self.client.force_login(student)
+        self.assertEqual(self.client.post(f"/api/exams/{self.exam.id}/start/").status_code, 200)
+        return student
+
+    def send(self, method, path, answers):
+        return getattr(self.client, method)(
+            f"/api/exams/{self.exam.id}/{path}/", {"answers": answers}, content_type="application/json"
+        )
+
+    def test_autosave_and_submit_keep_no_answer_rows(self):
+        self.start("student")
+        self.send("patch", "answers", [{"question": self.mcq[0].id, "answer": "b"}, {"question": self.theory[0].id, "answer": "a cell"}])
+        self.send("patch", "answers", [{"question": self.mcq[0].id, "answer": "a"}])
+        response = self.send("post", "submit", [{"question": self.mcq[1].id, "answer": "a"}])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["total_score"], 6.5)  # 2 + 2 + half of 5
+        self.assertFalse(Answer.objects.exists())
+        submission = Submission.objects.get()
+        self.assertEqual(len(load_answers(submission)), 4)
+        self.assertEqual(self.client.get(f"/api/exams/{self.exam.id}/result/").json()["total_score"], 6.5)
+
+    def test_feedback_is_interned(self):
+        for i in range(5):
+            self.start(f"student{i}")
+            self.send("post", "submit", [{"question": q.id, "answer": "a"} for q in self.mcq])
+
+        # "Correct answer" and "No answer submitted"
+        self.assertEqual(FeedbackText.objects.count(), 2)
+
+    def test_regrade_export_and_analytics_read_packed(self):
+        for i in range(3):
+            self.start(f"student{i}")
+            self.send("post", "submit", [{"question": q.id, "answer": "b"} for q in self.mcq])
+
+        question = self.mcq[0]
+        question.correct_answer = "b"
+        question.save()
+        report = regrade_exam(self.exam.id)
+
+        self.assertEqual((report.answers_checked, report.answers_changed), (12, 3))
+        self.assertEqual(set(Submission.objects.values_list("total_score", flat=True)), {2})
+
+        self.client.force_login(self.staff)
+        rows = b"".join(self.client.get(f"/api/exams/{self.exam.id}/export/answers.csv").streaming_content).decode()
+        self.assertEqual(len(rows.splitlines()), 13)
+        self.assertIn(",MCQ,b,2.0,Correct answer", rows)
+        analytics = self.client.get(f"/api/exams/{self.exam.id}/analytics/").json()
+        self.assertEqual(analytics["questions"][0]["difficulty"], 1.0)
+
+    def test_expired_submissions_are_swept(self):
+        self.start("student")
+        self.send("patch", "answers", [{"question": self.mcq[0].id, "answer": "a"}])
+        Submission.objects.update(started_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(sweep_expired(), 1)
+        self.assertEqual(Submission.objects.get().total_score, 2)
+        self.assertFalse(Answer.objects.exists())
+
+    @override_settings(ANSWER_STORAGE="rows")
+    def test_pack_answers_command_round_trip(self):
+        for i in range(3):
+            self.start(f"student{i}")
+            self.send("post", "submit", [{"question": self.mcq[0].id, "answer": "a"}])
+        expected = sorted(Answer.objects.values_list("submission_id", "question_id", "score_awarded", "feedback"))
+
+        call_command("pack_answers", exam=self.exam.id, batch=2, stdout=StringIO())
+        self.assertFalse(Answer.objects.exists())
+        packed = load_answers_many(list(Submission.objects.all()))
+        self.assertEqual(
+            sorted((a.submission_id, a.question_id, a.score_awarded, a.feedback) for answers in packed.values() for a in answers),
+            expected,
+        )
+
+        call_command("pack_answers", unpack=True, stdout=StringIO())
+        self.assertEqual(sorted(Answer.objects.values_list("submission_id", "question_id", "score_awarded", "feedback")), expected)
+        self.assertFalse(Submission.objects.filter(packed_answers__isnull=False).exists())
+
+
+class AutosaveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+        cls.student = User.objects.create_user("student", password="pass1234")
+
+    def setUp(self):
+        self.exam = make_exam(self.staff, 4)
+        self.mcq, self.theory = self.exam.questions.order_by("id")[:2]
+        self.url = f"/api/exams/{self.exam.id}"
+        self.client.force_login(self.student)
+        self.client.post(f"{self.url}/start/")
+
+    def autosave(self, *answers):
+        return self.client.patch(
+            f"{self.url}/answers/",
+            {"answers": [{"question": q.id, "answer": a} for q, a in answers]},
+            content_type="application/json",
+        )
+
+    def test_submit_grades_autosaved_answers(self):
+        self.assertEqual(self.autosave((self.mcq, "b"), (self.theory, "cell")).json()["saved"], 2)
+        self.autosave((self.mcq, "a"))  # later save replaces the earlier one
+
+        response = self.client.post(f"{self.url}/submit/", {}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        # 2 MCQ marks + half of 5 THEORY marks
+        self.assertEqual(response.json()["total_score"], 4.5)
+        self.assertEqual(Answer.objects.filter(submission__student=self.student).count(), 4)
+
+    def test_submit_body_overrides_autosave(self):
+        self.autosave((self.mcq, "b"))
+        response = self.client.post(
+            f"{self.url}/submit/",
+            {"answers": [{"question": self.mcq.id, "answer": "a"}]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.json()["total_score"], 2)
+
+    def test_autosave_is_one_write_whatever_the_batch(self):
+        counts = []
+        for size in (2, 40):
+            exam = make_exam(self.staff, size)
+            Submission.objects.create(student=self.student, exam=exam, started_at=timezone.now())
+            answers = [{"question": q.id, "answer": "a"} for q in exam.questions.all()]
+            with CaptureQueriesContext(connection) as ctx:
+                result, _ = save_answers(self.student, exam, answers)
+            self.assertEqual(result["saved"], size)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_autosave_refused_after_submit(self):
+        self.client.post(f"{self.url}/submit/", {}, content_type="application/json")
+        response = self.autosave((self.mcq, "b"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["status"], "already_submitted")
+
+    def test_racing_submit_cannot_claim_twice(self):
+        stale = Submission.objects.get(student=self.student, exam=self.exam)
+        handle_submission(self.student, self.exam, [])
+
+        # a request that read the row before the first submit committed
+        self.assertFalse(stale.is_submitted)
+        self.assertIsNone(_claim_submission(stale, []))
+        self.assertEqual(ExamStats.objects.get(exam=self.exam).submission_count, 1)
+
+
+class ExpirySweepTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def setUp(self):
+        self.exam = make_exam(self.staff, 4)  # 60 minutes
+        self.mcq = self.exam.questions.filter(question_type="MCQ").first()
+
+    def start(self, username, minutes_ago, answer=None):
+        student = User.objects.create_user(username, password="pass1234")
+        submission = Submission.objects.create(
+            student=student,
+            exam=self.exam,
+            started_at=timezone.now() - timedelta(minutes=minutes_ago),
+        )
+        if answer:
+            Answer.objects.create(submission=submission, question=self.mcq, student_answer=answer)
+        return submission
+
+    def test_expired_submissions_are_graded(self):
+        expired = self.start("late", 90, answer="a")
+        running = self.start("running", 10, answer="a")
+
+        self.assertEqual(sweep_expired(grace=0), 1)
+
+        expired.refresh_from_db()
+        running.refresh_from_db()
+        self.assertTrue(expired.is_submitted)
+        self.assertEqual(expired.total_score, 2)
+        self.assertEqual(expired.answers.count(), 4)
+        self.assertFalse(running.is_submitted)
+        self.assertEqual(exam_stats_summary(self.exam.id)["submissions"], 1)
+
+    def test_batches_and_grace(self):
+        for i in range(5):
+            self.start(f"s{i}", 61)
+
+        self.assertEqual(sweep_expired(grace=120), 0)
+        self.assertEqual(sweep_expired(batch_size=2, grace=0), 5)
+        self.assertEqual(sweep_expired(grace=0), 0)
+        self.assertEqual(ExamStats.objects.get(exam=self.exam).submission_count, 5)
+
+    def test_live_submit_wins_the_race(self):
+        won = self.start("won", 90)
+        swept = self.start("swept", 90)
+        Submission.objects.filter(pk=won.pk).update(is_submitted=True, total_score=7)
+
+        self.assertEqual(finalize_batch(self.exam, [won.pk, swept.pk], timezone.now()), 1)
+        won.refresh_from_db()
+        self.assertEqual(won.total_score, 7)
+        self.assertFalse(won.answers.exists())
+
+    def test_locked_exam_does_not_stop_the_sweep(self):
+        other = make_exam(self.staff, 2)
+        self.start("late", 90)
+        Submission.objects.create(
+            student=User.objects.create_user("other", password="pass1234"),
+            exam=other,
+            started_at=timezone.now() - timedelta(minutes=90),
+        )
+
+        def locked(exam, batch, now):
+            if exam.id == self.exam.id:
+                raise OperationalError("database is locked")
+            return finalize_batch(exam, batch, now)
+
+        with patch("grading.expiry.finalize_batch", side_effect=locked), \
+                self.assertLogs("grading.expiry", "ERROR"):
+            self.assertEqual(sweep_expired(grace=0), 1)
+        self.assertEqual(sweep_expired(grace=0), 1)  # picked up on the next sweep
+
+    def test_archived_exams_are_skipped(self):
+        self.start("late", 90)
+        Exam.objects.filter(pk=self.exam.pk).update(archived_at=timezone.now())
+        self.assertEqual(sweep_expired(grace=0), 0)
+
+    def test_command_survives_database_errors(self):
+        err = StringIO()
+        with patch("assessment.management.commands.sweep_expired.sweep_expired",
+                   side_effect=OperationalError("database is locked")):
+            call_command("sweep_expired", "--once", stdout=StringIO(), stderr=err)
+        self.assertIn("database is locked", err.getvalue())
+
+    def test_expiry_query_uses_index(self):
+        plan = expired_submissions(self.exam, timezone.now()).explain()
+        self.assertIn("USING INDEX submission_open_by_start", plan)
+        self.assertIn("started_at<?", plan.replace(" ", ""))
+
+
+def question_rows(count):
+    return [
+        {"text": f"Q{i}", "question_type": "MCQ", "marks": 2, "options": ["a", "b"], "correct_answer": "a"}
+        if i % 2 == 0 else
+        {"text": f"Q{i}", "question_type": "THEORY", "marks": 5, "expected_keywords": ["cell"]}
+        for i in range(count)
+    ]
+
+
+class ExamImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def post(self, questions):
+        return self.client.post(
+            "/api/exams/import/",
+            {"title": "Bank", "course": "BIO", "duration": 30, "questions": questions},
+            content_type="application/json",
+        )
+
+    def test_nested_import_query_count_is_flat(self):
+        counts = []
+        # 80 rows still fit one SQLite insert (999 parameters)
+        for size in (10, 80):
+            with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+                response = self.post(question_rows(size))
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json()["questions_created"], size)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+        exam = Exam.objects.get(id=response.json()["exam"]["id"])
+        self.assertEqual(exam.questions.count(), 80)
+        self.assertEqual(len(get_grading_plan(exam).questions), 80)
+
+    def test_invalid_row_saves_nothing(self):
+        rows = question_rows(10)
+        rows[7] = {"text": "broken", "question_type": "MCQ", "marks": 1}
+
+        response = self.post(rows)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("8", response.json()["questions"])
+        self.assertFalse(Exam.objects.exists())
+
+    def test_students_cannot_import(self):
+        self.client.force_login(User.objects.create_user("student", password="pass1234"))
+        self.assertEqual(self.post(question_rows(2)).status_code, 403)
+
+    def test_import_command_jsonl_streams_into_existing_exam(self):
+        exam = make_exam(self.staff, 2)
+        get_grading_plan(exam)  # cached before the import
+
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as handle:
+            handle.write("\n".join(json.dumps(row) for row in question_rows(25)) + "\n\n")
+            handle.flush()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("import_exam", handle.name, exam=exam.id, chunk_size=4, stdout=StringIO())
+
+        self.assertEqual(exam.questions.count(), 27)
+        self.assertEqual(len(get_grading_plan(exam).questions), 27)
+
+    def test_import_command_csv_creates_exam(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="") as handle:
+            handle.write(
+                "text,question_type,marks,options,correct_answer,expected_keywords,match_whole_words\n"
+                "Colour of leaves?,MCQ,2,green|red,green,,\n"
+                "What is a cell?,THEORY,5,,,\"[\"\"unit of life\"\", \"\"cell\"\"]\",true\n"
+            )
+            handle.flush()
+            call_command(
+                "import_exam", handle.name,
+                title="CSV", course="BIO", duration=20, owner="staff", stdout=StringIO(),
+            )
+
+        mcq, theory = Exam.objects.get(title="CSV").questions.order_by("id")
+        self.assertEqual(mcq.options, ["green", "red"])
+        self.assertEqual(theory.expected_keywords, ["unit of life", "cell"])
+        self.assertTrue(theory.match_whole_words)
+
+    def test_import_command_reports_errors(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as handle:
+            handle.write(json.dumps({"text": "no type"}) + "\n")
+            handle.flush()
+            with self.assertRaisesMessage(CommandError, "nothing was saved"):
+                call_command(
+                    "import_exam", handle.name,
+                    title="Bad", course="BIO", duration=20, owner="staff", stdout=StringIO(),
+                )
+        self.assertFalse(Exam.objects.filter(title="Bad").exists())
+
+
+
+def roster_rows(count, prefix="s"):
+    return [
+        {"username": f"{prefix}{i}", "email": f"{prefix}{i}@uni.edu", "password": f"secret-{i}"}
+        for i in range(count)
+    ]
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class RosterImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def test_query_count_does_not_grow_with_roster(self):
+        counts = []
+        for prefix, size in (("a", 10), ("b", 90)):
+            with CaptureQueriesContext(connection) as ctx:
+                report = provision_students(roster_rows(size, prefix), workers=2)
+            self.assertEqual(report.created, size)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+        student = User.objects.get(username="b7")
+        self.assertTrue(student.check_password("secret-7"))
+        self.assertFalse(student.is_staff)
+
+    def test_bad_rows_save_nothing(self):
+        rows = roster_rows(5)
+        rows[1]["email"] = "not-an-email"
+        rows[3]["username"] = "s0"
+        rows.append({"username": "staff", "password": "short"})
+
+        with self.assertRaises(ValidationError) as ctx:
+            provision_students(rows)
+
+        errors = ctx.exception.detail["rows"]
+        self.assertEqual(sorted(errors), [2, 4, 6])
+        self.assertIn("Duplicate username in roster", errors[4])
+        self.assertIn("Username already taken", errors[6])
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_skip_existing_and_generated_passwords(self):
+        rows = roster_rows(2) + [{"username": "staff"}, {"username": "nopass"}]
+
+        report = provision_students(rows, skip_existing=True, issue_tokens=True)
+
+        self.assertEqual(report.created, 3)
+        self.assertEqual(report.skipped, ["staff"])
+        credentials = {entry["username"]: entry for entry in report.credentials}
+        self.assertNotIn("password", credentials["s0"])
+        password = credentials["nopass"]["password"]
+        self.assertTrue(User.objects.get(username="nopass").check_password(password))
+        token = AccessToken(credentials["s1"]["access"])
+        self.assertEqual(token["user_id"], User.objects.get(username="s1").id)
+        self.assertFalse(token["is_staff"])
+
+    def test_command_writes_credentials(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="") as roster, \
+                tempfile.NamedTemporaryFile("r", suffix=".csv") as output:
+            roster.write("username,email,first_name\nada,ada@uni.edu,Ada\nbob,,Bob\n")
+            roster.flush()
+            out = StringIO()
+            call_command("import_students", roster.name, output=output.name, tokens=True, stdout=out)
+
+            written = list(csv.DictReader(output))
+
+        self.assertIn("Created 2 students", out.getvalue())
+        self.assertEqual([row["username"] for row in written], ["ada", "bob"])
+        self.assertTrue(User.objects.get(username="bob").check_password(written[1]["password"]))
+        self.assertTrue(written[0]["access"])
+
+    def test_command_rejects_invalid_roster(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="") as roster:
+            roster.write("username,password\nada,abc\n")
+            roster.flush()
+            with self.assertRaises(CommandError):
+                call_command("import_students", roster.name, stdout=StringIO())
+        self.assertFalse(User.objects.filter(username="ada").exists())
+
+    def test_bulk_endpoint_is_staff_only_and_capped(self):
+        url = "/api/auth/students/bulk/"
+        self.client.force_login(User.objects.create_user("student", password="pass1234"))
+        self.assertEqual(self.client.post(url, {"students": roster_rows(2)}, content_type="application/json").status_code, 403)
+
+        self.client.force_login(self.staff)
+        response = self.client.post(url, {"students": roster_rows(3)}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created"], 3)
+
+        with self.settings(ROSTER_BULK_MAX=2):
+            response = self.client.post(url, {"students": roster_rows(3, "x")}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.filter(username="x0").exists())
+
+        # a class-sized roster is refused before any password is hashed
+        with patch("assessment.views.provision_students") as provision:
+            response = self.client.post(url, {"students": roster_rows(51, "y")}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("import_students", response.json()["students"][0])
+        provision.assert_not_called()
+
+class KeywordMatcherTests(TestCase):
+
+    def test_matches_original_substring_semantics(self):
+        score, feedback = grade_theory("The Cell is the basic UNIT of life", ["cell", "unit", "nucleus"], 6)
+        self.assertEqual(score, 4.0)
+        self.assertEqual(feedback, "Matched keywords: ['cell', 'unit']")
+
+    def test_no_match_feedback(self):
+        self.assertEqual(
+            grade_theory("nothing here", ["cell"], 5),
+            (0.0, "Poor answer. No key concepts found")
+        )
+
+    def test_duplicate_keywords_count_twice(self):
+        score, _ = grade_theory("cell", ["cell", "Cell", "wall"], 3)
+        self.assertEqual(score, 2.0)
+
+    def test_word_boundary(self):
+        matcher = get_matcher(["cell", "cell wall"], word_boundary=True)
+        self.assertEqual(matcher.match("cells have a cell wall"), ["cell", "cell wall"])
+        self.assertEqual(matcher.match("cells everywhere"), [])
+        self.assertEqual(get_matcher(["cell"]).match("cells everywhere"), ["cell"])
+
+    def test_matcher_cached_per_keyword_list(self):
+        self.assertIs(get_matcher(["a", "b"]), get_matcher(["a", "b"]))
+        self.assertIsNot(get_matcher(["a", "b"]), get_matcher(["a", "c"]))
+
+
+class GradingPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def setUp(self):
+        plan_cache.clear()
+        self.exam = make_exam(self.staff, 4)
+
+    def test_plan_cached_after_first_load(self):
+        plan = get_grading_plan(self.exam)
+        self.assertEqual(plan.total_marks, 14)
+        with self.assertNumQueries(0):
+            self.assertIs(get_grading_plan(self.exam.id), plan)
+
+    def test_validation_uses_cached_plan(self):
+        mcq = self.exam.questions.filter(question_type="MCQ").first()
+        get_grading_plan(self.exam)
+
+        with self.assertNumQueries(0):
+            valid = SubmissionSerializer(
+                data={"answers": [{"question": mcq.id, "answer": "a"}]},
+                context={"exam": self.exam}
+            ).is_valid()
+            invalid = SubmissionSerializer(
+                data={"answers": [{"question": mcq.id, "answer": "z"}]},
+                context={"exam": self.exam}
+            ).is_valid()
+        self.assertTrue(valid)
+        self.assertFalse(invalid)
+
+    def test_question_save_invalidates_plan(self):
+        plan = get_grading_plan(self.exam)
+        question = self.exam.questions.first()
+        question.marks = 10
+        question.save()
+        self.assertEqual(get_grading_plan(self.exam).total_marks, plan.total_marks + 8)
+
+    def test_concurrent_edits_get_distinct_versions(self):
+        first = self.exam.questions.first()
+        second = Question.objects.get(pk=first.pk)  # another request's copy
+
+        first.correct_answer = "b"
+        first.save()
+        second.marks = 10
+        second.save()
+
+        self.assertEqual((first.version, second.version), (2, 3))
+        self.assertEqual(Question.objects.get(pk=first.pk).version, 3)
+
+    def test_question_delete_invalidates_plan(self):
+        get_grading_plan(self.exam)
+        self.exam.questions.first().delete()
+        self.assertEqual(len(get_grading_plan(self.exam).questions), 3)
+
+    def test_cache_versions_stay_bounded(self):
+        cache = ExamCache(lambda exam_id: exam_id, maxsize=2)
+        for exam_id in range(1, 100):
+            cache.get(exam_id)
+            cache.invalidate(exam_id)
+            cache.invalidate(exam_id + 1000)  # never cached
+        self.assertLessEqual(len(cache._versions), 2)
+
+        version = cache.version(1)
+        cache.invalidate(1)
+        self.assertGreater(cache.version(1), version)
+
+    def test_failed_build_is_not_left_building(self):
+        def build(exam_id):
+            raise RuntimeError("database went away")
+
+        cache = ExamCache(build)
+        with self.assertRaises(RuntimeError):
+            cache.get(1)
+        self.assertEqual((cache._building, cache._versions), ({}, {}))
+
+    def test_build_racing_invalidation_not_stored(self):
+        def build(exam_id):
+            cache.invalidate(exam_id)  # staff edit while the plan is built
+            return "stale"
+
+        cache = ExamCache(build)
+        self.assertEqual(cache.get(1), "stale")
+        self.assertEqual(len(cache._entries), 0)
+
+
+@override_settings(GRADING_ASYNC=True)
+class AsyncGradingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+        cls.student = User.objects.create_user("student", password="pass1234")
+
+    def setUp(self):
+        self.exam = make_exam(self.staff, 4)
+        Submission.objects.create(student=self.student, exam=self.exam, started_at=timezone.now())
+        self.client.force_login(self.student)
+
+    def submit(self):
+        mcq = self.exam.questions.filter(question_type="MCQ").first()
+        return self.client.post(
+            f"/api/exams/{self.exam.id}/submit/",
+            {"answers": [{"question": mcq.id, "answer": "a"}]},
+            content_type="application/json",
+        )
+
+    def test_submit_queues_job_and_worker_grades_it(self):
+        response = self.submit()
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.json()["status_url"].endswith(f"/api/exams/{self.exam.id}/result/"))
+
+        pending = self.client.get(f"/api/exams/{self.exam.id}/result/")
+        self.assertEqual(pending.status_code, 202)
+        self.assertEqual(pending.json()["status"], "pending")
+
+        jobs = claim_jobs(10)
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(claim_jobs(10), [])  # already claimed
+        self.assertTrue(run_job(jobs[0]))
+
+        result = self.client.get(f"/api/exams/{self.exam.id}/result/")
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.json()["total_score"], 2)
+        self.assertEqual(len(result.json()["answers"]), 4)
+
+    def test_reclaimed_job_is_counted_once(self):
+        self.submit()
+        stale = claim_jobs(1, "worker-a")[0]
+        GradingJob.objects.filter(pk=stale.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        fresh = claim_jobs(1, "worker-a")[0]  # same worker, after its lease ran out
+
+        # the stale claim finishes late: its grade and stats roll back
+        self.assertFalse(run_job(stale))
+        self.assertFalse(ExamStats.objects.filter(exam=self.exam, submission_count__gt=0).exists())
+        self.assertEqual(GradingJob.objects.get().status, "RUNNING")
+
+        self.assertTrue(run_job(fresh))
+        self.assertFalse(run_job(stale))
+        self.assertEqual(GradingJob.objects.get().status, "DONE")
+        self.assertEqual(ExamStats.objects.get(exam=self.exam).submission_count, 1)
+
+    def test_failed_job_is_retried(self):
+        self.submit()
+        job = claim_jobs(1)[0]
+        with patch("grading.queue.grade_submission", side_effect=RuntimeError("boom")):
+            self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "PENDING")
+        self.assertIn("boom", job.error)
+        self.assertEqual(len(claim_jobs(1)), 1)
+
+
+class RegradeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def setUp(self):
+        self.exam = make_exam(self.staff, 4)
+        self.submissions = []
+        for i in range(3):
+            student = User.objects.create_user(f"student{i}", password="pass1234")
+            Submission.objects.create(student=student, exam=self.exam, started_at=timezone.now())
+            answers = [{"question": q.id, "answer": "b"} for q in self.exam.questions.filter(question_type="MCQ")]
+            result, _ = handle_submission(student, self.exam, answers)
+            self.submissions.append(result["submission"])
+
+    def test_regrade_after_fixing_correct_answer(self):
+        question = self.exam.questions.filter(question_type="MCQ").first()
+        question.correct_answer = "b"
+        question.save()
+
+        report = regrade_exam(self.exam.id, chunk_size=5)
+
+        self.assertEqual(report.answers_checked, 12)
+        self.assertEqual(report.answers_changed, 3)
+        for submission in self.submissions:
+            submission.refresh_from_db()
+            self.assertEqual(submission.total_score, 2)
+
+    def test_patch_correct_answer_then_regrade(self):
+        question = self.exam.questions.filter(question_type="MCQ").first()
+        self.client.force_login(self.staff)
+        response = self.client.patch(
+            f"/api/exams/questions/{question.id}/", {"correct_answer": "b"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["correct_answer"], "b")
+
+        report = regrade_exam(self.exam.id, only_changed_questions=True)
+
+        self.assertEqual(report.answers_changed, 3)
+        for submission in self.submissions:
+            submission.refresh_from_db()
+            self.assertEqual(submission.total_score, 2)
+
+    def test_patch_rejects_mcq_without_correct_answer(self):
+        question = self.exam.questions.filter(question_type="MCQ").first()
+        self.client.force_login(self.staff)
+        response = self.client.patch(
+            f"/api/exams/questions/{question.id}/", {"correct_answer": ""}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_changed_questions(self):
+        question = self.exam.questions.filter(question_type="THEORY").first()
+        question.expected_keywords = ["b"]
+        question.save()
+
+        report = regrade_exam(self.exam.id, only_changed_questions=True)
+
+        self.assertEqual(report.answers_checked, 3)
+        self.assertEqual(report.answers_changed, 3)
+        self.assertEqual(regrade_exam(self.exam.id, only_changed_questions=True).answers_checked, 0)
+
+    def test_regrade_endpoint_is_staff_only(self):
+        self.client.force_login(self.staff)
+        response = self.client.post(f"/api/exams/{self.exam.id}/regrade/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["answers_checked"], 12)
+
+        self.client.force_login(User.objects.get(username="student0"))
+        response = self.client.post(f"/api/exams/{self.exam.id}/regrade/")
+        self.assertEqual(response.status_code, 403)
+
+
+class GradeMemoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def setUp(self):
+        grade_memo.clear()
+        self.exam = make_exam(self.staff, 2)
+        self.mcq, self.theory = self.exam.questions.order_by("id")
+
+    def test_repeated_answers_are_graded_once(self):
+        plan = get_grading_plan(self.exam)
+        mcq = plan.question_map[self.mcq.id]
+
+        results = grade_batch(mcq, ["a", " A ", "b", "a", ""])
+
+        self.assertEqual([score for score, _ in results], [2, 2, 0, 2, 0])
+        self.assertEqual((grade_memo.hits, grade_memo.misses), (2, 2))
+
+        theory = plan.question_map[self.theory.id]
+        grade_batch(theory, ["The cell is the unit of life"])
+        grade_batch(theory, ["the CELL is the unit of life"])
+        self.assertEqual((grade_memo.hits, grade_memo.misses), (3, 3))
+        self.assertIn('acad_grading_memo_total{result="hit"}', registry.render())
+
+    def test_edited_question_misses(self):
+        grade_batch(get_grading_plan(self.exam).question_map[self.mcq.id], ["a"])
+
+        self.mcq.correct_answer = "b"
+        self.mcq.save()
+        score, feedback = grade_batch(get_grading_plan(self.exam).question_map[self.mcq.id], ["a"])[0]
+
+        self.assertEqual(score, 0)
+        self.assertEqual(grade_memo.misses, 2)
+
+    def test_cohort_submissions_share_results(self):
+        for i in range(5):
+            student = User.objects.create_user(f"student{i}", password="pass1234")
+            Submission.objects.create(student=student, exam=self.exam, started_at=timezone.now())
+            handle_submission(student, self.exam, [
+                {"question": self.mcq.id, "answer": "a"},
+                {"question": self.theory.id, "answer": "A cell"},
+            ])
+
+        self.assertEqual((grade_memo.hits, grade_memo.misses), (8, 2))
+        self.assertEqual(regrade_exam(self.exam.id).answers_changed, 0)
+        self.assertEqual(grade_memo.misses, 2)
+
+
+class SimilarityGradingTests(TestCase):
+    MODEL_ANSWER = "The cell is the basic unit of life in all living organisms"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def setUp(self):
+        self.exam = Exam.objects.create(title="Bio", course="BIO", duration=60, created_by=self.staff)
+        self.question = Question.objects.create(
+            exam=self.exam,
+            text="What is a cell?",
+            question_type="THEORY",
+            marks=5,
+            grading_mode="SIMILARITY",
+            model_answer=self.MODEL_ANSWER,
+        )
+        self.answers = [
+            self.MODEL_ANSWER,
+            "Cells are the basic units of living organisms",
+            "A cell is a room in a prison",
+            "I do not know",
+            "",
+        ]
+
+    def test_scores_follow_similarity_to_model_answer(self):
+        question = get_grading_plan(self.exam).question_map[self.question.id]
+        scores = [score for score, _ in grade_batch(question, self.answers)]
+
+        self.assertEqual(scores[0], 5)
+        self.assertGreater(scores[1], scores[2])
+        self.assertGreater(scores[2], scores[3])
+        self.assertEqual(scores[3], 0)
+        self.assertEqual(grade_batch(question, [""]), [(0, "No answer submitted")])
+
+    def test_batch_matches_answer_by_answer(self):
+        question = get_grading_plan(self.exam).question_map[self.question.id]
+        self.assertEqual(
+            grade_batch(question, self.answers),
+            [grade_answer(question, answer) for answer in self.answers],
+        )
+
+    def test_submit_and_regrade_agree(self):
+        scores = {}
+        for i, answer in enumerate(self.answers):
+            student = User.objects.create_user(f"student{i}", password="pass1234")
+            Submission.objects.create(student=student, exam=self.exam, started_at=timezone.now())
+            result, _ = handle_submission(student, self.exam, [{"question": self.question.id, "answer": answer}])
+            scores[result["submission"].id] = result["score"]
+
+        report = regrade_exam(self.exam.id, chunk_size=2)
+
+        self.assertEqual(report.answers_checked, 5)
+        self.assertEqual(report.answers_changed, 0)
+        self.assertEqual(dict(Submission.objects.values_list("id", "total_score")), scores)
+
+    def test_model_answer_is_required(self):
+        self.client.force_login(self.staff)
+        response = self.client.post(
+            f"/api/exams/{self.exam.id}/questions/add/",
+            {"text": "Define osmosis", "question_type": "THEORY", "marks": 5, "grading_mode": "SIMILARITY"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AnalyticsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def test_item_analysis(self):
+        exam = make_exam(self.staff, 2)
+        mcq, theory = exam.questions.order_by("id")
+        # (MCQ answer, THEORY answer) per student
+        for i, (a, b) in enumerate([("a", "cell unit of life"), ("a", "cell"), ("b", "cell"), ("b", "nothing")]):
+            student = User.objects.create_user(f"student{i}", password="pass1234")
+            Submission.objects.create(student=student, exam=exam, started_at=timezone.now())
+            handle_submission(student, exam, [{"question": mcq.id, "answer": a}, {"question": theory.id, "answer": b}])
+
+        self.client.force_login(self.staff)
+        data = self.client.get(f"/api/exams/{exam.id}/analytics/").json()
+
+        self.assertEqual(data["submissions"], 4)
+        self.assertEqual(data["mean_score"], 3.5)  # (7 + 4.5 + 2.5 + 0) / 4
+        self.assertEqual(data["histogram"]["counts"][9], 1)  # 100%
+        self.assertEqual(sum(data["histogram"]["counts"]), 4)
+
+        mcq_stats, theory_stats = data["questions"]
+        self.assertEqual(mcq_stats["difficulty"], 0.5)
+        self.assertEqual(theory_stats["difficulty"], 0.5)
+        self.assertEqual(mcq_stats["discrimination"], 1.0)
+        self.assertEqual(mcq_stats["point_biserial"], 0.7071)
+        self.assertIsNotNone(data["cronbach_alpha"])
+
+    def test_score_matrix_mixes_rows_and_packed(self):
+        exam = make_exam(self.staff, 4)
+        questions = list(exam.questions.order_by("id"))
+        for i in range(4):
+            student = User.objects.create_user(f"student{i}", password="pass1234")
+            Submission.objects.create(student=student, exam=exam, started_at=timezone.now())
+            handle_submission(student, exam, [{"question": q.id, "answer": "a cell"} for q in questions[i % 2::2]])
+        Answer.objects.filter(question=questions[1]).update(score_awarded=5 / 3)
+        pack_submissions(Submission.objects.filter(student__username__in=["student2", "student3"]))
+
+        question_ids = [q.id for q in reversed(questions)]
+        with self.assertNumQueries(3):  # grouped rows, one packed chunk, end of chunks
+            matrix = _score_matrix(exam.id, question_ids)
+
+        stored = load_answers_many(list(Submission.objects.filter(exam=exam)))
+        expected = [
+            [next((a.score_awarded for a in answers if a.question_id == qid), 0) for qid in question_ids]
+            for answers in stored.values()
+        ]
+        self.assertEqual(matrix.shape, (4, 4))
+        self.assertTrue(np.allclose(sorted(matrix.tolist()), sorted(expected), atol=1e-6))
+
+    def test_item_analysis_without_submissions(self):
+        exam = make_exam(self.staff, 2)
+        data = item_analysis(exam.id)
+        self.assertEqual(data["submissions"], 0)
+        self.assertIsNone(data["cronbach_alpha"])
+        self.assertIsNone(data["questions"][0]["difficulty"])
+
+
+class QuestionPayloadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+        cls.student = User.objects.create_user("student", password="pass1234")
+
+    def setUp(self):
+        self.exam = make_exam(self.staff, 20)
+        self.url = f"/api/exams/{self.exam.id}/questions/"
+        self.client.force_login(self.student)
+
+    def test_payload_rendered_once(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.json()), 20)
+        self.assertNotIn("correct_answer", first.json()[0])
+
+        # warm cache: only the session + user lookups remain
+        with self.assertNumQueries(2):
+            second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_gzip(self):
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_question_change_bumps_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        version = get_question_payload(self.exam.id).version
+
+        question = self.exam.questions.first()
+        question.text = "Edited"
+        question.save()
+
+        self.assertGreater(get_question_payload(self.exam.id).version, version)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_unknown_exam(self):
+        self.assertEqual(self.client.get("/api/exams/999/questions/").status_code, 404)
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def setUp(self):
+        self.exam = make_exam(self.staff, 3)
+        for i in range(5):
+            student = User.objects.create_user(f"student{i}", password="pass1234")
+            Submission.objects.create(student=student, exam=self.exam, started_at=timezone.now())
+            handle_submission(student, self.exam, [])
+        self.client.force_login(self.staff)
+
+    def read(self, path):
+        response = self.client.get(f"/api/exams/{self.exam.id}/export/{path}")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_submissions_csv(self):
+        lines = self.read("submissions.csv").splitlines()
+        self.assertEqual(lines[0], "submission,student_id,student,email,score,is_submitted,started_at,submitted_at")
+        self.assertEqual(len(lines), 6)
+        self.assertIn("student0", lines[1])
+
+    def test_answers_ndjson(self):
+        rows = [json.loads(line) for line in self.read("answers.ndjson").splitlines()]
+        self.assertEqual(len(rows), 15)
+        self.assertEqual(rows[0]["feedback"], "No answer submitted")
+        self.assertEqual(rows[0]["student"], "student0")
+
+    def test_query_count_independent_of_cohort(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.read("answers.csv")
+        self.assertLessEqual(len(ctx.captured_queries), 6)
+
+    async def test_asgi_export_streams_incrementally(self):
+        produced = []
+
+        def counting_rows(*args, **kwargs):
+            for row in export_rows(*args, **kwargs):
+                produced.append(row)
+                yield row
+
+        await self.async_client.aforce_login(self.staff)
+        with patch("assessment.views.export_rows", counting_rows), \
+                patch("assessment.views.buffered", lambda chunks: chunks):  # one chunk per row
+            response = await self.async_client.get(f"/api/exams/{self.exam.id}/export/submissions.csv")
+            self.assertTrue(response.is_async)
+
+            chunks = aiter(response.streaming_content)
+            await anext(chunks)
+            self.assertLess(len(produced), 6)  # header + 5 rows: not drained before the first chunk
+            rest = [chunk async for chunk in chunks]
+
+        self.assertEqual(len(produced), 6)
+        self.assertEqual(b"".join(rest).count(b"\n"), 5)
+
+    def test_unknown_format(self):
+        response = self.client.get(f"/api/exams/{self.exam.id}/export/answers.xml")
+        self.assertEqual(response.status_code, 404)
+
+
+class IdempotentSubmitTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def setUp(self):
+        response_cache.clear()
+        self.exam = make_exam(self.staff, 2)
+        self.mcq = self.exam.questions.get(question_type="MCQ")
+        self.student = User.objects.create_user("student", password="pass1234")
+        self.client.force_login(self.student)
+        self.client.post(f"/api/exams/{self.exam.id}/start/")
+
+    def submit(self, key=None, answer="a"):
+        headers = {"Idempotency-Key": key} if key else {}
+        return self.client.post(
+            f"/api/exams/{self.exam.id}/submit/",
+            {"answers": [{"question": self.mcq.id, "answer": answer}]},
+            content_type="application/json",
+            headers=headers,
+        )
+
+    def test_retry_replays_first_response(self):
+        first = self.submit("k1")
+        self.assertEqual(first.status_code, 201)
+
+        with patch("assessment.services.grade_answers") as grade:
+            retry = self.submit("k1")
+        grade.assert_not_called()
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Answer.objects.count(), 2)
+
+        # without the key, a retry is refused as before
+        self.assertEqual(self.submit().json()["status"], "already_submitted")
+
+    def test_cached_replay_needs_no_query(self):
+        self.submit("k1")
+        record = IdempotentResponse.objects.get()
+        with self.assertNumQueries(0):
+            stored = begin(self.student.id, "k1", record.fingerprint)
+        self.assertEqual(stored.status_code, 201)
+
+        response_cache.clear()  # another worker process: replayed from the table
+        retry = self.submit("k1")
+        self.assertEqual((retry.status_code, retry["Idempotent-Replayed"]), (201, "true"))
+
+    def test_key_reused_for_other_request(self):
+        self.submit("k1")
+        response = self.submit("k1", answer="b")
+        self.assertEqual((response.status_code, response.json()["status"]), (422, "idempotency_conflict"))
+
+    def test_key_in_flight_and_abandoned(self):
+        self.assertIsNone(begin(self.student.id, "k1", "x" * 32))
+        self.assertEqual(begin(self.student.id, "k1", "x" * 32).status_code, 409)
+
+        # the worker that took the key died: after the lease, a retry runs
+        IdempotentResponse.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertIsNone(begin(self.student.id, "k1", "x" * 32))
+
+    def test_failed_request_releases_key(self):
+        bad = self.client.post(
+            f"/api/exams/{self.exam.id}/submit/",
+            {"answers": [{"question": 0, "answer": "a"}]},
+            content_type="application/json",
+            headers={"Idempotency-Key": "k1"},
+        )
+        self.assertEqual(bad.status_code, 400)
+        self.assertFalse(IdempotentResponse.objects.exists())
+        self.assertEqual(self.submit("k1").status_code, 201)
+
+    def test_refusal_releases_key(self):
+        late = User.objects.create_user("late", password="pass1234")
+        self.client.force_login(late)
+        refused = self.submit("k1")
+        self.assertEqual(refused.json()["status"], "not_started")
+        self.assertFalse(IdempotentResponse.objects.exists())
+
+        self.client.post(f"/api/exams/{self.exam.id}/start/")
+        self.assertEqual(self.submit("k1").status_code, 201)
+
+    def test_sweep_purges_expired_keys(self):
+        self.submit("k1")
+        self.submit("k2", answer="b")  # refused: already submitted, not stored
+        self.assertEqual(IdempotentResponse.objects.count(), 1)
+        old = IdempotentResponse.objects.create(user=self.student, key="k0", fingerprint="x" * 32, status_code=201)
+        IdempotentResponse.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=2))
+
+        out = StringIO()
+        call_command("sweep_expired", "--once", stdout=out)
+
+        self.assertIn("purged 1 expired idempotency keys", out.getvalue())
+        self.assertEqual(list(IdempotentResponse.objects.values_list("key", flat=True)), ["k1"])
+
+    async def test_disconnect_still_stores_response(self):
+        request = RequestFactory().post(
+            "/submit/", b"{}", content_type="application/json", headers={"Idempotency-Key": "k1"}
+        )
+        started = asyncio.Event()
+
+        async def handler():
+            started.set()
+            await asyncio.sleep(0.05)  # grading, not cancelled with the request
+            return {"status": "success"}, 201
+
+        view = asyncio.ensure_future(arun_once(request, self.student.id, handler, lambda data, code: code))
+        await started.wait()
+        view.cancel()  # client disconnected
+        with self.assertRaises(asyncio.CancelledError):
+            await view
+
+        for _ in range(100):
+            if await IdempotentResponse.objects.filter(status_code=201).aexists():
+                break
+            await asyncio.sleep(0.01)
+        stored = await sync_to_async(begin)(self.student.id, "k1", request_fingerprint(request))
+        self.assertEqual((stored.status_code, stored.replayed), (201, True))
+
+    def test_browsable_submit_uses_key_too(self):
+        first = self.client.post(
+            f"/api/exams/{self.exam.id}/submit/",
+            {"answers": [{"question": self.mcq.id, "answer": "a"}]},
+            content_type="application/json",
+            headers={"Idempotency-Key": "k1", "Accept": "text/html"},
+        )
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(IdempotentResponse.objects.get().status_code, 201)
+
+
+class ArchiveExamTests(TestCase):
+    databases = {"default", "archive"}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def setUp(self):
+        self.exam = make_exam(self.staff, 3)
+        self.students = []
+        for i in range(5):
+            student = User.objects.create_user(f"student{i}", password="pass1234")
+            Submission.objects.create(student=student, exam=self.exam, started_at=timezone.now())
+            handle_submission(student, self.exam, [{"question": self.exam.questions.first().id, "answer": "a"}])
+            self.students.append(student)
+
+    def read(self, path):
+        self.client.force_login(self.staff)
+        response = self.client.get(f"/api/exams/{self.exam.id}/{path}")
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_archive_keeps_exports_and_results(self):
+        live = {kind: self.read(f"export/{kind}.csv") for kind in ("submissions", "answers")}
+        self.client.force_login(self.students[0])
+        result = self.client.get(f"/api/exams/{self.exam.id}/result/").json()
+
+        out = StringIO()
+        call_command("archive_exam", self.exam.id, batch=2, stdout=out)
+
+        self.assertIn("Archived 5 submissions", out.getvalue())
+        self.assertFalse(Submission.objects.filter(exam=self.exam).exists())
+        self.assertFalse(Answer.objects.exists())
+        self.assertEqual(ArchivedSubmission.objects.filter(exam_id=self.exam.id).count(), 5)
+
+        for kind, body in live.items():
+            self.assertEqual(self.read(f"archive/{kind}.csv"), body)
+        self.client.force_login(self.students[0])
+        self.assertEqual(self.client.get(f"/api/exams/{self.exam.id}/result/").json(), result)
+
+    def test_rebuild_keeps_archived_stats(self):
+        call_command("archive_exam", self.exam.id, stdout=StringIO())
+        before = exam_stats_summary(self.exam.id)
+        self.assertEqual(before["submissions"], 5)
+
+        call_command("rebuild_exam_stats", stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("rebuild_exam_stats", self.exam.id, stdout=StringIO())
+        with self.assertRaises(ValidationError):
+            rebuild_exam_stats(self.exam.id)
+
+        self.assertEqual(exam_stats_summary(self.exam.id), before)
+
+    def test_archived_exam_is_closed(self):
+        archive_exam(self.exam)
+        self.exam.refresh_from_db()
+        self.assertIsNotNone(self.exam.archived_at)
+
+        self.client.force_login(User.objects.create_user("late", password="pass1234"))
+        response = self.client.post(f"/api/exams/{self.exam.id}/start/")
+        self.assertEqual((response.status_code, response.json()["status"]), (400, "archived"))
+        self.assertEqual(self.client.get(f"/api/exams/{self.exam.id}/result/").status_code, 404)
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.post(f"/api/exams/{self.exam.id}/regrade/").status_code, 400)
+        with self.assertRaises(CommandError):
+            call_command("regrade_exam", self.exam.id, stdout=StringIO())
+
+    def test_open_submissions_block_archiving(self):
+        student = User.objects.create_user("open", password="pass1234")
+        Submission.objects.create(student=student, exam=self.exam, started_at=timezone.now())
+
+        with self.assertRaises(CommandError):
+            call_command("archive_exam", self.exam.id, stdout=StringIO())
+
+        self.exam.refresh_from_db()
+        self.assertIsNone(self.exam.archived_at)
+        self.assertEqual(Submission.objects.filter(exam=self.exam).count(), 6)
+        self.assertFalse(ArchivedSubmission.objects.exists())
+
+    def test_rerun_after_interrupted_archive(self):
+        # a run that stopped after copying a batch, before deleting it
+        archive_exam(self.exam, batch_size=10)
+        copied = list(ArchivedSubmission.objects.all())
+        ArchivedSubmission.objects.exclude(pk=copied[0].pk).delete()
+        Submission.objects.create(id=copied[0].submission_id, student=self.students[0], exam=self.exam, is_submitted=True)
+
+        self.assertEqual(archive_exam(self.exam).archived, 1)
+        self.assertEqual(ArchivedSubmission.objects.count(), 1)
+
+    def test_deleting_exam_deletes_archive(self):
+        archive_exam(self.exam)
+        self.exam.delete()
+        self.assertFalse(ArchivedSubmission.objects.exists())
+
+
+class ExamStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def setUp(self):
+        self.exam = make_exam(self.staff, 2)
+        self.mcq, self.theory = self.exam.questions.order_by("id")
+
+    def submit(self, name, mcq_answer, theory_answer):
+        student = User.objects.create_user(name, password="pass1234")
+        Submission.objects.create(student=student, exam=self.exam, started_at=timezone.now())
+        handle_submission(student, self.exam, [
+            {"question": self.mcq.id, "answer": mcq_answer},
+            {"question": self.theory.id, "answer": theory_answer},
+        ])
+
+    def test_stats_updated_on_submit(self):
+        self.submit("ada", "a", "cell unit of life")   # 7
+        self.submit("bob", "b", "cell")                # 2.5
+        self.submit("cy", "a", "nothing")              # 2
+
+        stats = exam_stats_summary(self.exam.id)
+        self.assertEqual(stats["submissions"], 3)
+        self.assertEqual(stats["mean_score"], 3.8333)
+        self.assertEqual(stats["max_score"], 7)
+        self.assertEqual(stats["pass_rate"], 0.3333)
+        self.assertEqual([e["student"] for e in stats["leaderboard"]], ["ada", "bob", "cy"])
+
+    @override_settings(EXAM_LEADERBOARD_SIZE=2)
+    def test_rebuild_matches_incremental(self):
+        for i, answer in enumerate(["cell", "unit of life", "nothing", "cell unit of life"]):
+            self.submit(f"s{i}", "a", answer)
+        incremental = exam_stats_summary(self.exam.id)
+
+        ExamStats.objects.all().delete()
+        rebuild_exam_stats(self.exam.id)
+        rebuilt = exam_stats_summary(self.exam.id)
+
+        incremental.pop("updated_at"), rebuilt.pop("updated_at")
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(len(rebuilt["leaderboard"]), 2)
+
+    def test_rebuild_locks_stats_before_reading(self):
+        self.submit("ada", "a", "cell")
+        with CaptureQueriesContext(connection) as ctx:
+            rebuild_exam_stats(self.exam.id)
+
+        sql = [q["sql"] for q in ctx.captured_queries]
+        begin = next(i for i, s in enumerate(sql) if s.startswith("SAVEPOINT") or s == "BEGIN")
+        first_stats = next(i for i, s in enumerate(sql) if "assessment_examstats" in s)
+        first_read = next(i for i, s in enumerate(sql) if 'FROM "assessment_submission"' in s)
+        self.assertLess(begin, first_stats)
+        self.assertLess(first_stats, first_read)
+
+    def test_stats_read_is_constant(self):
+        for i in range(5):
+            self.submit(f"s{i}", "a", "cell")
+        with self.assertNumQueries(2):  # stats row + leaderboard names
+            exam_stats_summary(self.exam.id)
+
+
+class AsyncStudentViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+        cls.student = User.objects.create_user("student", password="pass1234")
+
+    def setUp(self):
+        self.exam = make_exam(self.staff, 4)
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(self.student)}"}
+
+    async def test_jwt_start_questions_submit(self):
+        base = f"/api/exams/{self.exam.id}"
+        started = await self.async_client.post(f"{base}/start/", headers=self.auth)
+        self.assertEqual(started.json()["status"], "started")
+
+        questions = await self.async_client.get(f"{base}/questions/", headers=self.auth)
+        self.assertEqual(len(questions.json()), 4)
+
+        response = await self.async_client.post(
+            f"{base}/submit/",
+            {"answers": [{"question": q["id"], "answer": "a"} for q in questions.json()]},
+            content_type="application/json",
+            headers=self.auth,
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["total_score"], 4)
+        self.assertEqual(await Answer.objects.filter(submission__student=self.student).acount(), 4)
+
+    async def test_failed_graded_write_rolls_back_claim(self):
+        await Submission.objects.acreate(student=self.student, exam=self.exam, started_at=timezone.now())
+        question = await self.exam.questions.afirst()
+        answers = [{"question": question.id, "answer": "a"}]
+
+        with patch("assessment.services.record_submission", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                await ahandle_submission(self.student, self.exam, answers)
+
+        submission = await Submission.objects.aget(student=self.student, exam=self.exam)
+        self.assertFalse(submission.is_submitted)
+        self.assertIsNone(submission.result)
+        self.assertFalse(await Answer.objects.filter(submission=submission).aexists())
+
+        _, code = await ahandle_submission(self.student, self.exam, answers)
+        self.assertEqual(code, 201)
+
+    async def test_errors_match_drf(self):
+        base = f"/api/exams/{self.exam.id}"
+        anonymous = await self.async_client.get(f"{base}/questions/")
+        self.assertEqual(anonymous.status_code, 401)
+        self.assertEqual(anonymous["WWW-Authenticate"], 'Bearer realm="api"')
+
+        bad_token = await self.async_client.get(f"{base}/questions/", headers={"Authorization": "Bearer nope"})
+        self.assertEqual(bad_token.json()["code"], "token_not_valid")
+
+        missing = await self.async_client.post("/api/exams/999999/start/", headers=self.auth)
+        self.assertEqual(missing.status_code, 404)
+        self.assertIn("detail", missing.json())
+
+        await self.async_client.post(f"{base}/start/", headers=self.auth)
+        invalid = await self.async_client.post(
+            f"{base}/submit/",
+            {"answers": [{"question": 999999, "answer": "a"}]},
+            content_type="application/json",
+            headers=self.auth,
+        )
+        self.assertEqual(invalid.status_code, 400)
+        self.assertEqual(invalid.json(), {"non_field_errors": ["Invalid question"]})
+
+    def test_browsable_api_served_by_drf(self):
+        self.client.force_login(self.student)
+        response = self.client.get(f"/api/exams/{self.exam.id}/submit/", HTTP_ACCEPT="text/html")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"<html", response.content.lower())
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+        self.exam = make_exam(self.staff, 2)
+
+    def login(self, username):
+        response = self.client.post("/api/auth/login/", {"username": username, "password": "pass1234"})
+        return {"HTTP_AUTHORIZATION": f"Bearer {response.json()['access']}"}
+
+    def test_repeat_requests_skip_user_query(self):
+        User.objects.create_user("student", password="pass1234")
+        auth = self.login("student")
+        url = f"/api/exams/{self.exam.id}/questions/"
+        self.client.get(url, **auth)
+
+        # warm payload + cached user: nothing left to query
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, **auth).status_code, 200)
+
+    def test_login_token_carries_role_claims(self):
+        auth = self.login("staff")
+        token = AccessToken(auth["HTTP_AUTHORIZATION"].split()[1])
+        self.assertTrue(token["is_staff"])
+        self.assertFalse(token["is_superuser"])
+
+    def test_deactivated_user_rejected(self):
+        student = User.objects.create_user("student", password="pass1234")
+        auth = self.login("student")
+        url = f"/api/exams/{self.exam.id}/questions/"
+        self.assertEqual(self.client.get(url, **auth).status_code, 200)
+
+        student.is_active = False
+        student.save()
+        self.assertEqual(self.client.get(url, **auth).status_code, 401)
+
+    def test_demoted_staff_token_rejected(self):
+        auth = self.login("staff")
+        url = f"/api/exams/{self.exam.id}/stats/"
+        self.assertEqual(self.client.get(url, **auth).status_code, 200)
+
+        self.staff.is_staff = False
+        self.staff.save()
+        response = self.client.get(url, **auth)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("log in again", response.json()["detail"])
+
+    def test_exam_owner_compares_ids(self):
+        exam = Exam.objects.get(id=self.exam.id)
+        request = type("Request", (), {"user": self.staff})()
+        with self.assertNumQueries(0):
+            self.assertTrue(IsExamOwner().has_object_permission(request, None, exam))
+
+    def test_question_detail_only_for_exam_owner(self):
+        question = self.exam.questions.first()
+        other = User.objects.create_user("other-staff", password="pass1234", is_staff=True)
+
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(f"/api/exams/questions/{question.id}/").status_code, 403)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(f"/api/exams/questions/{question.id}/").status_code, 200)
+
+
+class SqliteProductionProfileTests(TestCase):
+
+    def open_connection(self, path, alias):
+        wrapper = DatabaseWrapper({**connection.settings_dict, "NAME": path}, alias=alias)
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    @override_settings(
+        SQLITE_PRAGMAS={"journal_mode": "WAL", "busy_timeout": 5000, "synchronous": "NORMAL"},
+        READ_DATABASE="read",
+    )
+    def test_pragmas_applied_on_connect(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = self.open_connection(f"{tmp}/db.sqlite3", "default")
+            self.assertEqual(self.pragma(writer, "journal_mode"), "wal")
+            self.assertEqual(self.pragma(writer, "busy_timeout"), 5000)
+            self.assertEqual(self.pragma(writer, "synchronous"), 1)  # NORMAL
+            self.assertEqual(self.pragma(writer, "query_only"), 0)
+
+            reader = self.open_connection(f"{tmp}/db.sqlite3", "read")
+            self.assertEqual(self.pragma(reader, "query_only"), 1)
+
+    def test_asgi_does_not_keep_connections(self):
+        # settings are read at import: load them the way each server does
+        script = (
+            "import {0}; from django.conf import settings; "
+            "print(settings.DATABASES['default']['CONN_MAX_AGE'])"
+        )
+        env = {k: v for k, v in os.environ.items() if k != "DB_CONN_MAX_AGE"}
+        env["SQLITE_PRODUCTION"] = "True"
+        for module, expected in (("Acad_AI.asgi", "0"), ("Acad_AI.wsgi", "600")):
+            output = subprocess.run(
+                [sys.executable, "-c", script.format(module)],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            self.assertEqual(output.strip(), expected, module)
+
+    @override_settings(READ_DATABASE="read")
+    def test_reads_routed_only_inside_read_views(self):
+        self.assertEqual(router.db_for_read(Question), "default")
+        with read_database():
+            self.assertEqual(router.db_for_read(Question), "read")
+            self.assertEqual(router.db_for_read(ArchivedSubmission), "archive")
+            self.assertEqual(router.db_for_write(Question), "default")
+        self.assertFalse(ReadRouter().allow_migrate("read", "assessment", "question"))
+
+    @override_settings(READ_DATABASE="default")
+    def test_streamed_export_reads_through_read_connection(self):
+        staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+        exam = make_exam(staff, 2)
+        self.client.force_login(staff)
+
+        seen = []
+        def spy(read_router, model, **hints):
+            seen.append(reading.get())
+            return None
+
+        with patch.object(ReadRouter, "db_for_read", spy):
+            response = self.client.get(f"/api/exams/{exam.id}/export/answers.csv")
+            seen.clear()  # permission checks; the rows below are read while streaming
+            b"".join(response.streaming_content)
+
+        self.assertTrue(seen)
+        self.assertTrue(all(seen))
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        registry.reset()
+        self.staff = User.objects.create_user("staff", password="pw", is_staff=True)
+        self.student = User.objects.create_user("student", password="pw")
+        self.exam = make_exam(self.staff, 4)
+
+    def test_requests_and_sql_recorded_per_route(self):
+        self.client.force_login(self.student)
+        self.client.get(f"/api/exams/{self.exam.id}/questions/")
+
+        self.client.force_login(self.staff)
+        body = self.client.get("/metrics").content.decode()
+
+        label = 'view="api/exams/<int:exam_id>/questions/"'
+        self.assertIn(f'acad_http_requests_total{{{label},method="GET",status="200"}} 1', body)
+        self.assertIn(f"acad_db_queries_per_request_count{{{label}}} 1", body)
+        self.assertIn(f'acad_http_request_duration_seconds_bucket{{{label},le="+Inf"}} 1', body)
+
+    def test_grading_phases_recorded(self):
+        self.client.force_login(self.student)
+        self.client.post(f"/api/exams/{self.exam.id}/start/")
+        self.client.post(
+            f"/api/exams/{self.exam.id}/submit/",
+            {"answers": [{"question": q.id, "answer": "a"} for q in self.exam.questions.all()]},
+            content_type="application/json",
+        )
+
+        body = registry.render()
+        for phase in ("load_plan", "grade", "write"):
+            self.assertIn(f'acad_grading_phase_seconds_count{{phase="{phase}"}} 1', body)
+
+    def test_metrics_is_staff_only(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0.0001)
+    def test_slow_requests_logged_with_sql(self):
+        self.client.force_login(self.student)
+        with self.assertLogs("assessment.slow_requests", "WARNING") as logs:
+            self.client.get(f"/api/exams/{self.exam.id}/questions/")
+
+        self.assertIn("SELECT", logs.output[0])
+        self.assertIn("acad_slow_requests_total", registry.render())
+
+
+class LoadTestHarnessTests(TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_recording_round_trip(self):
+        recorded = [
+            {"student": "vs1", "step": "submit", "at": 4.0, "body": {"answers": []}},
+            {"student": "vs1", "step": "register", "at": 1.0, "body": None},
+            {"student": "vs2", "step": "login", "at": 2.0, "body": None},
+        ]
+        with tempfile.NamedTemporaryFile("w+", suffix=".jsonl") as handle:
+            save_recording(recorded, handle.name)
+            plan = load_plan(handle.name)
+
+        self.assertEqual([s["step"] for s in plan["vs1"]], ["register", "submit"])
+        self.assertEqual(plan["vs1"][1]["body"], {"answers": []})
+
+    def test_synthetic_plan_targets_deadline(self):
+        plan = synthetic_plan(50, ramp=5, deadline=30, jitter=1)
+        submits = [steps[-1]["at"] for steps in plan.values()]
+        self.assertEqual(len(plan), 50)
+        self.assertTrue(all(29 <= at <= 31 for at in submits))
+
+
+LARGE_TABLES = ("assessment_submission", "assessment_answer", "assessment_gradingjob", "assessment_idempotentresponse")
+FULL_SCAN = re.compile(rf"\bSCAN ({'|'.join(LARGE_TABLES)})\b(?! USING)")
+
+
+class EndpointQueryBudgetTests(TestCase):
+    """
+    Every endpoint costs the same number of queries for an exam of N
+    questions and N students as for 10N, and none of its queries reads
+    a large table without an index.
+    """
+    N = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pass1234", is_staff=True)
+
+    def seed(self, size):
+        exam = make_exam(self.staff, size)
+        answers = [{"question": q.id, "answer": "a"} for q in exam.questions.all()]
+        for i in range(size):
+            student = User.objects.create_user(f"s{size}-{i}", password="pass1234")
+            Submission.objects.create(student=student, exam=exam, started_at=timezone.now())
+            handle_submission(student, exam, answers)
+        taker = User.objects.create_user(f"taker{size}", password="pass1234")
+        Submission.objects.create(student=taker, exam=exam, started_at=timezone.now())
+        newcomer = User.objects.create_user(f"new{size}", password="pass1234")
+        return exam, student, taker, newcomer, answers
+
+    def requests(self, size):
+        exam, graded, taker, newcomer, answers = self.seed(size)
+        question = exam.questions.first()
+        base = f"/api/exams/{exam.id}"
+        body = {"answers": answers}
+        return [
+            ("questions", graded, "get", f"{base}/questions/", None),
+            ("start", newcomer, "post", f"{base}/start/", None),
+            ("autosave", taker, "patch", f"{base}/answers/", body),
+            ("submit", taker, "post", f"{base}/submit/", body),
+            ("result", graded, "get", f"{base}/result/", None),
+            ("exam list", self.staff, "get", "/api/exams/", None),
+            ("exam detail", self.staff, "get", f"{base}/", None),
+            ("question detail", self.staff, "get", f"/api/exams/questions/{question.id}/", None),
+            ("submissions", self.staff, "get", f"{base}/submissions/", None),
+            ("stats", self.staff, "get", f"{base}/stats/", None),
+            ("export submissions", self.staff, "get", f"{base}/export/submissions.csv", None),
+            ("export answers", self.staff, "get", f"{base}/export/answers.ndjson", None),
+            ("analytics", self.staff, "get", f"{base}/analytics/", None),
+        ]
+
+    def measure(self, user, method, path, body):
+        for cache in (plan_cache, payload_cache, grade_memo, user_cache, response_cache):
+            cache.clear()
+        self.client.force_login(user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(path, body, content_type="application/json")
+            if response.streaming:
+                b"".join(response.streaming_content)
+
+        self.assertLess(response.status_code, 300, path)
+        return ctx.captured_queries
+
+    def full_scans(self, queries):
+        scans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                if not query["sql"].startswith("SELECT"):
+                    continue
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                plan = "\n".join(row[-1] for row in cursor.fetchall())
+                if FULL_SCAN.search(plan):
+                    scans.append(f"{query['sql']}\n{plan}")
+        return scans
+
+    def test_query_count_independent_of_exam_size(self):
+        small = self.requests(self.N)
+        large = self.requests(10 * self.N)
+
+        for (name, *small_request), (_, *large_request) in zip(small, large):
+            with self.subTest(endpoint=name):
+                small_queries = self.measure(*small_request)
+                large_queries = self.measure(*large_request)
+                self.assertEqual(len(small_queries), len(large_queries))
+                self.assertEqual(self.full_scans(large_queries), [])
+
+    def test_key_queries_use_indexes(self):
+        exam, graded, *_ = self.seed(self.N)
+        submission = Submission.objects.get(student=graded)
+
+        plans = {
+            "graded submissions": Submission.objects.filter(exam=exam, is_submitted=True),
+            "own submission": Submission.objects.filter(student=graded, exam=exam),
+            "submission answers": Answer.objects.filter(submission=submission),
+            "one answer": Answer.objects.filter(submission=submission, question=exam.questions.first()),
+            "pending jobs": GradingJob.objects.filter(status="PENDING").order_by("created_at"),
+        }
+        for name, queryset in plans.items():
+            with self.subTest(query=name):
+                self.assertNotRegex(queryset.explain(), FULL_SCAN)
+                self.assertIn("INDEX", queryset.explain())
+
+        self.assertIn(
+            "submission_by_exam_state",
+            Submission.objects.filter(exam=exam, is_submitted=True).explain(),
+        )
@@ -1,13 +1,17 @@
 from django.urls import path
+from .async_views import ExamQuestionsView, SaveAnswersView, StartExamView, SubmitExamView
 from .views import (
     ExamListCreateView,
     ExamDetailView,
-    ExamQuestionsView,
-    SubmitExamView,
+    ExamImportView,
     AddQuestionView,
     QuestionDetailView,
     ExamSubmissionsView,
-    StartExamView    
+    SubmissionResultView,
+    RegradeExamView,
+    ExamAnalyticsView,
+    ExamExportView,
+    ExamStatsView,
 )
 
 urlpatterns = [
@@ -15,6 +19,9 @@ urlpatterns = [
     path("", ExamListCreateView.as_view()),
     path("<int:pk>/", ExamDetailView.as_view()),
 
+    # STAFF Bulk import: exam + all its questions in one request
+    path("import/", ExamImportView.as_view()),
+
     # STAFF Question CRUD
     path("<int:exam_id>/questions/add/", AddQuestionView.as_view()),
     path("questions/<int:pk>/", QuestionDetailView.as_view()),
@@ -22,12 +29,35 @@ urlpatterns = [
     # STAFF View Submissions
     path("<int:exam_id>/submissions/", ExamSubmissionsView.as_view()),
 
+    # STAFF Aggregate stats + leaderboard
+    path("<int:exam_id>/stats/", ExamStatsView.as_view()),
+
+    # STAFF Streaming export: submissions|answers . csv|ndjson
+    path("<int:exam_id>/export/<slug:kind>.<slug:fmt>", ExamExportView.as_view()),
+
+    # STAFF Export of an archived exam (manage.py archive_exam)
+    path("<int:exam_id>/archive/<slug:kind>.<slug:fmt>", ExamExportView.as_view(archived=True)),
+
+    # STAFF Item analysis
+    path("<int:exam_id>/analytics/", ExamAnalyticsView.as_view()),
+
+    # STAFF Re-grade after fixing questions
+    path("<int:exam_id>/regrade/", RegradeExamView.as_view()),
+
+    # STUDENT hot path: native async views (see async_views.py)
+
     #STUDENT Start Exam
     path("<int:exam_id>/start/", StartExamView.as_view()),
 
     # STUDENT View Questions
     path("<int:exam_id>/questions/", ExamQuestionsView.as_view()),
 
+    # STUDENT Autosave answers (PATCH) while the exam runs
+    path("<int:exam_id>/answers/", SaveAnswersView.as_view()),
+
     # STUDENT Submit Exam
     path("<int:exam_id>/submit/", SubmitExamView.as_view()),
+
+    # STUDENT Fetch / poll graded result
+    path("<int:exam_id>/result/", SubmissionResultView.as_view(), name="exam-result"),
 ]
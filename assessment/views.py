@@ -2,17 +2,35 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework import generics
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.urls import reverse
 from .models import Exam, Question, Submission
 from .serializers import (
-    QuestionSerializer,
     SubmissionSerializer,
     ExamSerializer,
     QuestionCreateSerializer
 )
 from .permissions import IsExamOwner
-from .services import handle_submission, start_exam
+from .analytics import item_analysis
+from .archive import archived_result
+from .metrics import registry
+from .idempotency import run_once
+from .exports import EXPORT_FORMATS, EXPORT_KINDS, async_chunks, buffered, export_rows
+from .imports import import_questions
+from .roster import provision_students
+from .routers import read_iter, reads_only
+from .question_payload import get_question_payload
+from .stats import exam_stats_summary
+from .results import is_gzipped, load_result, result_data, result_json
+from .services import handle_submission, save_answers, start_exam
+from grading.regrade import regrade_exam
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from .serializers import RegisterSerializer
 
 
@@ -20,17 +38,67 @@ from .serializers import RegisterSerializer
 # STUDENT VIEWS
 # =========================
 
+def payload_response(request, payload, fallback=None):
+    """
+    Conditional response for a cached QuestionPayload: 304 when the
+    client's ETag matches, otherwise the (gzipped) JSON bytes, or
+    fallback() for clients that want another format.
+    """
+    if_none_match = request.headers.get("If-None-Match", "")
+    if payload.etag in if_none_match or if_none_match.strip() == "*":
+        response = HttpResponseNotModified()
+
+    elif fallback is not None:
+        response = fallback()
+
+    elif payload.gzip_body and "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = HttpResponse(payload.gzip_body, content_type="application/json")
+        response["Content-Encoding"] = "gzip"
+
+    else:
+        response = HttpResponse(payload.body, content_type="application/json")
+
+    response["ETag"] = payload.etag
+    response["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+def queued_result(request, exam):
+    """
+    Body of the 202 returned when grading is left to the grade_worker.
+    """
+    return {
+        "message": "Submission received, grading in progress",
+        "status": "pending",
+        "status_url": request.build_absolute_uri(
+            reverse("exam-result", args=[exam.id])
+        ),
+    }
+
+
 class ExamQuestionsView(APIView):
     """
     Students view questions in an exam
+
+    The payload is rendered once per exam and cached as bytes with a
+    strong ETag, so clients revalidating with If-None-Match get a 304
+    and a herd of students opening the exam costs one query.
     """
     permission_classes = [IsAuthenticated]
 
+    @reads_only
     def get(self, request, exam_id):
-        exam = get_object_or_404(Exam, id=exam_id)
-        questions = exam.questions.all()
-        data = QuestionSerializer(questions, many=True).data
-        return Response(data)
+        payload = get_question_payload(exam_id)
+        if payload is None:
+            raise Http404
+
+        # Browsable API still renders through DRF
+        fallback = None
+        if request.accepted_renderer.format != "json":
+            fallback = lambda: Response(list(payload.data))
+
+        return payload_response(request, payload, fallback)
 
 class SubmitExamView(generics.GenericAPIView):
     """
@@ -49,6 +117,18 @@ class SubmitExamView(generics.GenericAPIView):
         return Response(serializer.data)
 
     def post(self, request, exam_id):
+        # A retry with the same Idempotency-Key gets the first response back
+        return run_once(
+            request,
+            request.user.id,
+            lambda: self.submit(request, exam_id),
+            lambda data, code: Response(data, status=code),
+        )
+
+    def submit(self, request, exam_id):
+        """
+        Returns (response data, status code).
+        """
         exam = get_object_or_404(Exam, id=exam_id)
 
         # Validate incoming payload
@@ -64,51 +144,108 @@ class SubmitExamView(generics.GenericAPIView):
         result, http_status = handle_submission(
             request.user,
             exam,
-            serializer.validated_data["answers"]
+            serializer.validated_data.get("answers", [])
         )
 
+        # Queued for the grade_worker (GRADING_ASYNC)
+        if result["status"] == "queued":
+            return queued_result(request, exam), http_status
+
         # If submission failed (not started, expired, already submitted, etc)
         if result["status"] != "success":
-            return Response(result, status=http_status)
-
-        # If success, extract values
-        submission = result["submission"]
-        score = result["score"]
-        total_marks = result["total_marks"]
-        percentage = round((score / total_marks) * 100, 2)
+            return result, http_status
 
         # ===============================
         # EXAM WIDE FEEDBACK SUMMARY
         # ===============================
-        if percentage >= 85:
-            exam_feedback = "Excellent performance! You demonstrated strong understanding."
-        elif percentage >= 70:
-            exam_feedback = "Good job! You have a solid grasp but there is room for improvement."
-        elif percentage >= 50:
-            exam_feedback = "Fair attempt. Revise the weak areas and try again."
-        else:
-            exam_feedback = "Poor performance. You need to study more and retry."
+        return {
+            "message": "Submission successful",
+            **result["result"],
+        }, status.HTTP_201_CREATED
 
-        return Response(
-            {
-                "message": "Submission successful",
-                "total_score": score,
-                "total_marks": total_marks,
-                "percentage": percentage,
-                "exam_feedback": exam_feedback,
-                "answers": [
-                    {
-                        "question": a.question.text,
-                        "student_answer": a.student_answer,
-                        "score": a.score_awarded,
-                        "feedback": a.feedback,
-                    }
-                    for a in submission.answers.all()
-                ],
-            },
-            status=status.HTTP_201_CREATED,
+
+class SaveAnswersView(generics.GenericAPIView):
+    """
+    Students autosave answers while the exam is running
+    (PATCH, same body as submit). Nothing is graded until submit.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = SubmissionSerializer
+    queryset = Exam.objects.all()
+
+    def patch(self, request, exam_id):
+        exam = get_object_or_404(Exam, id=exam_id)
+
+        serializer = self.get_serializer(
+            data=request.data,
+            context={"exam": exam}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        result, http_status = save_answers(
+            request.user,
+            exam,
+            serializer.validated_data.get("answers", [])
+        )
+        return Response(result, status=http_status)
+
+
+class SubmissionResultView(APIView):
+    """
+    Students fetch (or poll for) their graded result.
+    Returns 202 while an async grading job is still pending.
+
+    The result is the snapshot stored at grading time, sent as stored
+    (gzip when the client accepts it), so a view is one row read.
+    Results of archived exams come from the archive database.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, exam_id):
+        submission = (
+            Submission.objects.select_related("grading_job")
+            .filter(student=request.user, exam_id=exam_id, is_submitted=True)
+            .first()
         )
 
+        if submission is None:
+            blob = None
+            if Exam.objects.filter(id=exam_id, archived_at__isnull=False).exists():
+                blob = archived_result(exam_id, request.user.id)
+            if blob is None:
+                raise Http404
+            return self.result_response(request, bytes(blob))
+
+        job = getattr(submission, "grading_job", None)
+        if job and job.status != "DONE":
+            return Response(
+                {
+                    "status": job.status.lower(),
+                    "message": (
+                        "Grading failed, staff have been notified"
+                        if job.status == "FAILED" else "Grading in progress"
+                    ),
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        return self.result_response(request, load_result(submission))
+
+    def result_response(self, request, blob):
+        # Browsable API still renders through DRF
+        if request.accepted_renderer.format != "json":
+            return Response(result_data(blob))
+
+        if is_gzipped(blob) and "gzip" in request.headers.get("Accept-Encoding", ""):
+            response = HttpResponse(blob, content_type="application/json")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(result_json(blob), content_type="application/json")
+
+        response["Cache-Control"] = "private, no-cache"
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
+
 # =========================
 # STAFF EXAM CRUD
 # =========================
@@ -130,6 +267,36 @@ class ExamListCreateView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
+class ExamImportView(APIView):
+    """
+    Staff create an exam with all its questions in one request:
+    {"title", "course", "duration", "metadata", "questions": [...]}
+    Questions use the AddQuestion fields; all are validated first and
+    inserted in bulk, and nothing is saved if any is invalid.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = ExamSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        questions = request.data.get("questions")
+        if not isinstance(questions, list) or not questions:
+            raise ValidationError({"questions": ["A non-empty list of questions is required"]})
+
+        with transaction.atomic():
+            exam = serializer.save(created_by=request.user)
+            created = import_questions(exam, questions)
+
+        return Response(
+            {
+                "message": "Exam imported",
+                "exam": ExamSerializer(exam).data,
+                "questions_created": created,
+            },
+            status=status.HTTP_201_CREATED
+        )
+
 class ExamDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve / Update / Delete exams
@@ -171,14 +338,14 @@ class QuestionDetailView(generics.RetrieveUpdateDestroyAPIView):
     Update / Delete question
     Only exam owner staff
     """
-    queryset = Question.objects.all()
-    serializer_class = QuestionSerializer
+    queryset = Question.objects.select_related("exam")  # exam for the owner check
+    serializer_class = QuestionCreateSerializer  # staff may correct the answer key
     permission_classes = [IsAdminUser]
 
     def check_object_permissions(self, request, obj):
-        exam = obj.exam
-        IsExamOwner().has_object_permission(request, self, exam)
-        return super().check_object_permissions(request, obj)
+        super().check_object_permissions(request, obj)
+        if not IsExamOwner().has_object_permission(request, self, obj.exam):
+            self.permission_denied(request)
 
 
 # =========================
@@ -195,18 +362,153 @@ class ExamSubmissionsView(APIView):
         exam = get_object_or_404(Exam, id=exam_id)
         self.check_object_permissions(request, exam)
 
-        submissions = Submission.objects.filter(exam=exam)
+        # one joined query; the answer / result blobs are never read
+        submissions = (
+            Submission.objects.filter(exam=exam)
+            .order_by("pk")
+            .values_list("student__username", "total_score", "submitted_at")
+        )
 
         data = [
             {
-                "student": s.student.username,
-                "score": s.total_score,
-                "submitted_at": s.submitted_at
-            } for s in submissions
+                "student": username,
+                "score": score,
+                "submitted_at": submitted_at
+            } for username, score, submitted_at in submissions
         ]
 
         return Response(data)
 
+class ExamStatsView(APIView):
+    """
+    Staff dashboard numbers for their exam (count, mean, max,
+    pass rate, leaderboard), read from the materialized ExamStats row
+    """
+    permission_classes = [IsAdminUser, IsExamOwner]
+
+    @reads_only
+    def get(self, request, exam_id):
+        exam = get_object_or_404(Exam, id=exam_id)
+        self.check_object_permissions(request, exam)
+
+        return Response(exam_stats_summary(exam.id))
+
+class ExamExportView(APIView):
+    """
+    Staff stream exam results as a file:
+    /export/submissions.csv, /export/answers.ndjson, ...
+    Rows are written as they are read, with constant memory.
+    /archive/<kind>.<fmt> exports the submissions of an archived exam.
+    """
+    permission_classes = [IsAdminUser, IsExamOwner]
+    archived = False
+
+    def perform_content_negotiation(self, request, force=False):
+        # The body is CSV/NDJSON whatever the Accept header says
+        return super().perform_content_negotiation(request, force=True)
+
+    @reads_only
+    def get(self, request, exam_id, kind, fmt):
+        if kind not in EXPORT_KINDS or fmt not in EXPORT_FORMATS:
+            raise Http404
+
+        exam = get_object_or_404(Exam, id=exam_id)
+        self.check_object_permissions(request, exam)
+
+        encode, content_type = EXPORT_FORMATS[fmt]
+        # rows are read while the response streams, after get() returned
+        chunks = read_iter(buffered(encode(export_rows(exam.id, kind, archived=self.archived))))
+        if isinstance(request._request, ASGIRequest):
+            chunks = async_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        prefix = "exam-archive" if self.archived else "exam"
+        response["Content-Disposition"] = f'attachment; filename="{prefix}-{exam.id}-{kind}.{fmt}"'
+        return response
+
+class ExamAnalyticsView(APIView):
+    """
+    Staff item analysis for their exam: per-question difficulty,
+    discrimination, point-biserial, score histogram, Cronbach's alpha
+    """
+    permission_classes = [IsAdminUser, IsExamOwner]
+
+    @reads_only
+    def get(self, request, exam_id):
+        exam = get_object_or_404(Exam, id=exam_id)
+        self.check_object_permissions(request, exam)
+
+        return Response(item_analysis(exam.id))
+
+class RegradeExamView(APIView):
+    """
+    Staff re-grade all submissions after fixing questions.
+    Body: {"only_changed_questions": true} to skip untouched questions.
+    Large exams should use `manage.py regrade_exam` (process pool).
+    """
+    permission_classes = [IsAdminUser, IsExamOwner]
+
+    def post(self, request, exam_id):
+        exam = get_object_or_404(Exam, id=exam_id)
+        self.check_object_permissions(request, exam)
+
+        if exam.archived_at:
+            raise ValidationError({"exam": ["Archived exams cannot be regraded"]})
+
+        report = regrade_exam(
+            exam.id,
+            only_changed_questions=bool(request.data.get("only_changed_questions", False))
+        )
+
+        return Response({"message": "Exam regraded", **report.as_dict()})
+
+class MetricsView(APIView):
+    """
+    Staff-only Prometheus scrape of per-view latency, SQL counts
+    and grading phase timings for this worker process
+    """
+    permission_classes = [IsAdminUser]
+
+    def perform_content_negotiation(self, request, force=False):
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4")
+
+class StudentBulkCreateView(APIView):
+    """
+    Staff create many student accounts in one request:
+    {"students": [{"username", "email", "password", ...}], "tokens": false,
+     "skip_existing": false}
+    Students without a password get a generated one, returned once in
+    "credentials". Nothing is saved if any row is invalid.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        students = request.data.get("students")
+        if not isinstance(students, list) or not students:
+            raise ValidationError({"students": ["A non-empty list of students is required"]})
+
+        # each row costs a password hash in this request: large rosters
+        # belong in manage.py import_students
+        limit = getattr(settings, "ROSTER_BULK_MAX", 50)
+        if len(students) > limit:
+            raise ValidationError({"students": [f"At most {limit} students per request; use import_students for more"]})
+        if not all(isinstance(row, dict) for row in students):
+            raise ValidationError({"students": ["Each student must be an object"]})
+
+        report = provision_students(
+            students,
+            issue_tokens=bool(request.data.get("tokens")),
+            skip_existing=bool(request.data.get("skip_existing")),
+        )
+
+        return Response(
+            {"message": "Students created", **report.as_dict()},
+            status=status.HTTP_201_CREATED
+        )
+
+
 class RegisterView(generics.GenericAPIView):
     """
     Public Student Registration
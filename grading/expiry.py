@@ -0,0 +1,97 @@
+"""
+Auto-submits exams whose time ran out without a submit.
+
+Each batch is claimed with the same conditional update a live submit
+uses (is_submitted False -> True), so a student submitting at the
+deadline and the sweeper can never both finalize a submission. Claimed
+submissions are graded from their stored (autosaved) answers, and the
+claim, grades and stats are written in one transaction per batch.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from assessment.answer_store import is_packed, load_answers_many, write_graded
+from assessment.models import Exam, Submission
+from assessment.results import build_result, render_result
+from assessment.stats import record_submissions
+from grading.plans import get_grading_plan
+from grading.services import collect_graded, score_answers
+
+
+logger = logging.getLogger("grading.expiry")
+
+
+def expired_submissions(exam, now, grace=0):
+    """
+    Open submissions of `exam` whose time was up `grace` seconds ago.
+    A range scan on the partial submission_open_by_start index.
+    """
+    cutoff = now - timedelta(minutes=exam.duration, seconds=grace)
+    return Submission.objects.filter(exam=exam, is_submitted=False, started_at__lt=cutoff)
+
+
+def finalize_batch(exam, submission_ids, now):
+    """
+    Claims, grades and records one batch. Submissions a live submit
+    claimed first are skipped. Returns how many were finalized.
+    """
+    plan = get_grading_plan(exam.id)
+
+    with transaction.atomic():
+        Submission.objects.filter(
+            id__in=submission_ids, is_submitted=False
+        ).update(is_submitted=True, submitted_at=now)
+
+        # our claim is the rows stamped with this sweep's time
+        claimed = list(Submission.objects.filter(id__in=submission_ids, is_submitted=True, submitted_at=now))
+        if not claimed:
+            return 0
+
+        stored = load_answers_many(claimed)
+        # one batch per question across the whole cohort
+        score_answers(plan, [a for answers in stored.values() for a in answers])
+
+        graded_all = {}
+        for submission in claimed:
+            graded, submission.total_score, _ = collect_graded(submission, plan, stored[submission.id])
+            submission.result = render_result(build_result(plan, graded, submission.total_score))
+            graded_all[submission] = graded
+
+        write_graded(graded_all)
+        Submission.objects.bulk_update([s for s in claimed if not is_packed(s)], ["total_score", "result"])
+        Submission.objects.bulk_update([s for s in claimed if is_packed(s)], ["total_score", "result", "packed_answers"])
+        record_submissions(exam.id, claimed, plan.total_marks)
+
+    return len(claimed)
+
+
+def sweep_expired(batch_size=200, grace=30, now=None):
+    """
+    Finalizes every expired open submission, `batch_size` at a time.
+    Returns the number finalized.
+
+    An exam whose batch fails (e.g. "database is locked" while submits
+    race the deadline) is logged and left for the next sweep; the other
+    exams are still swept. Archived exams have no open submissions.
+    """
+    now = now or timezone.now()
+    finalized = 0
+
+    for exam in Exam.objects.filter(archived_at__isnull=True).only("id", "duration"):
+        try:
+            while True:
+                batch = list(
+                    expired_submissions(exam, now, grace)
+                    .order_by("started_at")
+                    .values_list("id", flat=True)[:batch_size]
+                )
+                if not batch:
+                    break
+                finalized += finalize_batch(exam, batch, now)
+        except Exception:
+            logger.exception("Sweeping exam %s failed; retrying on the next sweep", exam.id)
+
+    return finalized
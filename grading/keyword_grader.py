@@ -1,15 +1,16 @@
+from grading.keyword_matcher import get_matcher
+
+
 # Grades theory questions by matching keywords.
-def grade_theory(answer, keywords, marks):
+def grade_theory(answer, keywords, marks, word_boundary=False, matcher=None):
     if not keywords:
         return 0, "No keywords provided"
 
-    score = 0
-    matched = []
-
-    for word in keywords:
-        if word.lower() in answer.lower():
-            matched.append(word)
-            score += 1
+    # cached matcher: the answer is lowercased once and each keyword
+    # (or its precompiled word-boundary pattern) is searched in it
+    matcher = matcher or get_matcher(keywords, word_boundary)
+    matched = matcher.match(answer)
+    score = len(matched)
 
     percent = (score / len(keywords))
     final_score = percent * marks
@@ -0,0 +1,58 @@
+import re
+from functools import lru_cache
+
+
+class KeywordMatcher:
+    """
+    Compiled keyword set for one question.
+
+    Keywords are lowercased and de-duplicated once at compile time and
+    the answer is lowercased once per call, so each keyword check is a
+    single C-level substring search over the normalized text.
+
+    With word_boundary set, a keyword only counts when it is not glued
+    to other letters or digits on either side ("cell" does not match
+    "cells"); each keyword then gets its own precompiled pattern.
+    """
+
+    def __init__(self, keywords, word_boundary=False):
+        self.keywords = tuple(keywords)
+        self.word_boundary = word_boundary
+        self._lowered = tuple(dict.fromkeys(word.lower() for word in self.keywords))
+
+        if word_boundary:
+            self._patterns = tuple(
+                (word, re.compile(rf"(?<!\w){re.escape(word)}(?!\w)"))
+                for word in self._lowered
+            )
+
+    def found(self, answer):
+        """
+        Returns the set of lowercased keywords present in answer.
+        """
+        text = answer.lower()
+        if self.word_boundary:
+            return {word for word, pattern in self._patterns if pattern.search(text)}
+        return {word for word in self._lowered if word in text}
+
+    def match(self, answer):
+        """
+        Returns the keywords (original spelling and order) present in answer.
+        """
+        found = self.found(answer)
+        return [word for word in self.keywords if word.lower() in found]
+
+
+@lru_cache(maxsize=1024)
+def _compile(keywords, word_boundary):
+    return KeywordMatcher(keywords, word_boundary)
+
+
+def get_matcher(keywords, word_boundary=False):
+    """
+    Returns the cached matcher for a keyword list.
+
+    The cache key is the keyword tuple itself, so editing a question's
+    keywords naturally produces a new matcher.
+    """
+    return _compile(tuple(keywords), bool(word_boundary))
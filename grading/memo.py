@@ -0,0 +1,88 @@
+"""
+Memo of grading results for repeated answers.
+
+MCQ answers come from a handful of options and short theory answers
+repeat across a cohort, so (score, feedback) is remembered per
+(question id, question version, question fingerprint, answer digest).
+The fingerprint hashes everything grading reads from the question
+(including the similarity model), so an edit, a changed IDF or a reused
+id simply produces new keys; stale entries age out of the LRU.
+
+Each process (web worker, grade_worker, regrade worker) has its own memo.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from assessment.metrics import registry
+
+
+def normalize_answer(question, answer):
+    """
+    Collapses answers that grade identically: MCQ compares stripped,
+    lowercased text; keyword and similarity grading lowercase first.
+    """
+    if question.question_type == "MCQ":
+        return answer.strip().lower()
+    return answer.lower()
+
+
+def memo_key(question, answer):
+    digest = hashlib.blake2b(normalize_answer(question, answer).encode(), digest_size=16).digest()
+    return (question.id, question.version, question.fingerprint, digest)
+
+
+class GradeMemo:
+    """
+    Thread-safe LRU of (score, feedback) by memo_key(); maxsize 0 turns
+    it off. hits / misses count answers since the last clear().
+    """
+
+    def __init__(self, maxsize=20000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+        return found
+
+    def set_many(self, items):
+        if not self.maxsize:
+            return
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+        if hits:
+            registry.inc("acad_grading_memo_total", (("result", "hit"),), hits)
+        if misses:
+            registry.inc("acad_grading_memo_total", (("result", "miss"),), misses)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+grade_memo = GradeMemo(getattr(settings, "GRADING_MEMO_SIZE", 20000))
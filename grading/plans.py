@@ -0,0 +1,133 @@
+import hashlib
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from django.conf import settings
+
+from grading.keyword_matcher import get_matcher
+from grading.similarity import build_model, fit_idf, reference_text
+from assessment.caching import ExamCache
+from assessment.models import Question
+
+
+@dataclass(frozen=True)
+class QuestionPlan:
+    """
+    Everything validation and grading need to know about one question,
+    precomputed once.
+    """
+    id: int
+    version: int
+    text: str                 # for result documents
+    question_type: str
+    marks: int
+    options: tuple            # original order, for error messages
+    option_set: frozenset     # O(1) membership checks
+    correct_answer: str       # as written by staff, for feedback
+    normalized_answer: str    # stripped + lowercased, for comparison
+    expected_keywords: tuple
+    keyword_hint: str         # " | Expected points/keywords: [...]" or ""
+    matcher: object           # compiled KeywordMatcher or None
+    similarity: object        # SimilarityModel (grading_mode SIMILARITY) or None
+    fingerprint: str          # hash of everything grading reads (grade memo key)
+
+
+@dataclass(frozen=True)
+class GradingPlan:
+    """
+    Immutable, precompiled view of an exam's questions.
+    """
+    exam_id: int
+    questions: tuple
+    question_map: MappingProxyType
+    total_marks: int
+
+
+def fingerprint(question, similarity):
+    state = repr((
+        question.version, question.question_type, question.marks, question.correct_answer,
+        question.expected_keywords, question.match_whole_words,
+    )).encode()
+    if similarity is not None:
+        state += repr(similarity.full_credit).encode() + similarity.idf.tobytes() + similarity.reference.tobytes()
+    return hashlib.blake2b(state, digest_size=8).hexdigest()
+
+
+def build_question_plan(question, similarity=None):
+    options = tuple(question.options or ())
+    keywords = question.expected_keywords
+
+    return QuestionPlan(
+        id=question.id,
+        version=question.version,
+        text=question.text,
+        question_type=question.question_type,
+        marks=question.marks,
+        options=options,
+        # student answers are strings, so only string options can ever match
+        option_set=frozenset(o for o in options if isinstance(o, str)),
+        correct_answer=question.correct_answer,
+        normalized_answer=str(question.correct_answer).strip().lower(),
+        expected_keywords=tuple(keywords or ()),
+        keyword_hint=f" | Expected points/keywords: {keywords}" if keywords else "",
+        matcher=get_matcher(keywords, question.match_whole_words) if keywords else None,
+        similarity=similarity,
+        fingerprint=fingerprint(question, similarity),
+    )
+
+
+def uses_similarity(question):
+    return question.question_type == "THEORY" and question.grading_mode == "SIMILARITY"
+
+
+def build_similarity_models(questions):
+    """
+    SimilarityModels for the exam's SIMILARITY questions, keyed by id.
+    IDF is fitted on the question texts and model answers of the exam.
+    """
+    references = {q.id: reference_text(q.model_answer, q.expected_keywords) for q in questions if uses_similarity(q)}
+    if not references:
+        return {}
+
+    vocab, idf, unseen_idf = fit_idf([q.text for q in questions] + list(references.values()))
+    full_credit = getattr(settings, "GRADING_SIMILARITY_FULL_CREDIT", 0.8)
+    return {
+        question_id: build_model(reference, vocab, idf, unseen_idf, full_credit)
+        for question_id, reference in references.items()
+    }
+
+
+def build_plan(exam_id):
+    rows = list(Question.objects.filter(exam_id=exam_id).order_by("id"))
+    models = build_similarity_models(rows)
+    questions = tuple(build_question_plan(q, models.get(q.id)) for q in rows)
+    return GradingPlan(
+        exam_id=exam_id,
+        questions=questions,
+        question_map=MappingProxyType({q.id: q for q in questions}),
+        total_marks=sum(q.marks for q in questions),
+    )
+
+
+plan_cache = ExamCache(
+    build_plan,
+    maxsize=getattr(settings, "GRADING_PLAN_CACHE_SIZE", 256),
+    ttl=getattr(settings, "GRADING_PLAN_TTL", 300),
+)
+
+
+def get_grading_plan(exam):
+    """
+    Returns the cached GradingPlan for an exam (instance or id).
+    """
+    exam_id = exam if isinstance(exam, int) else exam.pk
+    return plan_cache.get(exam_id)
+
+
+async def aget_grading_plan(exam):
+    exam_id = exam if isinstance(exam, int) else exam.pk
+    return await plan_cache.aget(exam_id)
+
+
+def invalidate_grading_plan(exam_id):
+    plan_cache.invalidate(exam_id)
@@ -0,0 +1,100 @@
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from grading.services import grade_submission
+from assessment.models import GradingJob
+from assessment.stats import record_submission
+
+
+def enqueue_grading(submission):
+    """
+    Queues a submission for the grade_worker. Call inside the same
+    transaction that stores the answers.
+    """
+    return GradingJob.objects.create(submission=submission)
+
+
+def claim_jobs(limit, worker_id=None):
+    """
+    Atomically claims up to `limit` jobs for this worker.
+
+    SQLite has no SELECT ... FOR UPDATE SKIP LOCKED, so claiming is a
+    conditional UPDATE: only rows still pending (or whose lease ran out)
+    are flipped to RUNNING, and we then read back what we actually won.
+    """
+    worker_id = worker_id or uuid.uuid4().hex
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, "GRADING_JOB_LEASE", 300))
+
+    claimable = (
+        Q(status="PENDING") |
+        Q(status="RUNNING", started_at__lt=now - lease)  # crashed worker
+    )
+
+    ids = list(
+        GradingJob.objects.filter(claimable)
+        .order_by("created_at")
+        .values_list("id", flat=True)[:limit]
+    )
+    if not ids:
+        return []
+
+    GradingJob.objects.filter(claimable, id__in=ids).update(
+        status="RUNNING",
+        claimed_by=worker_id,
+        started_at=now,
+        attempts=F("attempts") + 1,
+    )
+
+    return list(
+        GradingJob.objects.filter(id__in=ids, status="RUNNING", claimed_by=worker_id)
+        .select_related("submission")
+    )
+
+
+def _held(job):
+    # this claim of the job: a reclaim bumps attempts, even by the same worker
+    return GradingJob.objects.filter(pk=job.pk, claimed_by=job.claimed_by, attempts=job.attempts, status="RUNNING")
+
+
+class LeaseLost(Exception):
+    """
+    The job's lease ran out and it was claimed again while this
+    worker was grading it.
+    """
+
+
+def run_job(job):
+    """
+    Grades one claimed job and records the outcome.
+    Failed jobs go back to PENDING until GRADING_JOB_MAX_ATTEMPTS.
+
+    The grade, the stats update and DONE commit together, and only
+    while this worker still holds the job: a worker whose lease ran out
+    rolls back instead of counting the submission a second time.
+    """
+    try:
+        with transaction.atomic():
+            _, total_marks = grade_submission(job.submission)
+            record_submission(job.submission, total_marks)
+            done = _held(job).update(status="DONE", error="", finished_at=timezone.now())
+            if not done:
+                raise LeaseLost(job.pk)
+    except LeaseLost:
+        return False
+    except Exception:
+        max_attempts = getattr(settings, "GRADING_JOB_MAX_ATTEMPTS", 3)
+        _held(job).update(
+            status="FAILED" if job.attempts >= max_attempts else "PENDING",
+            error=traceback.format_exc(),
+            finished_at=timezone.now(),
+        )
+        return False
+
+    return True
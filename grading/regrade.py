@@ -0,0 +1,272 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from django.db import connections, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from grading.plans import build_plan
+from grading.services import collect_graded, grade_batch, score_answers
+from assessment.answer_store import load_answers_many, write_graded
+from assessment.models import Answer, Submission
+from assessment.stats import rebuild_exam_stats
+
+
+@dataclass
+class RegradeReport:
+    exam_id: int
+    answers_checked: int = 0
+    answers_changed: int = 0
+    answers_added: int = 0
+    submissions: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self):
+        return self.answers_checked / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            "exam_id": self.exam_id,
+            "submissions": self.submissions,
+            "answers_checked": self.answers_checked,
+            "answers_changed": self.answers_changed,
+            "answers_added": self.answers_added,
+            "seconds": round(self.seconds, 3),
+            "answers_per_second": round(self.throughput, 1),
+        }
+
+
+# ---------- worker side (no database access) ----------
+
+_questions = None
+
+
+def _init_worker(questions):
+    global _questions
+    _questions = questions
+
+
+def _grade_chunk(rows, questions=None):
+    """
+    rows: [(answer_id, question_id, student_answer, score, feedback, graded_version)]
+    Returns [(answer_id, score, feedback, version)] for every row whose
+    grade changed or was graded against an older question version.
+    """
+    if questions is None:
+        questions = _questions
+    changed = []
+
+    by_question = {}
+    for row in rows:
+        if row[1] in questions:
+            by_question.setdefault(row[1], []).append(row)
+
+    # each question's answers in the chunk are graded as one batch
+    for question_id, group in by_question.items():
+        question = questions[question_id]
+        results = grade_batch(question, [row[2] for row in group])
+
+        for (answer_id, _, _, old_score, old_feedback, old_version), (score, feedback) in zip(group, results):
+            if (score, feedback, question.version) != (old_score, old_feedback, old_version):
+                changed.append((answer_id, score, feedback, question.version))
+
+    return changed
+
+
+# ---------- coordinator side ----------
+
+def _chunks(rows, size):
+    """
+    Keyset pagination on answer id: every chunk is its own short query,
+    so no read cursor stays open on SQLite while we write back.
+    """
+    last_id = 0
+    while True:
+        chunk = list(rows.filter(id__gt=last_id)[:size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1][0]
+
+
+def _write_back(changed, report):
+    Answer.objects.bulk_update(
+        [
+            Answer(id=answer_id, score_awarded=score, feedback=feedback, graded_version=version)
+            for answer_id, score, feedback, version in changed
+        ],
+        ["score_awarded", "feedback", "graded_version"],
+        batch_size=500,
+    )
+    report.answers_changed += len(changed)
+
+
+def _add_missing_answers(plan, submissions):
+    """
+    Questions added after students submitted get a zero-score answer,
+    same as grade_submission does for skipped questions.
+    """
+    added = 0
+    for question in plan.questions:
+        missing = submissions.exclude(answers__question_id=question.id).values_list("id", flat=True)
+        created = Answer.objects.bulk_create(
+            [
+                Answer(
+                    submission_id=submission_id,
+                    question_id=question.id,
+                    student_answer="",
+                    score_awarded=0,
+                    feedback="No answer submitted",
+                    graded_version=question.version,
+                )
+                for submission_id in missing
+            ],
+            batch_size=500,
+        )
+        added += len(created)
+    return added
+
+
+def _regrade_packed(plan, submissions, report, only_changed_questions, chunk_size, done):
+    """
+    Packed submissions, a chunk of submissions at a time and in-process:
+    blobs are unpacked, rescored, repacked and saved with their new
+    totals. Entries for deleted questions are dropped on the way.
+    """
+    questions = plan.question_map
+    per_chunk = max(1, chunk_size // max(1, len(questions)))
+    packed = submissions.filter(packed_answers__isnull=False).order_by("pk").only("id", "packed_answers")
+
+    last_id = 0
+    while True:
+        chunk = list(packed.filter(pk__gt=last_id)[:per_chunk])
+        if not chunk:
+            return
+        last_id = chunk[-1].pk
+        stored = load_answers_many(chunk)
+
+        checked, graded_by_submission = [], {}
+        for submission in chunk:
+            answers = [a for a in stored[submission.pk] if a.question_id in questions]
+            checked.extend(
+                a for a in answers
+                if not only_changed_questions or a.graded_version != questions[a.question_id].version
+            )
+            graded_by_submission[submission] = answers
+
+        before = [(a.score_awarded, a.feedback, a.graded_version) for a in checked]
+        score_answers(plan, checked)
+        report.answers_changed += sum(
+            old != (a.score_awarded, a.feedback, a.graded_version) for a, old in zip(checked, before)
+        )
+
+        for submission, answers in graded_by_submission.items():
+            if not only_changed_questions:
+                graded, _, _ = collect_graded(submission, plan, answers)
+                report.answers_added += len(graded) - len(answers)
+                graded_by_submission[submission] = answers = graded
+            submission.total_score = sum(a.score_awarded for a in answers)
+            submission.result = None
+
+        with transaction.atomic():
+            write_graded(graded_by_submission)
+            Submission.objects.bulk_update(chunk, ["total_score", "result", "packed_answers"])
+
+        done([], len(checked))
+
+
+def regrade_exam(exam_id, chunk_size=1000, workers=None, only_changed_questions=False, progress=None):
+    """
+    Re-scores every submitted answer of an exam against its current
+    questions and writes the results back in bulk.
+
+    Answers are streamed in chunks; with workers > 1 chunks are graded on
+    a process pool while the coordinator keeps reading and writing.
+    only_changed_questions restricts the work to answers graded against
+    an older Question.version. progress(done, total) is called per chunk.
+    Without fork support (Windows) the chunks are graded in-process.
+    Packed submissions (see assessment/answer_store.py) are regraded
+    after the Answer rows, in-process.
+    """
+    started = time.perf_counter()
+    report = RegradeReport(exam_id=exam_id)
+
+    plan = build_plan(exam_id)
+    questions = dict(plan.question_map)
+
+    submissions = Submission.objects.filter(exam_id=exam_id, is_submitted=True)
+    row_submissions = submissions.filter(packed_answers__isnull=True)
+    answers = Answer.objects.filter(submission__in=row_submissions)
+    if only_changed_questions:
+        answers = answers.exclude(graded_version=F("question__version"))
+
+    report.submissions = submissions.count()
+    # packed answers are counted from their submissions (an estimate)
+    total = answers.count() + (report.submissions - row_submissions.count()) * len(questions)
+    rows = answers.order_by("id").values_list(
+        "id", "question_id", "student_answer", "score_awarded", "feedback", "graded_version"
+    )
+
+    def done(changed, size):
+        _write_back(changed, report)
+        report.answers_checked += size
+        if progress:
+            progress(report.answers_checked, total)
+
+    # Workers reuse the already-configured Django process, so they need fork
+    use_pool = (
+        workers and workers > 1 and
+        "fork" in multiprocessing.get_all_start_methods()
+    )
+
+    if use_pool:
+        # Forked workers must not inherit open SQLite handles
+        connections.close_all()
+
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(questions,),
+        ) as pool:
+            in_flight = []
+            for chunk in _chunks(rows, chunk_size):
+                in_flight.append((pool.submit(_grade_chunk, chunk), len(chunk)))
+                # bound memory: never more than 2 chunks queued per worker
+                if len(in_flight) >= workers * 2:
+                    future, size = in_flight.pop(0)
+                    done(future.result(), size)
+            for future, size in in_flight:
+                done(future.result(), size)
+    else:
+        for chunk in _chunks(rows, chunk_size):
+            done(_grade_chunk(chunk, questions), len(chunk))
+
+    _regrade_packed(plan, submissions, report, only_changed_questions, chunk_size, done)
+
+    with transaction.atomic():
+        if not only_changed_questions:
+            report.answers_added += _add_missing_answers(plan, row_submissions)
+
+        # Recompute every total in one statement; result snapshots are
+        # rebuilt on the next view
+        row_submissions.update(
+            result=None,
+            total_score=Coalesce(
+                Subquery(
+                    Answer.objects.filter(submission=OuterRef("pk"))
+                    .values("submission")
+                    .annotate(total=Sum("score_awarded"))
+                    .values("total")
+                ),
+                0.0,
+            )
+        )
+
+        rebuild_exam_stats(exam_id)
+
+    report.seconds = time.perf_counter() - started
+    return report
@@ -1,62 +1,176 @@
+from django.db import transaction
+
 from grading.keyword_grader import grade_theory
+from grading.plans import get_grading_plan
+from grading.memo import grade_memo, memo_key
+from grading.similarity import grade_similarity
+from assessment.metrics import grading_phase
+from assessment.answer_store import graded_fields, load_answers, write_graded
 from assessment.models import Answer
+from assessment.results import build_result, render_result
+
+
+def grade_answer(question, student_answer):
+    """
+    Scores one answer against a QuestionPlan. Returns (score, feedback).
+    Pure function, safe to run in worker processes.
+    """
+    # Blank rows are the placeholders stored for skipped questions
+    if not student_answer:
+        return 0, "No answer submitted"
+
+    # ---------- MCQ ----------
+    if question.question_type == "MCQ":
+        if student_answer.strip().lower() == question.normalized_answer:
+            return question.marks, "Correct answer"
+        return 0, f"Incorrect. Correct answer is: {question.correct_answer}"
+
+    # ---------- THEORY ----------
+    if question.similarity is not None:
+        return _grade_distinct(question, [student_answer])[0]
+
+    score_awarded, feedback = grade_theory(
+        student_answer,
+        question.expected_keywords,
+        question.marks,
+        matcher=question.matcher
+    )
+    return score_awarded, feedback + question.keyword_hint
+
+
+def grade_batch(question, student_answers):
+    """
+    Scores many answers to one question; returns [(score, feedback)] in
+    the same order. Repeated answers are served from the grade memo;
+    the rest are graded once each, SIMILARITY questions in one
+    vectorized pass. No database access, like grade_answer.
+    """
+    keys = [memo_key(question, answer) if answer else None for answer in student_answers]
+    results = grade_memo.get_many({key for key in keys if key is not None})
+
+    # one representative answer per key nobody has graded yet
+    missing = {}
+    for key, answer in zip(keys, student_answers):
+        if key is not None and key not in results:
+            missing.setdefault(key, answer)
+
+    if missing:
+        graded = dict(zip(missing, _grade_distinct(question, list(missing.values()))))
+        grade_memo.set_many(graded)
+        results.update(graded)
+
+    answered = len(keys) - keys.count(None)
+    grade_memo.record(hits=answered - len(missing), misses=len(missing))
+
+    return [
+        results[key] if key is not None else (0, "No answer submitted")
+        for key in keys
+    ]
+
+
+def _grade_distinct(question, student_answers):
+    if question.similarity is None:
+        return [grade_answer(question, answer) for answer in student_answers]
+
+    results = grade_similarity(question.similarity, student_answers, question.marks)
+    return [(score, feedback + question.keyword_hint) for score, feedback in results]
 
-# automated grading of student submissions.
-def grade_submission(submission):
-    exam = submission.exam
-    questions = exam.questions.all()
 
-    total_marks = sum(q.marks for q in questions)
+def score_answers(plan, answers):
+    """
+    Sets score_awarded, feedback and graded_version on Answers from any
+    number of submissions, grading each question's answers as one batch.
+    Answers to questions that are not in the plan are left untouched.
+    """
+    by_question = {}
+    for ans in answers:
+        if ans.question_id in plan.question_map:
+            by_question.setdefault(ans.question_id, []).append(ans)
+
+    for question_id, group in by_question.items():
+        question = plan.question_map[question_id]
+        results = grade_batch(question, [a.student_answer for a in group])
+        for ans, (score, feedback) in zip(group, results):
+            ans.score_awarded, ans.feedback = score, feedback
+            ans.graded_version = question.version
+
+
+def collect_graded(submission, plan, answers):
+    """
+    Returns (graded_answers, score, total_marks) for answers already
+    scored by score_answers().
+
+    graded_answers holds exactly one Answer per question, in question
+    order. Questions the student skipped get a new unsaved zero-score
+    Answer so callers can write everything in one bulk statement.
+    """
     score = 0
 
-    # Get answers student submitted
-    submitted_answers = {a.question_id: a for a in submission.answers.all()}
+    submitted_answers = {a.question_id: a for a in answers}
+    graded = []
 
     # Loop through every question in the exam
-    for question in questions:
+    for question in plan.questions:
 
         # Student answered this question
         if question.id in submitted_answers:
             ans = submitted_answers[question.id]
-
-            # ---------- MCQ ----------
-            if question.question_type == "MCQ":
-                if ans.student_answer.strip().lower() == str(question.correct_answer).strip().lower():
-                    ans.score_awarded = question.marks
-                    ans.feedback = "Correct answer"
-                else:
-                    ans.score_awarded = 0
-                    ans.feedback = f"Incorrect. Correct answer is: {question.correct_answer}"
-
-            # ---------- THEORY ----------
-            else:
-                score_awarded, feedback = grade_theory(
-                    ans.student_answer,
-                    question.expected_keywords,
-                    question.marks
-                )
-
-                ans.score_awarded = score_awarded
-                ans.feedback = (
-                    feedback +
-                    f" | Expected points/keywords: {question.expected_keywords}"
-                    if question.expected_keywords else feedback
-                )
-
-            ans.save()
             score += ans.score_awarded
 
         else:
-            # Student did NOT answer → create zero-score answer
-            Answer.objects.create(
+            # Student did NOT answer → zero-score answer
+            ans = Answer(
                 submission=submission,
-                question=question,
+                question_id=question.id,
                 student_answer="",
                 score_awarded=0,
-                feedback="No answer submitted"
+                feedback="No answer submitted",
+                graded_version=question.version,
             )
 
-    submission.total_score = score
-    submission.save()
+        graded.append(ans)
+
+    return graded, score, plan.total_marks
+
+
+# grades answers in memory, no database access.
+def grade_answers(submission, plan, answers):
+    """
+    Scores every answer of one submission against the exam's
+    GradingPlan; returns collect_graded()'s (graded_answers, score,
+    total_marks).
+    """
+    # last answer per question wins, as in the stored rows
+    answers = list({a.question_id: a for a in answers}.values())
+    score_answers(plan, answers)
+    return collect_graded(submission, plan, answers)
+
+
+# automated grading of student submissions.
+def grade_submission(submission):
+    """
+    Re-grades the answers already stored on a submission.
+
+    Existing answers are written back with one bulk_update, missing
+    ones are inserted with one bulk_create (or the packed blob is
+    rewritten) and the submission row (score and result snapshot) is
+    saved once, all inside a single transaction.
+    """
+    with grading_phase("load_plan"):
+        plan = get_grading_plan(submission.exam_id)
+
+    with transaction.atomic():
+        with grading_phase("load_answers"):
+            stored_answers = load_answers(submission)
+
+        with grading_phase("grade"):
+            graded, score, total_marks = grade_answers(submission, plan, stored_answers)
+
+        with grading_phase("write"):
+            write_graded({submission: graded})
+
+            submission.total_score = score
+            submission.result = render_result(build_result(plan, graded, score))
+            submission.save(update_fields=graded_fields(submission, ["total_score", "result"]))
 
     return score, total_marks
@@ -0,0 +1,161 @@
+"""
+TF-IDF similarity grading for THEORY questions (grading_mode SIMILARITY).
+
+Answers are tokenized, stop words dropped and words stemmed, then every
+answer to a question is scored against the staff model answer (plus its
+expected keywords) in one vectorized pass: the batch is a sparse
+(row, term, weight) matrix in NumPy arrays and the cosine scores come
+out of two bincounts, however many answers there are.
+
+IDF weights are fitted on the exam itself (question texts and model
+answers), not on the answers being graded, so an answer scores the same
+whether it is graded alone on submit or with the whole cohort in a
+regrade.
+"""
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset("""
+a an and are as at be been but by can do does for from had has have he her his
+how i if in into is it its of on or our she so than that the their them then
+there these they this those to was we were what when where which who why will
+with would you your
+""".split())
+
+# longest suffix first; (suffix, replacement, shortest stem kept)
+SUFFIXES = (
+    ("ational", "ate", 2), ("ization", "ize", 2), ("fulness", "ful", 2),
+    ("ousness", "ous", 2), ("iveness", "ive", 2), ("ations", "ate", 2),
+    ("ation", "ate", 2), ("ments", "", 3), ("ment", "", 3), ("ness", "", 3),
+    ("ings", "", 3), ("ing", "", 3), ("sses", "ss", 1), ("ies", "y", 2),
+    ("edly", "", 3), ("ed", "", 3), ("ly", "", 3), ("s", "", 3),
+)
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    """
+    Light suffix-stripping stemmer: "cells" / "cell", "organisms" /
+    "organism", "respiration" / "respirate".
+    """
+    for suffix, replacement, shortest in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= shortest:
+            if suffix == "s" and word.endswith("ss"):
+                return word
+            return word[: len(word) - len(suffix)] + replacement
+    return word
+
+
+def terms(text):
+    return [stem(t) for t in TOKEN_RE.findall(str(text or "").lower()) if t not in STOP_WORDS]
+
+
+@dataclass(frozen=True)
+class SimilarityModel:
+    """
+    Precomputed per question (part of the QuestionPlan, so it is cached
+    with the plan and shipped to regrade worker processes).
+    """
+    vocab: dict                # term -> column
+    idf: np.ndarray            # per column
+    unseen_idf: float          # weight of terms the exam never uses
+    reference: np.ndarray      # unit-length TF-IDF vector of the model answer
+    full_credit: float         # cosine that earns full marks
+
+
+def fit_idf(documents):
+    """
+    Smoothed IDF over the exam's documents. Returns (vocab, idf, unseen_idf).
+    """
+    df = {}
+    for doc in documents:
+        for term in set(terms(doc)):
+            df[term] = df.get(term, 0) + 1
+
+    n = len(documents)
+    vocab = {term: column for column, term in enumerate(sorted(df))}
+    idf = np.array([math.log((1 + n) / (1 + df[t])) + 1 for t in vocab], dtype=np.float64)
+    return vocab, idf, math.log(1 + n) + 1
+
+
+def reference_text(model_answer, keywords):
+    return " ".join([model_answer or "", *map(str, keywords or ())]).strip()
+
+
+def build_model(reference, vocab, idf, unseen_idf, full_credit):
+    """
+    Returns a SimilarityModel, or None when the reference has no terms.
+    Every reference term must be in vocab (fit_idf saw the reference).
+    """
+    counts = np.zeros(len(vocab))
+    for term in terms(reference):
+        counts[vocab[term]] += 1
+    if not counts.any():
+        return None
+
+    weights = np.zeros(len(vocab))
+    present = counts > 0
+    weights[present] = (1 + np.log(counts[present])) * idf[present]
+    return SimilarityModel(
+        vocab=vocab,
+        idf=idf,
+        unseen_idf=unseen_idf,
+        reference=weights / np.linalg.norm(weights),
+        full_credit=full_credit,
+    )
+
+
+def cosine_scores(model, answers):
+    """
+    Cosine similarity of every answer to the model answer, as an array.
+    """
+    vocab = model.vocab
+    unseen = {}
+    rows, cols = [], []
+
+    # tokenizing is per answer; everything after it is array arithmetic
+    for row, answer in enumerate(answers):
+        for term in terms(answer):
+            column = vocab.get(term)
+            if column is None:
+                column = unseen.setdefault(term, len(vocab) + len(unseen))
+            rows.append(row)
+            cols.append(column)
+
+    n = len(answers)
+    if not rows:
+        return np.zeros(n)
+
+    width = len(vocab) + len(unseen)
+    idf = np.concatenate([model.idf, np.full(len(unseen), model.unseen_idf)])
+    reference = np.concatenate([model.reference, np.zeros(len(unseen))])
+
+    # sparse term counts: one entry per distinct (answer, term)
+    cells, tf = np.unique(np.asarray(rows) * width + np.asarray(cols), return_counts=True)
+    row, col = np.divmod(cells, width)
+
+    weight = (1 + np.log(tf)) * idf[col]
+    norms = np.sqrt(np.bincount(row, weights=weight * weight, minlength=n))
+    dots = np.bincount(row, weights=weight * reference[col], minlength=n)
+
+    return np.divide(dots, norms, out=np.zeros(n), where=norms > 0)
+
+
+def grade_similarity(model, answers, marks):
+    """
+    Scores many answers to one question. Returns [(score, feedback)].
+    """
+    cosines = cosine_scores(model, answers)
+    scores = np.round(np.minimum(cosines / model.full_credit, 1.0) * marks, 2)
+
+    return [
+        (float(score), f"Similarity to model answer: {cosine:.0%}")
+        for score, cosine in zip(scores, cosines)
+    ]